@@ -0,0 +1,307 @@
+# bench_ui.py
+# Headless UI benchmarks: builds SlyceApp offscreen with a stub VLC and
+# times the paths that only slow down in big sessions: slider and waveform
+# lane repaints, mark/undo/redo with many segments, dropping thousands of
+# files on the playlist and log panel appends. Results are JSON, so a run
+# can be saved as a baseline and later runs compared against it.
+#
+#   python benchmarks/bench_ui.py                            (JSON on stdout)
+#   python benchmarks/bench_ui.py --save benchmarks/baseline.json
+#   python benchmarks/bench_ui.py --baseline benchmarks/baseline.json
+#
+# Compare only against baselines from the same machine; the exit status
+# is 1 when a metric got slower than the tolerance allows.
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import argparse
+import tempfile
+import platform
+import statistics
+import contextlib
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SCHEMA_VERSION = 1
+DEFAULT_SIZES = (100, 1000, 10000, 50000)
+DEFAULT_DROP_FILES = 10000
+DEFAULT_LOG_LINES = 10000
+# Spacing of synthetic segments: each is SEGMENT_MS long, one per SEGMENT_STRIDE_MS
+SEGMENT_STRIDE_MS = 10000
+SEGMENT_MS = 5000
+# A metric regresses when it is this much slower than the baseline...
+DEFAULT_TOLERANCE = 0.25
+# ...and slower by at least this much in absolute terms, so sub-millisecond noise never fails a run
+NOISE_FLOOR_MS = 0.5
+
+
+class FakePlayer:
+    """The part of vlc.MediaPlayer SlyceApp uses: a clock that only moves when told."""
+    def __init__(self):
+        self.time = 0
+        self.length = 0
+        self.playing = False
+        self.muted = False
+
+    def get_time(self):
+        return self.time
+
+    def set_time(self, ms):
+        self.time = ms
+
+    def get_length(self):
+        return self.length
+
+    def is_playing(self):
+        return self.playing
+
+    def play(self):
+        self.playing = True
+
+    def pause(self):
+        self.playing = False
+
+    def stop(self):
+        self.playing = False
+
+    def audio_get_mute(self):
+        return self.muted
+
+    def audio_set_mute(self, muted):
+        self.muted = muted
+
+    def set_media(self, media):
+        pass
+
+    def set_hwnd(self, hwnd):
+        pass
+
+
+class FakeMedia:
+    def __init__(self, path):
+        self.path = path
+
+    def add_option(self, option):
+        pass
+
+
+class FakeInstance:
+    def media_player_new(self):
+        return FakePlayer()
+
+    def media_new(self, path):
+        return FakeMedia(path)
+
+
+def install_fake_vlc():
+    # Must run before slyce is imported: it does `import vlc` at module level
+    module = types.ModuleType('vlc')
+    module.Instance = FakeInstance
+    sys.modules['vlc'] = module
+
+
+def timed(fn, runs):
+    """Run fn runs times; returns per-run wall times in milliseconds."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def summarize(times):
+    return {
+        'median_ms': round(statistics.median(times), 4), 'min_ms': round(min(times), 4),
+        'mean_ms': round(statistics.fmean(times), 4), 'runs': len(times),
+    }
+
+
+class Bench:
+    def __init__(self, slyce, app, workdir, runs):
+        self.slyce = slyce
+        self.app = app
+        self.workdir = workdir
+        self.runs = runs
+        self.results = {}
+        self.window = slyce.SlyceApp()
+        self.window.show_message_box = lambda box: None  # nothing here should warn, and a modal box would hang
+        self.window.show()
+        self.app.processEvents()
+        # Segments are saved per video, so the window needs a real file to attach them to
+        self.video = os.path.join(workdir, 'bench.mp4')
+        open(self.video, 'wb').close()
+        self.window.videoPath = self.video
+
+    def record(self, name, times):
+        self.results[name] = summarize(times)
+        print(f"{name}: median {self.results[name]['median_ms']:.3f} ms", file=sys.stderr)
+
+    def load_segments(self, count):
+        w = self.window
+        w.segments = [self.slyce.Segment(i * SEGMENT_STRIDE_MS, i * SEGMENT_STRIDE_MS + SEGMENT_MS) for i in range(count)]
+        w.undo_stack.clear()
+        w.redo_stack.clear()
+        w.segmentList.clear()
+        w.segmentList.addItems([str(seg) for seg in w.segments])
+        duration = (count + 2) * SEGMENT_STRIDE_MS
+        w.vlc_player.length = duration
+        w.slider.setRange(0, duration)
+        w.slider.set_segments(w.segments)
+        w.save_segments()
+        w.flush_projects()
+        self.app.processEvents()
+
+    def bench_repaint(self, count):
+        w = self.window
+        self.record(f"slider_repaint[n={count}]", timed(w.slider.repaint, self.runs))
+        self.record(f"waveform_lane_repaint[n={count}]", timed(w.waveformLane.repaint, self.runs))
+
+    def bench_mark_undo_redo(self, count):
+        w = self.window
+        free = (count + 1) * SEGMENT_STRIDE_MS  # past the last synthetic segment
+
+        def mark():
+            w.vlc_player.time = free
+            w.mark_start()
+            w.vlc_player.time = free + SEGMENT_MS
+            w.mark_end()
+
+        marks, undos, redos, flushes = [], [], [], []
+        for _ in range(self.runs):
+            marks += timed(mark, 1)
+            flushes += timed(w.flush_projects, 1)
+            undos += timed(w.undo_segment, 1)
+            redos += timed(w.redo_segment, 1)
+            w.undo_segment()
+            w.flush_projects()
+        self.app.processEvents()
+        self.record(f"mark[n={count}]", marks)
+        self.record(f"project_flush_after_mark[n={count}]", flushes)
+        self.record(f"undo[n={count}]", undos)
+        self.record(f"redo[n={count}]", redos)
+
+    def bench_playlist_drop(self, files):
+        from PyQt5.QtCore import QMimeData, QUrl, QPointF, Qt
+        from PyQt5.QtGui import QDropEvent
+        w = self.window
+        folder = os.path.join(self.workdir, 'drop')
+        os.makedirs(folder, exist_ok=True)
+        paths = [os.path.join(folder, f"clip_{i:05}.mp4") for i in range(files)]
+        for path in paths:
+            open(path, 'wb').close()
+        mime = QMimeData()
+        mime.setUrls([QUrl.fromLocalFile(path) for path in paths])
+        # Hold the probe workers: ffprobe on 10k empty files is not what is measured
+        w.pause_background_probes('benchmark')
+        times = []
+        for _ in range(max(1, self.runs // 10)):
+            w.playlistWidget.clear()
+            event = QDropEvent(QPointF(10, 10), Qt.CopyAction, mime, Qt.LeftButton, Qt.NoModifier)
+            times += timed(lambda: w.playlist_drop_event(event), 1)
+            w.probe_generation += 1
+            w.probe_pool.clear()
+        w.playlistWidget.clear()
+        w.resume_background_probes('benchmark')
+        self.record(f"playlist_drop[files={files}]", times)
+
+    def bench_log(self, lines):
+        w = self.window
+
+        def append():
+            for i in range(lines):
+                w.log_user(f"Benchmark line {i}: segment {i} exported", bold_parts=[str(i)])
+            # Appends are flushed to the panel on the next event-loop tick
+            self.app.processEvents()
+
+        self.record(f"log_append[lines={lines}]", timed(append, max(1, self.runs // 10)))
+
+    def close(self):
+        self.window.close()
+        self.app.processEvents()
+
+
+def compare(results, baseline, tolerance):
+    """Print current against baseline medians to stderr; returns the names that regressed."""
+    regressed = []
+    for name, current in sorted(results.items()):
+        before = baseline.get('results', {}).get(name)
+        if before is None:
+            print(f"  {name}: {current['median_ms']:.3f} ms (new)", file=sys.stderr)
+            continue
+        ratio = current['median_ms'] / before['median_ms'] if before['median_ms'] else float('inf')
+        slower = (ratio > 1 + tolerance and current['median_ms'] - before['median_ms'] > NOISE_FLOOR_MS)
+        if slower:
+            regressed.append(name)
+        mark = 'REGRESSED' if slower else ''
+        print(f"  {name}: {before['median_ms']:.3f} -> {current['median_ms']:.3f} ms ({ratio:.2f}x) {mark}", file=sys.stderr)
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless Slyce UI benchmarks.')
+    parser.add_argument('--sizes', default=','.join(str(n) for n in DEFAULT_SIZES), help='segment counts to benchmark')
+    parser.add_argument('--runs', type=int, default=10, help='repetitions per measurement')
+    parser.add_argument('--drop-files', type=int, default=DEFAULT_DROP_FILES)
+    parser.add_argument('--log-lines', type=int, default=DEFAULT_LOG_LINES)
+    parser.add_argument('--save', help='also write the results to this file')
+    parser.add_argument('--baseline', help='compare against results saved earlier')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help='allowed slowdown, 0.25 = 25%%')
+    args = parser.parse_args(argv)
+    sizes = [int(n) for n in args.sizes.split(',') if n]
+
+    workdir = tempfile.mkdtemp(prefix='slyce-bench-')
+    # Projects, caches and proxies go to a scratch folder, never the user's
+    os.environ['SLYCE_DATA_DIR'] = os.path.join(workdir, 'data')
+    install_fake_vlc()
+    # slyce prints its VLC environment at import; keep stdout for the JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtCore import QT_VERSION_STR
+        import slyce
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    bench = Bench(slyce, app, workdir, args.runs)
+    try:
+        for count in sizes:
+            bench.load_segments(count)
+            bench.bench_repaint(count)
+            bench.bench_mark_undo_redo(count)
+        bench.load_segments(0)
+        bench.bench_playlist_drop(args.drop_files)
+        bench.bench_log(args.log_lines)
+    finally:
+        bench.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'schema': SCHEMA_VERSION,
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(), 'qt': QT_VERSION_STR,
+            'platform': platform.platform(), 'machine': platform.machine(), 'qpa': os.environ.get('QT_QPA_PLATFORM'),
+            'runs': args.runs,
+        },
+        'results': bench.results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.save:
+        with open(args.save, 'w') as f:
+            f.write(text + '\n')
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with {args.baseline} ({baseline.get('meta', {}).get('created', '?')}):", file=sys.stderr)
+        regressed = compare(bench.results, baseline, args.tolerance)
+        if regressed:
+            print(f"{len(regressed)} regressed: {', '.join(regressed)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
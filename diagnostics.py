@@ -0,0 +1,182 @@
+# diagnostics.py
+# Diagnostics mode for the GUI: a cProfile session dump and a watchdog that
+# logs main-thread stalls with the handler that caused them. Enabled with
+# `python slyce.py --diagnostics` or SLYCE_DIAGNOSTICS=1.
+import os
+import sys
+import io
+import time
+import threading
+import cProfile
+import pstats
+from collections import Counter
+
+from PyQt5.QtCore import QObject, QTimer
+
+DIAGNOSTICS_FLAG = '--diagnostics'
+# Stalls shorter than this are not reported (milliseconds; SLYCE_STALL_MS overrides)
+DEFAULT_STALL_THRESHOLD_MS = 100
+# Upper bounds of the stall histogram buckets, in milliseconds
+STALL_BUCKETS_MS = (250, 500, 1000, 2000, 5000)
+PROFILE_TOP_ENTRIES = 30
+
+
+def diagnostics_requested(argv):
+    """True if diagnostics mode was asked for; removes the flag from argv so Qt never sees it."""
+    requested = os.environ.get('SLYCE_DIAGNOSTICS', '').strip().lower() in ('1', 'true', 'yes')
+    while DIAGNOSTICS_FLAG in argv:
+        argv.remove(DIAGNOSTICS_FLAG)
+        requested = True
+    return requested
+
+
+def stall_threshold_ms():
+    try:
+        return int(os.environ.get('SLYCE_STALL_MS', DEFAULT_STALL_THRESHOLD_MS))
+    except ValueError:
+        return DEFAULT_STALL_THRESHOLD_MS
+
+
+def describe_frame(frame):
+    # "SlyceApp.open_video_path" for methods, the plain name for functions
+    owner = frame.f_locals.get('self')
+    name = frame.f_code.co_name
+    return f"{type(owner).__name__}.{name}" if owner is not None else name
+
+
+class StallWatchdog(QObject):
+    """Measures event-loop latency on the main thread.
+
+    A timer on the main thread records when it last ran. A watcher thread
+    notices when it is late and samples the main thread's Python stack, so
+    the stall can be blamed on the handler Qt was running: the first frame
+    below the event loop, e.g. SlyceApp.open_video_path or
+    SegmentSlider.paintEvent. The stall itself is logged from the next tick,
+    once its full length is known.
+    """
+    def __init__(self, logger, threshold_ms=DEFAULT_STALL_THRESHOLD_MS, interval_ms=50, parent=None):
+        super().__init__(parent)
+        self.logger = logger
+        self.threshold = threshold_ms / 1000
+        self.interval = interval_ms / 1000
+        self.main_ident = threading.get_ident()
+        self.loop_depth = None  # Python frames outside any handler, measured from the tick
+        self.last_tick = time.monotonic()
+        self.lock = threading.Lock()
+        self.blamed = None  # (handler, innermost location) sampled during the current stall
+        self.stalls = []  # (duration_sec, handler)
+        self.stopping = threading.Event()
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.tick)
+        self.watcher = threading.Thread(target=self.watch, name='stall-watchdog', daemon=True)
+
+    def start(self):
+        self.last_tick = time.monotonic()
+        self.timer.start()
+        self.watcher.start()
+        self.logger.info(f"Diagnostics: stall watchdog on, threshold {int(self.threshold * 1000)} ms")
+
+    def stop(self):
+        self.timer.stop()
+        self.stopping.set()
+
+    def tick(self):
+        now = time.monotonic()
+        if self.loop_depth is None:
+            depth = 0
+            frame = sys._getframe(1)
+            while frame is not None:
+                depth += 1
+                frame = frame.f_back
+            self.loop_depth = depth
+        stall = now - self.last_tick - self.interval
+        with self.lock:
+            blamed, self.blamed = self.blamed, None
+            self.last_tick = now
+        if stall >= self.threshold:
+            handler, location = blamed or ('unknown', '')
+            self.stalls.append((stall, handler))
+            where = f" (at {location})" if location else ''
+            self.logger.warning(f"UI stall {int(stall * 1000)} ms in {handler}{where}")
+
+    def watch(self):
+        while not self.stopping.wait(self.interval / 2):
+            with self.lock:
+                # Sample as soon as a tick is overdue; stalls just over the threshold would be missed otherwise
+                late = time.monotonic() - self.last_tick - self.interval >= self.interval
+                if late and self.blamed is None and self.loop_depth is not None:
+                    self.blamed = self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.main_ident)
+        if frame is None:
+            return None
+        stack = []
+        innermost = frame
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        stack.reverse()
+        if len(stack) <= self.loop_depth:
+            # Blocked inside Qt or VLC with no Python handler on the stack
+            return ('event loop', '')
+        location = f"{describe_frame(innermost)} {os.path.basename(innermost.f_code.co_filename)}:{innermost.f_lineno}"
+        return (describe_frame(stack[self.loop_depth]), location)
+
+    def summary(self):
+        """Histogram of stall durations and the worst handlers, as log lines."""
+        if not self.stalls:
+            return ["UI stalls: none"]
+        counts = Counter()
+        for stall, _ in self.stalls:
+            ms = stall * 1000
+            bucket = next((b for b in STALL_BUCKETS_MS if ms < b), None)
+            counts[bucket] += 1
+        lines = [f"UI stalls: {len(self.stalls)} over {int(self.threshold * 1000)} ms, {sum(s for s, _ in self.stalls):.1f} s total"]
+        lower = int(self.threshold * 1000)
+        for bucket in STALL_BUCKETS_MS + (None,):
+            label = f"{lower}-{bucket} ms" if bucket is not None else f">= {lower} ms"
+            lines.append(f"  {label:>14}: {counts[bucket]:5} {'#' * min(counts[bucket], 50)}")
+            lower = bucket
+        per_handler = {}
+        for stall, handler in self.stalls:
+            count, total, worst = per_handler.get(handler, (0, 0.0, 0.0))
+            per_handler[handler] = (count + 1, total + stall, max(worst, stall))
+        for handler, (count, total, worst) in sorted(per_handler.items(), key=lambda kv: -kv[1][1]):
+            lines.append(f"  {handler}: {count} stalls, {int(total * 1000)} ms total, worst {int(worst * 1000)} ms")
+        return lines
+
+
+class Diagnostics:
+    """A profiled GUI session: cProfile on the main thread plus the stall watchdog.
+
+    Only the main thread is profiled; worker threads (export, probes,
+    previews) do not block the UI and would only add noise.
+    """
+    def __init__(self, logger, log_dir):
+        self.logger = logger
+        self.log_dir = log_dir
+        self.profiler = cProfile.Profile()
+        self.watchdog = StallWatchdog(logger, stall_threshold_ms())
+
+    def start(self):
+        self.watchdog.start()
+        self.profiler.enable()
+
+    def stop(self):
+        """Stop profiling, dump the stats next to the log and log a summary."""
+        self.profiler.disable()
+        self.watchdog.stop()
+        for line in self.watchdog.summary():
+            self.logger.info(line)
+        os.makedirs(self.log_dir, exist_ok=True)
+        path = os.path.join(self.log_dir, time.strftime('slyce-%Y%m%d-%H%M%S.prof'))
+        try:
+            self.profiler.dump_stats(path)
+        except OSError as e:
+            self.logger.error(f"Could not write profile {path}: {e}")
+            return
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP_ENTRIES)
+        self.logger.info(f"Profile written to {path} (open with python -m pstats or snakeviz)\n{out.getvalue()}")
@@ -0,0 +1,1086 @@
+# engine.py
+# Export engine helpers shared by the GUI: ffmpeg/ffprobe locations, the
+# keyframe index used to snap stream-copy cuts, and output planning.
+# Nothing in here imports Qt or VLC.
+import sys
+import os
+import subprocess
+import shutil
+import threading
+import json
+import hashlib
+import time
+import ctypes
+import platform
+import string
+from collections import OrderedDict, namedtuple
+from bisect import bisect_left, bisect_right
+
+try:
+    # PyInstaller: _MEIPASS is the temp folder with bundled files
+    base_path = sys._MEIPASS
+except AttributeError:
+    # Development: use script directory
+    base_path = os.path.dirname(os.path.abspath(__file__))
+
+FFMPEG = os.path.join(base_path, 'bin', 'ffmpeg.exe')
+FFPROBE = os.path.join(base_path, 'bin', 'ffprobe.exe')
+
+# Persistent per-user data (caches); base_path is a temp folder in the built EXE.
+# SLYCE_DATA_DIR moves it, e.g. to keep benchmark runs away from real projects
+if os.environ.get('SLYCE_DATA_DIR'):
+    APP_DATA_DIR = os.environ['SLYCE_DATA_DIR']
+elif sys.platform == "win32":
+    APP_DATA_DIR = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'Slyce')
+else:
+    APP_DATA_DIR = os.path.join(os.path.expanduser('~'), '.slyce')
+EXPORT_CACHE_DIR = os.path.join(APP_DATA_DIR, 'export-cache')
+STREAM_PROFILES_FILE = os.path.join(APP_DATA_DIR, 'stream_profiles.json')
+PROXY_DIR = os.path.join(APP_DATA_DIR, 'proxies')
+
+# Helper for subprocess creationflags to suppress console on Windows
+subprocess_flags = 0
+if sys.platform == "win32":
+    subprocess_flags = subprocess.CREATE_NO_WINDOW
+
+# Child process priorities on POSIX: background work (probes, proxies,
+# waveforms) is idle for CPU and disk; exports sit just below normal, so
+# playback and the UI win any contention but exports keep moving.
+BACKGROUND_NICE = 10
+EXPORT_NICE = 5
+IOPRIO_CLASS_BE = 2  # best effort, levels 0 (high) to 7 (low)
+IOPRIO_CLASS_IDLE = 3  # only when nobody else uses the disk
+EXPORT_IOPRIO_LEVEL = 7
+# ioprio_set(2) has no Python wrapper, so it is called by syscall number
+_IOPRIO_SET_SYSCALLS = {'x86_64': 251, 'amd64': 251, 'aarch64': 30, 'arm64': 30, 'i386': 289, 'i686': 289}
+_libc = None
+if sys.platform.startswith('linux') and platform.machine().lower() in _IOPRIO_SET_SYSCALLS:
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        pass
+
+
+def process_kwargs(background=False, export=False):
+    """Popen keyword arguments; on Windows these also set the child's priority class.
+
+    Elsewhere, pass the same flags to lower_priority() once the process has started.
+    """
+    if sys.platform == "win32":
+        priority = subprocess.IDLE_PRIORITY_CLASS if background else subprocess.BELOW_NORMAL_PRIORITY_CLASS if export else 0
+        return {'creationflags': subprocess_flags | priority}
+    return {}
+
+
+def lower_priority(pid, background=False, export=False):
+    """Lower a started child's CPU and disk priority: background work to idle, exports just below normal.
+
+    Done from the parent because a preexec_fn is not safe in a threaded
+    program. Failure (the child has already exited) leaves it as it is.
+    """
+    if sys.platform == "win32" or not (background or export):
+        return
+    if background:
+        nice, io_class, io_level = BACKGROUND_NICE, IOPRIO_CLASS_IDLE, 0
+    else:
+        nice, io_class, io_level = EXPORT_NICE, IOPRIO_CLASS_BE, EXPORT_IOPRIO_LEVEL
+    nice = min(19, os.getpriority(os.PRIO_PROCESS, 0) + nice)
+    # Linux keeps priorities per thread: cover any the child has started by now;
+    # threads it starts later inherit from these
+    try:
+        tids = [int(tid) for tid in os.listdir(f'/proc/{pid}/task')]
+    except OSError:
+        tids = [pid]
+    for tid in tids:
+        try:
+            os.setpriority(os.PRIO_PROCESS, tid, nice)
+        except OSError:
+            continue
+        if _libc is not None:
+            # IOPRIO_WHO_PROCESS; failure just leaves the default I/O priority
+            _libc.syscall(_IOPRIO_SET_SYSCALLS[platform.machine().lower()], 1, tid, (io_class << 13) | io_level)
+
+
+# Exports run at most this many ffmpeg processes at once
+DEFAULT_EXPORT_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+# System load (busy fraction of all CPUs) at which exports drop to one process
+EXPORT_LOAD_HIGH = 0.85
+
+
+class _FileTime(ctypes.Structure):
+    _fields_ = [('low', ctypes.c_uint32), ('high', ctypes.c_uint32)]
+
+    @property
+    def value(self):
+        return (self.high << 32) | self.low
+
+
+class SystemLoad:
+    """How busy the machine's CPUs are, as a fraction (above 1 when overloaded).
+
+    POSIX uses the 1-minute load average per CPU. Windows has no load
+    average, so it measures busy time between calls with GetSystemTimes.
+    """
+    def __init__(self):
+        self.cpus = os.cpu_count() or 1
+        self.last = None  # Windows: (idle, total) at the previous sample
+
+    def sample(self):
+        """Current load, or None if it cannot be measured here."""
+        if sys.platform != "win32":
+            try:
+                return os.getloadavg()[0] / self.cpus
+            except (AttributeError, OSError):
+                return None
+        idle, kernel, user = _FileTime(), _FileTime(), _FileTime()
+        if not ctypes.windll.kernel32.GetSystemTimes(ctypes.byref(idle), ctypes.byref(kernel), ctypes.byref(user)):
+            return None
+        # Kernel time includes idle time
+        now = (idle.value, kernel.value + user.value)
+        last, self.last = self.last, now
+        if last is None or now[1] == last[1]:
+            return None
+        return 1.0 - (now[0] - last[0]) / (now[1] - last[1])
+
+
+class ResourceGovernor:
+    """Decides how many export processes may run at once.
+
+    While the player is playing, one: a single stream copy at lowered
+    priority leaves decoding smooth. Otherwise up to max_workers, scaled
+    down as system load rises. The GUI thread sets playing; the export
+    thread asks for limit() before starting each process.
+    """
+    def __init__(self, max_workers=DEFAULT_EXPORT_WORKERS, load=None):
+        self.max_workers = max(1, max_workers)
+        self.playing = False
+        self.load = load if load is not None else SystemLoad()
+        self.min_interval = 1.0  # seconds between load samples
+        self.last_sample = (0.0, None)  # (monotonic time, load)
+
+    def current_load(self):
+        now = time.monotonic()
+        taken, load = self.last_sample
+        if now - taken >= self.min_interval:
+            load = self.load.sample()
+            self.last_sample = (now, load)
+        return load
+
+    def limit(self):
+        if self.playing or self.max_workers == 1:
+            return 1
+        load = self.current_load()
+        if load is None:
+            return self.max_workers
+        spare = max(0.0, EXPORT_LOAD_HIGH - load) / EXPORT_LOAD_HIGH
+        return max(1, min(self.max_workers, 1 + int(spare * self.max_workers)))
+
+
+_background_processes = set()
+_background_lock = threading.Lock()
+
+def run_probe(cmd, background=False, stderr=subprocess.STDOUT):
+    """Run an ffprobe command and return its stdout; raises CalledProcessError on failure.
+
+    Background runs are tracked so kill_background_processes can stop them
+    when the app exits instead of waiting for a long index scan.
+    """
+    if not background:
+        return subprocess.check_output(cmd, stderr=stderr, **process_kwargs())
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, **process_kwargs(True))
+    lower_priority(process.pid, True)
+    with _background_lock:
+        _background_processes.add(process)
+    try:
+        output = process.communicate()[0]
+    finally:
+        with _background_lock:
+            _background_processes.discard(process)
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, output)
+    return output
+
+def kill_background_processes():
+    with _background_lock:
+        processes = list(_background_processes)
+    for process in processes:
+        if process.poll() is None:
+            process.kill()
+
+DEFAULT_FILENAME_PATTERN = '{basename}_{start}-{end}'
+EXPORT_MODE_SEPARATE = 'separate'
+EXPORT_MODE_MERGE = 'merge'
+# Output packaging: the source container as-is, or streamable MP4/HLS
+PACKAGING_PLAIN = 'plain'
+PACKAGING_FASTSTART = 'faststart'
+PACKAGING_FRAGMENTED = 'fragmented'
+PACKAGING_HLS = 'hls'
+PACKAGINGS = (PACKAGING_PLAIN, PACKAGING_FASTSTART, PACKAGING_FRAGMENTED, PACKAGING_HLS)
+# Packagings muxed as MP4 (HLS as fMP4 segments), and the codecs the mp4
+# muxer accepts as a stream copy; other tracks are left out of such outputs
+MP4_PACKAGINGS = (PACKAGING_FASTSTART, PACKAGING_FRAGMENTED, PACKAGING_HLS)
+MP4_COPY_CODECS = {
+    'video': {'h264', 'hevc', 'av1', 'vp9', 'mpeg4', 'mpeg2video', 'mpeg1video', 'mjpeg'},
+    'audio': {'aac', 'mp3', 'mp2', 'ac3', 'eac3', 'opus', 'flac', 'alac', 'dts'},
+    'subtitle': {'mov_text'},
+}
+HLS_SEGMENT_SECONDS = 6
+# Verified outputs must probe within this many seconds of their recorded duration
+VERIFY_DURATION_TOLERANCE = 0.1
+# Bytes hashed from each end of a source for its fingerprint
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+DEFAULT_EXPORT_CACHE_GB = 10
+# Per-file probe results kept in memory (least recently used are dropped)
+MEDIA_CACHE_ENTRIES = 256
+# Headroom kept free on the output volume on top of the size estimate
+FREE_SPACE_MARGIN_BYTES = 64 * 1024 * 1024
+# Playback proxies: small, short-GOP H.264 that VLC can seek anywhere cheaply
+PROXY_HEIGHT = 360
+PROXY_GOP_FRAMES = 12
+DEFAULT_PROXY_CACHE_GB = 20
+
+
+class KeyframeIndex:
+    """Keyframe times and byte offsets of the first video stream.
+
+    Built from a single ffprobe packet scan (no decoding). Offsets are the
+    container positions of the keyframe packets, so the span between two
+    keyframes includes the interleaved audio and subtitle packets too.
+    """
+    def __init__(self, times, offsets, file_size, duration):
+        self.times = times  # seconds, ascending
+        self.offsets = offsets  # byte position of each keyframe packet
+        self.file_size = file_size
+        self.duration = duration
+
+    @classmethod
+    def build(cls, path, background=False):
+        cmd = [
+            FFPROBE, '-v', 'error', '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,dts_time,pos,flags:format=duration',
+            '-of', 'compact=p=0', path
+        ]
+        output = run_probe(cmd, background).decode()
+        keyframes = []
+        duration = 0.0
+        for line in output.splitlines():
+            fields = dict(kv.split('=', 1) for kv in line.split('|') if '=' in kv)
+            if 'flags' not in fields:
+                if 'duration' in fields:
+                    try:
+                        duration = float(fields['duration'])
+                    except ValueError:
+                        pass
+                continue
+            if 'K' not in fields['flags']:
+                continue
+            t = fields.get('pts_time', 'N/A')
+            if t == 'N/A':
+                t = fields.get('dts_time', 'N/A')
+            try:
+                keyframes.append((float(t), int(fields.get('pos', -1))))
+            except ValueError:
+                continue
+        keyframes.sort()
+        file_size = os.path.getsize(path)
+        times = [t for t, _ in keyframes]
+        offsets = [pos if pos >= 0 else 0 for _, pos in keyframes]
+        return cls(times, offsets, file_size, duration)
+
+    def snap_start(self, start_time):
+        # Last keyframe at or before start_time
+        i = bisect_right(self.times, start_time)
+        return self.times[i - 1] if i else 0.0
+
+    def snap_end(self, end_time):
+        # First keyframe after end_time; past the last keyframe, keep end_time
+        i = bisect_right(self.times, end_time)
+        return self.times[i] if i < len(self.times) else end_time
+
+    def keyframe_before(self, t):
+        # Last keyframe strictly before t, or None
+        i = bisect_left(self.times, t)
+        return self.times[i - 1] if i else None
+
+    def keyframe_after(self, t):
+        # First keyframe strictly after t, or None
+        i = bisect_right(self.times, t)
+        return self.times[i] if i < len(self.times) else None
+
+    def snap_ranges(self, ranges):
+        """Snap many (start, end) ranges with one sweep over the keyframe list.
+
+        Same result as snap_start/snap_end per range, but all boundaries are
+        sorted once and matched in a single pass instead of a search each.
+        """
+        bounds = sorted((t, i, side) for i, r in enumerate(ranges) for side, t in enumerate(r))
+        snapped = [[0.0, 0.0] for _ in ranges]
+        times = self.times
+        k = 0  # number of keyframes at or before the current boundary
+        for t, i, side in bounds:
+            while k < len(times) and times[k] <= t:
+                k += 1
+            if side == 0:
+                snapped[i][0] = times[k - 1] if k else 0.0
+            else:
+                snapped[i][1] = times[k] if k < len(times) else t
+        return [tuple(r) for r in snapped]
+
+    def offset_at(self, start_time):
+        # Byte position a stream-copy read starting at start_time seeks to
+        i = bisect_right(self.times, start_time)
+        return self.offsets[i - 1] if i else 0
+
+    def estimate_bytes(self, start_time, end_time):
+        # Bytes between the keyframe packets that bound [start_time, end_time)
+        i = bisect_right(self.times, start_time)
+        start_offset = self.offsets[i - 1] if i else 0
+        j = bisect_left(self.times, end_time)
+        end_offset = self.offsets[j] if j < len(self.offsets) else self.file_size
+        return max(0, end_offset - start_offset)
+
+
+class MediaInfo:
+    """Container and stream metadata from a single ffprobe call."""
+    def __init__(self, path, duration, streams, format_info):
+        self.path = path
+        self.duration = duration  # seconds, 0.0 if unknown
+        self.streams = streams  # ffprobe stream dicts, in file order
+        self.format_info = format_info
+
+    @classmethod
+    def probe(cls, path, background=False):
+        cmd = [FFPROBE, '-v', 'error', '-show_streams', '-show_format', '-of', 'json', path]
+        data = json.loads(run_probe(cmd, background, stderr=subprocess.DEVNULL).decode())
+        format_info = data.get('format', {})
+        try:
+            duration = float(format_info.get('duration', 0))
+        except ValueError:
+            duration = 0.0
+        return cls(path, duration, data.get('streams', []), format_info)
+
+    def first_stream(self, codec_type):
+        for stream in self.streams:
+            if stream.get('codec_type') == codec_type and not stream.get('disposition', {}).get('attached_pic'):
+                return stream
+        return {}
+
+    def resolution(self):
+        v = self.first_stream('video')
+        return f"{v.get('width', '?')}x{v.get('height', '?')}"
+
+    def summary(self):
+        # Short form for playlist rows, e.g. "1920x1080, 00:12:34"
+        s = int(self.duration)
+        return f"{self.resolution()}, {s//3600:02}:{(s%3600)//60:02}:{s%60:02}"
+
+
+def file_key(path):
+    # Identifies one version of a file; edits change size or mtime
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime)
+
+
+def compute_fingerprint(path, background=False):
+    """Content fingerprint of a source: size, mtime and a hash of its head and tail."""
+    st = os.stat(path)
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+        if st.st_size > 2 * FINGERPRINT_SAMPLE_BYTES:
+            f.seek(-FINGERPRINT_SAMPLE_BYTES, os.SEEK_END)
+            h.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+    return f"{st.st_size}-{int(st.st_mtime)}-{h.hexdigest()}"
+
+
+_fingerprints = OrderedDict()  # file_key -> fingerprint string
+_keyframe_indexes = OrderedDict()  # file_key -> KeyframeIndex
+_media_infos = OrderedDict()  # file_key -> MediaInfo
+_cache_lock = threading.Lock()
+
+def _lookup(store, key):
+    # Caller holds _cache_lock
+    value = store.get(key)
+    if value is not None:
+        store.move_to_end(key)
+    return value
+
+def _cached(store, path, build, background):
+    key = file_key(path)
+    with _cache_lock:
+        value = _lookup(store, key)
+    if value is None:
+        value = build(path, background)
+        with _cache_lock:
+            store[key] = value
+            while len(store) > MEDIA_CACHE_ENTRIES:
+                store.popitem(last=False)
+    return value
+
+def _peek(store, path):
+    try:
+        key = file_key(path)
+    except OSError:
+        return None
+    with _cache_lock:
+        return _lookup(store, key)
+
+def media_cache_stats():
+    with _cache_lock:
+        return {'media_info': len(_media_infos), 'keyframe_indexes': len(_keyframe_indexes), 'fingerprints': len(_fingerprints)}
+
+def get_keyframe_index(path, background=False):
+    """Return the keyframe index for path, building it once per file version."""
+    return _cached(_keyframe_indexes, path, KeyframeIndex.build, background)
+
+def peek_keyframe_index(path):
+    """Return the cached keyframe index for path, or None; never runs ffprobe."""
+    return _peek(_keyframe_indexes, path)
+
+def get_fingerprint(path):
+    """Return the content fingerprint of path, hashing it once per file version."""
+    return _cached(_fingerprints, path, compute_fingerprint, False)
+
+def get_media_info(path, background=False):
+    """Return the probed MediaInfo for path, probing once per file version."""
+    return _cached(_media_infos, path, MediaInfo.probe, background)
+
+def peek_media_info(path):
+    """Return the cached MediaInfo for path, or None; never runs ffprobe."""
+    return _peek(_media_infos, path)
+
+
+def output_extension(video_path, packaging=PACKAGING_PLAIN):
+    # Streamable packaging fixes the container; plain keeps the source's
+    if packaging == PACKAGING_HLS:
+        return '.m3u8'
+    if packaging in (PACKAGING_FASTSTART, PACKAGING_FRAGMENTED):
+        return '.mp4'
+    return os.path.splitext(video_path)[1]
+
+
+FILENAME_FIELDS = ('basename', 'index', 'start', 'end')
+
+
+def check_filename_pattern(pattern):
+    """Raise ValueError unless pattern uses only the bare FILENAME_FIELDS, with optional format specs.
+
+    Attribute and item lookups ({basename.upper}, {start[0]}) and nested
+    fields are refused, and the specs are tried on sample values.
+    """
+    try:
+        for _, field, spec, conversion in string.Formatter().parse(pattern):
+            if field is None:
+                continue
+            if field not in FILENAME_FIELDS:
+                raise ValueError(f"unknown field {{{field}}}; use {', '.join('{' + f + '}' for f in FILENAME_FIELDS)}")
+            if conversion or '{' in spec:
+                raise ValueError(f"only a format spec may follow {{{field}}}")
+        pattern.format(basename='name', index=1, start=0, end=0)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid filename pattern '{pattern}': {e}") from None
+
+
+def build_output_paths(video_path, segments, output_folder='', filename_pattern=DEFAULT_FILENAME_PATTERN, indexes=None,
+                       packaging=PACKAGING_PLAIN):
+    """Return one output path per segment from the folder and filename pattern.
+
+    The pattern may use {basename}, {index} (1-based), {start} and {end}
+    (milliseconds); the extension of the packaging is appended (the source's
+    for plain outputs). {index} is the position in segments unless indexes
+    gives the numbers to use. An empty output folder means the folder of
+    the source video. Raises ValueError for an invalid pattern or when two
+    segments would get the same name.
+    """
+    filename_pattern = filename_pattern or DEFAULT_FILENAME_PATTERN
+    check_filename_pattern(filename_pattern)
+    base = os.path.splitext(video_path)[0]
+    ext = output_extension(video_path, packaging)
+    out_dir = output_folder or os.path.dirname(video_path)
+    outfiles = []
+    for i, seg in enumerate(segments):
+        name = filename_pattern.format(basename=os.path.basename(base), index=indexes[i] if indexes else i + 1,
+                                       start=int(seg.start), end=int(seg.end))
+        outfiles.append(os.path.join(out_dir, name + ext))
+    seen = set()
+    for f in outfiles:
+        if os.path.normcase(f) in seen:
+            raise ValueError(f"Filename pattern produces duplicate names: {os.path.basename(f)}")
+        seen.add(os.path.normcase(f))
+    return outfiles
+
+
+def build_merged_output_path(video_path, segments, output_folder='', packaging=PACKAGING_PLAIN):
+    # One file for the whole highlight reel, named after the overall span
+    base = os.path.splitext(video_path)[0]
+    ext = output_extension(video_path, packaging)
+    out_dir = output_folder or os.path.dirname(video_path)
+    start = int(min(seg.start for seg in segments))
+    end = int(max(seg.end for seg in segments))
+    return os.path.join(out_dir, f"{os.path.basename(base)}_merged_{start}-{end}{ext}")
+
+
+def build_concat_list(video_path, ranges):
+    """Return an ffconcat script that plays [start, end) of video_path for each range, in order.
+
+    The concat demuxer offsets every entry by the duration of the ones
+    before it, so timestamps stay continuous across the joins. The script
+    is meant to be fed on stdin, hence the explicit file: protocol.
+    """
+    path = os.path.abspath(video_path)
+    if os.sep == '\\':
+        # ffconcat takes forward slashes; on POSIX a backslash is part of the name
+        path = path.replace('\\', '/')
+    path = 'file:' + path.replace("'", "'\\''")
+    lines = ['ffconcat version 1.0']
+    for start_sec, end_sec in ranges:
+        lines.append(f"file '{path}'")
+        lines.append(f"inpoint {start_sec:.6f}")
+        lines.append(f"outpoint {end_sec:.6f}")
+    return '\n'.join(lines) + '\n'
+
+
+def stream_map_args(streams):
+    # None keeps ffmpeg's default selection; otherwise copy exactly these input streams
+    if streams is None:
+        return []
+    args = []
+    for index in streams:
+        args += ['-map', f'0:{index}']
+    return args
+
+
+def hls_segment_prefix(outfile):
+    # Segments keep their names when the playlist is renamed, so name them
+    # after the final playlist rather than its .partial name
+    root = os.path.splitext(outfile)[0]
+    return root[:-len('.partial')] if root.endswith('.partial') else root
+
+
+def hls_segment_files(outfile):
+    """Init and media segment files written next to an HLS playlist."""
+    prefix = hls_segment_prefix(outfile)
+    folder = os.path.dirname(prefix)
+    name = os.path.basename(prefix)
+    try:
+        entries = os.listdir(folder or '.')
+    except OSError:
+        return []
+    return [
+        os.path.join(folder, e) for e in entries
+        if e == f"{name}_init.mp4" or (e.startswith(f"{name}_") and e.endswith('.m4s'))
+    ]
+
+
+def packaging_args(packaging, outfile):
+    """Muxer options that make outfile streamable as soon as ffmpeg exits.
+
+    Fragmented MP4 writes an empty moov up front and a fragment per
+    keyframe, so it never rewrites the file. Faststart lets ffmpeg move the
+    moov to the front itself before it exits. HLS writes fMP4 segments
+    (which carry HEVC as well as H.264) and a VOD playlist.
+    """
+    if packaging == PACKAGING_FASTSTART:
+        return ['-f', 'mp4', '-movflags', '+faststart']
+    if packaging == PACKAGING_FRAGMENTED:
+        return ['-f', 'mp4', '-movflags', '+frag_keyframe+empty_moov+default_base_moof']
+    if packaging == PACKAGING_HLS:
+        prefix = hls_segment_prefix(outfile)
+        return [
+            '-f', 'hls', '-hls_time', str(HLS_SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+            '-hls_segment_type', 'fmp4', '-hls_fmp4_init_filename', f"{os.path.basename(prefix)}_init.mp4",
+            '-hls_segment_filename', f"{prefix}_%05d.m4s"
+        ]
+    return []
+
+
+def build_segment_cmd(video_path, start_sec, end_sec, outfile, streams=None, packaging=PACKAGING_PLAIN):
+    # Stream copy of [start_sec, end_sec); start_sec should be a keyframe
+    return [
+        FFMPEG, '-y', '-ss', str(start_sec), '-i', video_path,
+        '-t', str(end_sec - start_sec), *stream_map_args(streams), '-c', 'copy',
+        *packaging_args(packaging, outfile), outfile
+    ]
+
+
+def build_merge_cmd(outfile, streams=None, packaging=PACKAGING_PLAIN):
+    # Single stream-copy pass reading the concat script from stdin
+    return [
+        FFMPEG, '-y', '-f', 'concat', '-safe', '0', '-protocol_whitelist', 'file,pipe',
+        '-i', 'pipe:0', *stream_map_args(streams), '-c', 'copy', '-avoid_negative_ts', 'make_zero',
+        *packaging_args(packaging, outfile), outfile
+    ]
+
+
+Span = namedtuple('Span', 'start end')  # milliseconds, like Segment in the GUI
+
+
+class ExportJob:
+    """One ffmpeg pass of an export plan: the ranges it reads and the file it writes."""
+    def __init__(self, segments, ranges, outfile, offset, estimated_bytes):
+        self.segments = segments  # 1-based numbers of the marked segments it covers
+        self.ranges = ranges  # snapped (start_sec, end_sec), in output order
+        self.outfile = outfile
+        self.offset = offset  # source byte position of the first read
+        self.estimated_bytes = estimated_bytes
+
+
+class ExportPlan:
+    """The jobs of one export in execution order, plus what the planner noticed."""
+    def __init__(self, jobs, mode, snapped, warnings, packaging=PACKAGING_PLAIN, streams=None):
+        self.jobs = jobs
+        self.mode = mode
+        self.packaging = packaging
+        self.snapped = snapped  # False when no keyframe index was available
+        self.warnings = warnings
+        self.streams = streams  # input stream indices to copy, None for ffmpeg's default selection
+
+    @property
+    def outfiles(self):
+        return [job.outfile for job in self.jobs]
+
+    @property
+    def segment_count(self):
+        return sum(len(job.segments) for job in self.jobs)
+
+    @property
+    def estimated_bytes(self):
+        return sum(job.estimated_bytes for job in self.jobs)
+
+
+def plan_export(video_path, segments, index, mode=EXPORT_MODE_SEPARATE, output_folder='',
+                filename_pattern=DEFAULT_FILENAME_PATTERN, coalesce_gap=0.0, packaging=PACKAGING_PLAIN, info=None,
+                streams=None):
+    """Turn marked segments into an ExportPlan.
+
+    All boundaries are snapped in one sweep over the keyframe index; with
+    no index (None) cuts stay at the marked times and sizes are unknown.
+    Snapped ranges that overlap are reported, because stream copy writes
+    the shared GOPs into both outputs. In separate mode, segments whose
+    snapped ranges lie within coalesce_gap seconds of each other (0 turns
+    this off) become one output, and jobs are ordered by source position
+    so that exporting them one at a time reads the file front to back.
+    Merge mode keeps the marked order, which is the order of the reel.
+    packaging picks the output container (see packaging_args). Given the source's MediaInfo, tracks of the stream
+    selection that an MP4 packaging cannot hold are left out of
+    plan.streams with a warning, rather than failing ffmpeg mid-export.
+    Raises ValueError for unusable output names or when no selected track
+    would be left.
+    """
+    raw = [(seg.start / 1000, seg.end / 1000) for seg in segments]
+    ranges = index.snap_ranges(raw) if index is not None else raw
+
+    def offset(r):
+        return index.offset_at(r[0]) if index is not None else 0
+
+    def estimate(rs):
+        return sum(index.estimate_bytes(a, b) for a, b in rs) if index is not None else 0
+
+    order = sorted(range(len(ranges)), key=lambda i: ranges[i])
+    warnings = []
+    if packaging in MP4_PACKAGINGS and info is not None and streams:
+        unsupported = mp4_unsupported_streams(info, streams)
+        if unsupported:
+            streams = [i for i in streams if i not in {st['index'] for st in unsupported}]
+            if not streams:
+                raise ValueError("None of the selected tracks can be stream-copied into MP4; choose plain packaging.")
+            warnings.append(f"MP4 cannot hold {'; '.join(describe_stream(st) for st in unsupported)}. "
+                            "Left out of this export; plain packaging keeps them.")
+    reach = None  # segment whose range ends last so far
+    # Coalescing always joins overlapping ranges, so only report them otherwise
+    check_overlaps = mode == EXPORT_MODE_MERGE or coalesce_gap <= 0
+    for i in order:
+        if check_overlaps and reach is not None and ranges[i][0] < ranges[reach][1]:
+            shared = min(ranges[reach][1], ranges[i][1]) - ranges[i][0]
+            warnings.append(f"Segments {reach + 1} and {i + 1} overlap by {shared:.2f}s after keyframe snapping; "
+                            "that content is exported twice.")
+        if reach is None or ranges[i][1] > ranges[reach][1]:
+            reach = i
+    if mode == EXPORT_MODE_MERGE:
+        outfile = build_merged_output_path(video_path, segments, output_folder, packaging)
+        job = ExportJob(list(range(1, len(segments) + 1)), ranges, outfile, min(offset(r) for r in ranges), estimate(ranges))
+        return ExportPlan([job], mode, index is not None, warnings, packaging, streams)
+    groups = []  # [members, start_sec, end_sec]
+    for i in order:
+        if coalesce_gap > 0 and groups and ranges[i][0] <= groups[-1][2] + coalesce_gap:
+            groups[-1][0].append(i)
+            groups[-1][2] = max(groups[-1][2], ranges[i][1])
+        else:
+            groups.append([[i], ranges[i][0], ranges[i][1]])
+    for members, _, _ in groups:
+        members.sort()
+    spans = [Span(min(segments[i].start for i in members), max(segments[i].end for i in members)) for members, _, _ in groups]
+    # {index} keeps naming a file after the first marked segment it holds
+    outfiles = build_output_paths(video_path, spans, output_folder, filename_pattern, [members[0] + 1 for members, _, _ in groups], packaging)
+    jobs = [
+        ExportJob([i + 1 for i in members], [(start, end)], outfile, offset((start, end)), estimate([(start, end)]))
+        for (members, start, end), outfile in zip(groups, outfiles)
+    ]
+    jobs.sort(key=lambda job: (job.offset, job.ranges[0]))
+    return ExportPlan(jobs, mode, index is not None, warnings, packaging, streams)
+
+
+# Track types worth copying; data/timecode tracks and attachments are dropped
+COPYABLE_STREAM_TYPES = ('video', 'audio', 'subtitle')
+
+def default_stream_selection(info):
+    """Indices of the video, audio and subtitle tracks of info, skipping cover art."""
+    return [
+        st['index'] for st in info.streams
+        if st.get('codec_type') in COPYABLE_STREAM_TYPES and not st.get('disposition', {}).get('attached_pic')
+    ]
+
+
+def stream_profile(info):
+    """Key identifying a track layout, so sources from the same recorder share a selection."""
+    return '|'.join(
+        f"{st.get('codec_type', '?')}:{st.get('codec_name', '?')}:{st.get('tags', {}).get('language', '')}"
+        for st in info.streams
+    )
+
+
+def describe_stream(st):
+    # e.g. "#1 audio: aac, eng, 2 ch"
+    parts = [st.get('codec_name', '?')]
+    language = st.get('tags', {}).get('language')
+    if language:
+        parts.append(language)
+    if st.get('codec_type') == 'video' and st.get('width'):
+        parts.append(f"{st['width']}x{st.get('height', '?')}")
+    if st.get('codec_type') == 'audio' and st.get('channels'):
+        parts.append(f"{st['channels']} ch")
+    title = st.get('tags', {}).get('title')
+    if title:
+        parts.append(title)
+    return f"#{st.get('index')} {st.get('codec_type', 'unknown')}: {', '.join(parts)}"
+
+
+def mp4_unsupported_streams(info, streams):
+    """Streams of info among the indices in streams that the mp4 muxer cannot stream-copy."""
+    by_index = {st['index']: st for st in info.streams}
+    return [
+        by_index[i] for i in streams
+        if i in by_index and by_index[i].get('codec_name') not in MP4_COPY_CODECS.get(by_index[i].get('codec_type'), ())
+    ]
+
+
+class StreamProfiles:
+    """Stream selections remembered per track layout, persisted as JSON."""
+    def __init__(self, path=STREAM_PROFILES_FILE):
+        self.path = path
+        try:
+            with open(path, encoding='utf-8') as f:
+                self.profiles = json.load(f)
+        except (OSError, ValueError):
+            self.profiles = {}
+
+    def selection_for(self, info):
+        """Remembered selection for info's layout, or the default one."""
+        streams = self.profiles.get(stream_profile(info))
+        known = {st['index'] for st in info.streams}
+        if streams is not None and all(i in known for i in streams):
+            return streams
+        return default_stream_selection(info)
+
+    def remember(self, info, streams):
+        self.profiles[stream_profile(info)] = list(streams)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.profiles, f, indent=1)
+        os.replace(tmp, self.path)
+
+
+class ExportJournal:
+    """Crash-safe manifest of the exports from one source into one folder.
+
+    Every planned output is recorded with its snapped ranges and state
+    ('pending' until ffmpeg succeeds and the file is renamed, then 'done'
+    with its size and probed duration). The journal is rewritten atomically
+    after every change, so after a crash it tells which outputs are
+    complete. Outputs listed here belong to Slyce and may be overwritten.
+    The journal is named after the source's full path, so two sources with
+    the same file name never share one; a journal recorded for another
+    identity of the source owns nothing.
+    """
+    VERSION = 1
+
+    def __init__(self, path, source, entries):
+        self.path = path
+        self.source = source  # identity of the source video the entries were cut from
+        self.entries = entries  # output file name -> entry dict
+
+    @staticmethod
+    def path_for(video_path, out_dir):
+        full = os.path.normcase(os.path.abspath(video_path))
+        name = os.path.splitext(os.path.basename(video_path))[0]
+        digest = hashlib.sha1(full.encode('utf-8', 'surrogateescape')).hexdigest()[:12]
+        return os.path.join(out_dir, f".{name}.{digest}.slyce-journal.json")
+
+    @staticmethod
+    def source_identity(video_path):
+        st = os.stat(video_path)
+        return {'path': os.path.normcase(os.path.abspath(video_path)), 'size': st.st_size, 'mtime': st.st_mtime}
+
+    @classmethod
+    def load(cls, video_path, out_dir):
+        path = cls.path_for(video_path, out_dir)
+        source = cls.source_identity(video_path)
+        entries = {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            # Entries recorded for another source, or for this one before it was
+            # edited or replaced, are not ours to resume or overwrite
+            if data.get('version') == cls.VERSION and data.get('source') == source:
+                entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+        return cls(path, source, entries)
+
+    def owns(self, outfile):
+        return os.path.basename(outfile) in self.entries
+
+    def entry(self, outfile):
+        return self.entries.get(os.path.basename(outfile))
+
+    def plan(self, outfile, ranges):
+        self.entries[os.path.basename(outfile)] = {'ranges': [list(r) for r in ranges], 'state': 'pending'}
+        self.save()
+
+    def complete(self, outfile, size, duration):
+        entry = self.entry(outfile)
+        entry.update({'state': 'done', 'size': size, 'duration': duration})
+        self.save()
+
+    def is_verified(self, outfile, ranges):
+        """True if outfile was completed for exactly these ranges and still matches on disk."""
+        entry = self.entry(outfile)
+        if not entry or entry.get('state') != 'done':
+            return False
+        if len(entry['ranges']) != len(ranges) or any(
+                abs(a - b) > 1e-3 for old, new in zip(entry['ranges'], ranges) for a, b in zip(old, new)):
+            return False
+        try:
+            if os.path.getsize(outfile) != entry['size']:
+                return False
+            return abs(MediaInfo.probe(outfile).duration - entry['duration']) <= VERIFY_DURATION_TOLERANCE
+        except (OSError, subprocess.CalledProcessError, ValueError):
+            return False
+
+    def save(self):
+        data = {'version': self.VERSION, 'source': self.source, 'entries': self.entries}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def link_or_copy(src, dest):
+    # A hardlink costs no space or I/O; fall back to a copy across volumes
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copyfile(src, dest)
+
+
+class ExportCache:
+    """Content-addressed store of finished outputs, evicted least recently used first.
+
+    Entries are keyed by the source fingerprint and everything that shapes
+    the output (snapped ranges, export mode, extension, stream selection),
+    so an identical request can be served by linking or copying the cached
+    file instead of running ffmpeg again. An output is only stored as a
+    hardlink: on another volume it would have to be copied, doubling the
+    export's writes. Entries can thus share their inode with the user's
+    files, so the LRU clock lives in a sidecar next to each entry, entries
+    whose file was edited in place are dropped on fetch, and bytes still
+    linked to a user's file are not counted against max_bytes.
+    """
+    SIDECAR_SUFFIX = '.used'
+
+    def __init__(self, root=EXPORT_CACHE_DIR, max_bytes=DEFAULT_EXPORT_CACHE_GB * 1024 ** 3):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(fingerprint, ranges, mode, ext, streams=None, packaging=PACKAGING_PLAIN):
+        params = {
+            'source': fingerprint, 'ranges': [[round(a, 6), round(b, 6)] for a, b in ranges],
+            'mode': mode, 'ext': ext.lower(), 'streams': streams,
+        }
+        if packaging != PACKAGING_PLAIN:
+            # Left out for plain outputs so earlier cache entries stay valid
+            params['packaging'] = packaging
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def entry_path(self, key, ext):
+        return os.path.join(self.root, key[:2], key + ext.lower())
+
+    def touch(self, path, st=None):
+        # The sidecar's mtime is the LRU clock; with st it also records the
+        # entry's size and mtime, to notice a shared file edited in place
+        sidecar = path + self.SIDECAR_SUFFIX
+        if st is not None:
+            with open(sidecar, 'w') as f:
+                json.dump({'size': st.st_size, 'mtime_ns': st.st_mtime_ns}, f)
+        else:
+            with open(sidecar, 'a'):
+                pass
+            os.utime(sidecar)
+
+    def unchanged(self, path):
+        try:
+            with open(path + self.SIDECAR_SUFFIX) as f:
+                stored = json.load(f)
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return False
+        return (st.st_size, st.st_mtime_ns) == (stored.get('size'), stored.get('mtime_ns'))
+
+    def remove(self, path):
+        for p in (path, path + self.SIDECAR_SUFFIX):
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+
+    def fetch(self, key, ext, dest):
+        """Place the cached output for key at dest; returns False on a miss."""
+        src = self.entry_path(key, ext)
+        if not os.path.exists(src):
+            return False
+        if not self.unchanged(src):
+            self.remove(src)
+            return False
+        try:
+            self.touch(src)
+            link_or_copy(src, dest)
+        except OSError:
+            return False
+        return True
+
+    def store(self, key, ext, src):
+        """Hardlink src into the cache; returns False where no hardlink is possible."""
+        dest = self.entry_path(key, ext)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = dest + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(src, tmp)
+        except OSError:
+            return False
+        os.replace(tmp, dest)
+        self.touch(dest, os.stat(dest))
+        return True
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes.
+
+        Returns the bytes counted: entries still hardlinked to a file
+        outside the cache take no extra space, and deleting them would free
+        nothing, so they are neither counted nor evicted.
+        """
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            names = set(filenames)
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.endswith(self.SIDECAR_SUFFIX):
+                    if name[:-len(self.SIDECAR_SUFFIX)] not in names:
+                        self.remove(path)  # its entry is gone
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if st.st_nlink > 1:
+                    continue
+                try:
+                    used = os.stat(path + self.SIDECAR_SUFFIX).st_mtime
+                except OSError:
+                    used = st.st_mtime
+                entries.append((used, st.st_size, path))
+                total += st.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            if not os.path.exists(path):
+                total -= size
+        return total
+
+
+def needs_proxy(info):
+    # A proxy only helps when the source is larger than the proxy itself
+    video = info.first_stream('video')
+    try:
+        return int(video.get('height', 0)) > PROXY_HEIGHT
+    except (TypeError, ValueError):
+        return False
+
+
+def build_proxy_cmd(video_path, outfile):
+    """ffmpeg command for a playback proxy of video_path.
+
+    Timestamps start at zero like the original's, so positions in the
+    proxy are positions in the source. Every PROXY_GOP_FRAMES frame is a
+    keyframe and there are no B-frames, which keeps seeks and decoding cheap.
+    """
+    return [
+        FFMPEG, '-y', '-i', video_path, '-map', '0:v:0', '-map', '0:a:0?',
+        '-vf', f'scale=-2:{PROXY_HEIGHT}', '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'fastdecode',
+        '-crf', '28', '-g', str(PROXY_GOP_FRAMES), '-keyint_min', str(PROXY_GOP_FRAMES), '-sc_threshold', '0', '-bf', '0',
+        '-c:a', 'aac', '-b:a', '96k', '-ac', '2', '-movflags', '+faststart', outfile
+    ]
+
+
+class ProxyCache(ExportCache):
+    """Playback proxies, one per source version, with the export cache's layout and LRU eviction."""
+    def __init__(self, root=PROXY_DIR, max_bytes=DEFAULT_PROXY_CACHE_GB * 1024 ** 3):
+        super().__init__(root, max_bytes)
+
+    @staticmethod
+    def proxy_key(fingerprint):
+        params = {'source': fingerprint, 'height': PROXY_HEIGHT, 'gop': PROXY_GOP_FRAMES}
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+    def proxy_path(self, fingerprint):
+        return self.entry_path(self.proxy_key(fingerprint), '.mp4')
+
+    def lookup(self, fingerprint):
+        """Return the finished proxy for a source fingerprint, or None."""
+        path = self.proxy_path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            self.touch(path)
+        except OSError:
+            pass
+        return path
+
+
+def partial_path(outfile):
+    # Same folder (so the final rename is atomic) and same extension (so
+    # ffmpeg still picks the right muxer)
+    root, ext = os.path.splitext(outfile)
+    return f"{root}.partial{ext}"
+
+
+def check_free_space(out_dir, needed_bytes):
+    """Return (ok, free_bytes) for writing needed_bytes plus a safety margin to out_dir."""
+    free = shutil.disk_usage(out_dir).free
+    return free >= needed_bytes + FREE_SPACE_MARGIN_BYTES, free
+
+
+def format_bytes(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
@@ -0,0 +1,231 @@
+# projects.py
+# Project store: per-video segments, media info and export history in one
+# SQLite database, so marked segments survive switching videos, restarts
+# and crashes. The database is plain SQLite and can be queried across the
+# whole library with any SQLite client. Nothing in here imports Qt.
+import os
+import json
+import time
+import sqlite3
+
+from engine import APP_DATA_DIR, get_fingerprint
+
+PROJECTS_DB = os.path.join(APP_DATA_DIR, 'projects.sqlite')
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,            -- normalised absolute path
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    fingerprint TEXT,              -- engine content fingerprint, set once the video has segments
+    media_info TEXT,               -- ffprobe result as JSON {duration, streams, format}
+    opened REAL                    -- last time the video was loaded
+);
+CREATE UNIQUE INDEX IF NOT EXISTS videos_path ON videos(path);
+CREATE INDEX IF NOT EXISTS videos_identity ON videos(size, mtime);
+CREATE INDEX IF NOT EXISTS videos_fingerprint ON videos(fingerprint);
+
+CREATE TABLE IF NOT EXISTS segments (
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,     -- order of marking, from 0
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    PRIMARY KEY (video_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS exports (
+    id INTEGER PRIMARY KEY,
+    video_id INTEGER NOT NULL REFERENCES videos(id) ON DELETE CASCADE,
+    finished REAL NOT NULL,
+    ok INTEGER NOT NULL,
+    destination TEXT NOT NULL,     -- output folder or stream sink
+    mode TEXT NOT NULL,
+    packaging TEXT NOT NULL,       -- file packaging; plain when streamed
+    stream_format TEXT,            -- mpegts or fmp4 when streamed to a sink, NULL for files
+    segments TEXT NOT NULL,        -- JSON [[start_ms, end_ms], ...]
+    message TEXT
+);
+CREATE INDEX IF NOT EXISTS exports_video ON exports(video_id, finished);
+"""
+
+
+class ProjectStore:
+    """Per-video projects in one SQLite database.
+
+    A video is found by its path, or, when it was moved or renamed, by size,
+    mtime and content fingerprint, so its segments follow the file. Edits are
+    queued in memory and written together by flush(), in one transaction;
+    the caller decides how often to flush. Segment writes are diffs against
+    what is already stored, so marking one more segment writes one row.
+    """
+    def __init__(self, path=PROJECTS_DB):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        # WAL with synchronous=NORMAL: commits need no fsync, and a crash
+        # loses at most the last transaction, never the database
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('PRAGMA foreign_keys=ON')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with self.db:
+                self.db.executescript(SCHEMA)
+                if version == 1:
+                    # Version 1 kept the stream format of streamed exports in packaging
+                    self.db.execute('ALTER TABLE exports ADD COLUMN stream_format TEXT')
+                    self.db.execute("UPDATE exports SET stream_format = packaging, packaging = 'plain' "
+                                    "WHERE packaging IN ('mpegts', 'fmp4')")
+                self.db.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self.ids = {}  # normalised path -> video id
+        self.stored = {}  # video id -> segments as they are in the database
+        self.pending_segments = {}  # video id -> segments to write on the next flush
+        self.pending_media = {}  # video id -> media info JSON
+        self.pending_opened = {}  # video id -> time loaded
+        self.pending_exports = []  # rows for the exports table
+
+    @staticmethod
+    def normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    def video_id(self, path):
+        """Id of the video at path, adopting a moved project or adding a new row.
+
+        Changes to the videos row are committed at once rather than queued:
+        later queued rows refer to its id, and an open write transaction
+        would hold the WAL writer lock until the next flush.
+        """
+        key = self.normalize(path)
+        vid = self.ids.get(key)
+        if vid is not None:
+            return vid
+        st = os.stat(path)
+        row = self.db.execute('SELECT id, size, mtime FROM videos WHERE path = ?', (key,)).fetchone()
+        if row is not None:
+            vid = row[0]
+            if (row[1], row[2]) != (st.st_size, st.st_mtime):
+                # Replaced in place (re-downloaded, remuxed): keep the project, drop the stale identity
+                with self.db:
+                    self.db.execute('UPDATE videos SET size = ?, mtime = ?, fingerprint = NULL, media_info = NULL WHERE id = ?',
+                                    (st.st_size, st.st_mtime, vid))
+        else:
+            vid = self.find_moved(path, key, st)
+            if vid is None:
+                with self.db:
+                    vid = self.db.execute('INSERT INTO videos (path, size, mtime) VALUES (?, ?, ?)',
+                                          (key, st.st_size, st.st_mtime)).lastrowid
+        self.ids[key] = vid
+        return vid
+
+    def find_moved(self, path, key, st):
+        # Same size and mtime is cheap to look up; the fingerprint confirms it
+        # and is only computed when such a candidate's file has gone missing
+        candidates = [
+            (vid, old_path, fingerprint) for vid, old_path, fingerprint in self.db.execute(
+                'SELECT id, path, fingerprint FROM videos WHERE size = ? AND mtime = ? AND fingerprint IS NOT NULL',
+                (st.st_size, st.st_mtime))
+            if not os.path.exists(old_path)
+        ]
+        if not candidates:
+            return None
+        fingerprint = get_fingerprint(path)
+        for vid, old_path, stored in candidates:
+            if stored == fingerprint:
+                with self.db:
+                    self.db.execute('UPDATE videos SET path = ? WHERE id = ?', (key, vid))
+                self.ids.pop(old_path, None)
+                return vid
+        return None
+
+    def load_segments(self, path):
+        """Segments of the video at path as (start_ms, end_ms) pairs, in marking order."""
+        vid = self.video_id(path)
+        self.pending_opened[vid] = time.time()
+        if vid in self.pending_segments:
+            return list(self.pending_segments[vid])
+        return list(self.stored_segments(vid))
+
+    def stored_segments(self, vid):
+        if vid not in self.stored:
+            self.stored[vid] = self.db.execute(
+                'SELECT start_ms, end_ms FROM segments WHERE video_id = ? ORDER BY position', (vid,)).fetchall()
+        return self.stored[vid]
+
+    def set_segments(self, path, segments):
+        """Queue the full segment list of a video; flush() writes only what changed."""
+        vid = self.video_id(path)
+        self.stored_segments(vid)
+        self.pending_segments[vid] = [(int(start), int(end)) for start, end in segments]
+
+    def set_media_info(self, path, info):
+        vid = self.video_id(path)
+        self.pending_media[vid] = json.dumps({'duration': info.duration, 'streams': info.streams, 'format': info.format_info})
+
+    def record_export(self, path, ok, destination, mode, packaging, stream_format, segments, message):
+        self.pending_exports.append((self.video_id(path), time.time(), int(ok), destination, mode, packaging,
+                                     stream_format, json.dumps([[int(start), int(end)] for start, end in segments]), message))
+
+    def export_history(self, path):
+        """Finished exports of the video at path, newest first, as dicts."""
+        self.flush()
+        rows = self.db.execute(
+            'SELECT finished, ok, destination, mode, packaging, stream_format, segments, message FROM exports '
+            'WHERE video_id = ? ORDER BY finished DESC', (self.video_id(path),))
+        return [
+            {'finished': finished, 'ok': bool(ok), 'destination': destination, 'mode': mode, 'packaging': packaging,
+             'stream_format': stream_format, 'segments': json.loads(segments), 'message': message}
+            for finished, ok, destination, mode, packaging, stream_format, segments, message in rows
+        ]
+
+    @property
+    def dirty(self):
+        return bool(self.pending_segments or self.pending_media or self.pending_opened or self.pending_exports
+                    or self.db.in_transaction)
+
+    def flush(self):
+        """Write every queued change in one transaction."""
+        if not self.dirty:
+            return
+        with self.db:
+            for vid, segments in self.pending_segments.items():
+                self.write_segments(vid, segments)
+            self.db.executemany('UPDATE videos SET media_info = ? WHERE id = ?',
+                                [(info, vid) for vid, info in self.pending_media.items()])
+            self.db.executemany('UPDATE videos SET opened = ? WHERE id = ?',
+                                [(opened, vid) for vid, opened in self.pending_opened.items()])
+            self.db.executemany(
+                'INSERT INTO exports (video_id, finished, ok, destination, mode, packaging, stream_format, segments, message) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', self.pending_exports)
+        for vid, segments in self.pending_segments.items():
+            self.stored[vid] = segments
+        self.pending_segments.clear()
+        self.pending_media.clear()
+        self.pending_opened.clear()
+        self.pending_exports.clear()
+
+    def write_segments(self, vid, segments):
+        old = self.stored[vid]
+        # Edits are appends, undos and redos, so the lists nearly always share a long prefix
+        keep = 0
+        for a, b in zip(old, segments):
+            if a != b:
+                break
+            keep += 1
+        if keep < len(old):
+            self.db.execute('DELETE FROM segments WHERE video_id = ? AND position >= ?', (vid, keep))
+        self.db.executemany('INSERT INTO segments (video_id, position, start_ms, end_ms) VALUES (?, ?, ?, ?)',
+                            [(vid, position, start, end) for position, (start, end) in enumerate(segments[keep:], keep)])
+        if segments and not old:
+            # First segments of this video: record its fingerprint so the project can follow a move
+            path = self.db.execute('SELECT path FROM videos WHERE id = ? AND fingerprint IS NULL', (vid,)).fetchone()
+            if path is not None:
+                try:
+                    self.db.execute('UPDATE videos SET fingerprint = ? WHERE id = ?', (get_fingerprint(path[0]), vid))
+                except OSError:
+                    pass
+
+    def close(self):
+        self.flush()
+        self.db.close()
@@ -0,0 +1,352 @@
+# sinks.py
+# Export sinks that stream instead of writing files: this process's stdout,
+# one named pipe carrying every output, or one named pipe per output. FFmpeg
+# muxes straight into the pipe, so nothing is materialised on disk. Nothing
+# in here imports Qt.
+import os
+import sys
+import stat
+import time
+import errno
+import tempfile
+import subprocess
+
+from engine import FFMPEG, build_concat_list, stream_map_args, process_kwargs, lower_priority
+
+SINK_FILE = 'file'
+SINK_STDOUT = 'stdout'
+SINK_PIPE = 'pipe'
+SINK_PIPES = 'pipes'
+SINKS = (SINK_FILE, SINK_STDOUT, SINK_PIPE, SINK_PIPES)
+
+STREAM_FORMAT_MPEGTS = 'mpegts'
+STREAM_FORMAT_FMP4 = 'fmp4'
+STREAM_FORMATS = (STREAM_FORMAT_MPEGTS, STREAM_FORMAT_FMP4)
+STREAM_FORMAT_EXTENSIONS = {STREAM_FORMAT_MPEGTS: '.ts', STREAM_FORMAT_FMP4: '.mp4'}
+
+FRAMING_NONE = 'none'
+FRAMING_CHUNKED = 'chunked'
+FRAMINGS = (FRAMING_NONE, FRAMING_CHUNKED)
+FRAME_MAGIC = b'SLYCE-SEGMENT'
+FRAME_ERROR_MAGIC = b'SLYCE-ERROR'
+
+# Bytes relayed per read from ffmpeg; read1 hands over whatever is ready, so this only caps it
+STREAM_CHUNK_BYTES = 256 * 1024
+# How often to retry opening a named pipe that has no reader yet
+PIPE_OPEN_POLL_SECONDS = 0.2
+# Tail of ffmpeg's error output kept for a failure message
+ERROR_TAIL_BYTES = 2000
+
+
+class SinkError(Exception):
+    pass
+
+
+def stream_format_args(fmt):
+    if fmt == STREAM_FORMAT_MPEGTS:
+        # Each output restarts its timestamps; flag that so readers of a
+        # concatenated stream resync instead of dropping packets
+        return ['-f', 'mpegts', '-mpegts_flags', '+initial_discontinuity']
+    # Fragmented MP4 never seeks back: moov up front, then a moof per keyframe
+    return ['-f', 'mp4', '-movflags', '+frag_keyframe+empty_moov+default_base_moof']
+
+
+def build_stream_cmd(video_path, ranges, target, fmt, streams=None):
+    """ffmpeg command that stream-copies ranges of video_path to target.
+
+    target is 'pipe:1' to read the stream from ffmpeg's stdout, or a named
+    pipe path. Returns (cmd, stdin_text); several ranges are joined with the
+    concat demuxer, whose script is fed on stdin.
+    """
+    if len(ranges) == 1:
+        (start_sec, end_sec), = ranges
+        return [
+            FFMPEG, '-v', 'error', '-y', '-ss', str(start_sec), '-i', video_path,
+            '-t', str(end_sec - start_sec), *stream_map_args(streams), '-c', 'copy',
+            *stream_format_args(fmt), target
+        ], None
+    return [
+        FFMPEG, '-v', 'error', '-y', '-f', 'concat', '-safe', '0', '-protocol_whitelist', 'file,pipe',
+        '-i', 'pipe:0', *stream_map_args(streams), '-c', 'copy', '-avoid_negative_ts', 'make_zero',
+        *stream_format_args(fmt), target
+    ], build_concat_list(video_path, ranges)
+
+
+def frame_header(number, ranges, name):
+    # One text line ahead of each framed output: number, span in the source and the name it would have as a file
+    return f"{FRAME_MAGIC.decode()} {number} {ranges[0][0]:.3f} {ranges[-1][1]:.3f} {name}\n".encode()
+
+
+def frame_chunk(data):
+    return b'%x\r\n' % len(data) + data + b'\r\n'
+
+
+FRAME_END = b'0\r\n\r\n'
+
+
+def frame_error(number, reason):
+    # Ends an output that failed or was cancelled partway, in place of the next chunk length
+    return f"{FRAME_ERROR_MAGIC.decode()} {number} {' '.join(reason.split())}\n".encode()
+
+
+def read_frames(f):
+    """Split a chunk-framed stream back into outputs.
+
+    Yields (number, start_sec, end_sec, name, data) per output; data is the
+    whole output, so this is meant for tools and checks rather than huge clips.
+    Raises SinkError when an output ends in an error line or the stream ends
+    inside one.
+    """
+    while True:
+        header = f.readline()
+        if not header:
+            return
+        fields = header.rstrip(b'\n').split(b' ', 4)
+        if len(fields) != 5 or fields[0] != FRAME_MAGIC:
+            raise SinkError(f"Not a framed stream: {header[:40]!r}")
+        _, number, start, end, name = fields
+        parts = []
+        while True:
+            line = f.readline()
+            if line.startswith(FRAME_ERROR_MAGIC + b' '):
+                reason = line.rstrip(b'\n').split(b' ', 2)[2:] or [b'unknown error']
+                raise SinkError(f"Output {int(number)} failed: {reason[0].decode(errors='replace')}")
+            try:
+                size = int(line.strip(), 16)
+            except ValueError:
+                raise SinkError(f"Stream ended inside output {int(number)}" if not line else f"Bad chunk length: {line[:40]!r}")
+            if size == 0:
+                f.readline()
+                break
+            data = f.read(size)
+            if len(data) != size or f.readline() != b'\r\n':
+                raise SinkError(f"Stream ended inside output {int(number)}")
+            parts.append(data)
+        yield int(number), float(start), float(end), name.decode(), b''.join(parts)
+
+
+def ensure_fifo(path):
+    """Make sure path is a named pipe; returns True if it was created here.
+
+    On Windows the reader creates the pipe (\\\\.\\pipe\\name) and we only
+    connect to it.
+    """
+    if sys.platform == 'win32':
+        if not path.startswith('\\\\.\\pipe\\'):
+            raise SinkError(f"Not a named pipe path: {path} (expected \\\\.\\pipe\\<name>)")
+        return False
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        os.mkfifo(path)
+        return True
+    if not stat.S_ISFIFO(mode):
+        raise SinkError(f"{path} exists and is not a named pipe")
+    return False
+
+
+def open_fifo(path, cancelled):
+    """Open a named pipe for writing once a reader has it open, or return None if cancelled while waiting."""
+    if sys.platform == 'win32':
+        return open(path, 'wb')
+    while True:
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            # ENXIO: nobody is reading yet. Polling instead of a blocking
+            # open keeps the wait cancellable
+            if e.errno != errno.ENXIO:
+                raise
+            if cancelled():
+                return None
+            time.sleep(PIPE_OPEN_POLL_SECONDS)
+            continue
+        os.set_blocking(fd, True)
+        return os.fdopen(fd, 'wb')
+
+
+class StreamSink:
+    """Where a streamed export goes, and how the outputs are separated.
+
+    SINK_STDOUT and SINK_PIPE relay every output, one after another, into a
+    single stream: this process's stdout or the named pipe at target. With
+    FRAMING_CHUNKED each output is wrapped as
+
+        SLYCE-SEGMENT <number> <start_sec> <end_sec> <name>\\n
+        <hex length>\\r\\n<bytes>\\r\\n ...  0\\r\\n\\r\\n
+
+    so a reader can split them without parsing the container (read_frames
+    does that). An output that fails or is cancelled partway ends with a
+    SLYCE-ERROR <number> <reason>\\n line instead of the zero-length chunk.
+    FRAMING_NONE just concatenates, which MPEG-TS readers accept.
+    SINK_PIPES gives each output its own named pipe in the folder
+    target, named like the file it replaces, and ffmpeg writes into it
+    directly; each pipe is opened when its reader is ready, in plan order.
+    """
+    def __init__(self, kind, target=None, fmt=STREAM_FORMAT_MPEGTS, framing=FRAMING_CHUNKED):
+        if kind not in (SINK_STDOUT, SINK_PIPE, SINK_PIPES):
+            raise SinkError(f"Not a streaming sink: {kind}")
+        if fmt not in STREAM_FORMATS:
+            raise SinkError(f"Unknown stream format: {fmt}")
+        if framing not in FRAMINGS:
+            raise SinkError(f"Unknown framing: {framing}")
+        if kind != SINK_STDOUT and not target:
+            raise SinkError("A named pipe sink needs a path")
+        if kind == SINK_PIPES:
+            if sys.platform == 'win32':
+                raise SinkError("One pipe per output needs POSIX named pipes; use a single pipe with framing")
+            if not os.path.isdir(target):
+                raise SinkError(f"Pipe folder does not exist: {target}")
+        self.kind = kind
+        self.target = target
+        self.format = fmt
+        self.framing = framing
+
+    def describe(self):
+        if self.kind == SINK_STDOUT:
+            where = 'stdout'
+        elif self.kind == SINK_PIPE:
+            where = f"named pipe {self.target}"
+        else:
+            where = f"one named pipe per output in {self.target}"
+        framing = ', chunk-framed' if self.framing == FRAMING_CHUNKED and self.kind != SINK_PIPES else ''
+        return f"{where} ({self.format}{framing})"
+
+    def output_name(self, job):
+        # The file name the output would have had, with the stream format's extension
+        return os.path.splitext(os.path.basename(job.outfile))[0] + STREAM_FORMAT_EXTENSIONS[self.format]
+
+    def pipe_path(self, job):
+        return os.path.join(self.target, self.output_name(job))
+
+    def export(self, video_path, jobs, streams=None, on_process=lambda process: None, cancelled=lambda: False,
+               progress=lambda number, job: None):
+        """Stream every job of a plan, in order. Returns False if cancelled.
+
+        on_process receives each ffmpeg process as it starts, so the caller
+        can kill it to cancel; cancelled is polled between steps. Raises
+        SinkError when ffmpeg fails or the reader goes away.
+        """
+        if self.kind == SINK_PIPES:
+            return self.export_pipes(video_path, jobs, streams, on_process, cancelled, progress)
+        if self.kind == SINK_STDOUT:
+            if sys.stdout is None:
+                raise SinkError("There is no stdout to stream to")
+            sys.stdout.flush()
+            out = sys.stdout.buffer
+        else:
+            created = ensure_fifo(self.target)
+            out = open_fifo(self.target, cancelled)
+            if out is None:
+                self.remove_fifo(self.target, created)
+                return False
+        try:
+            for number, job in enumerate(jobs, 1):
+                if cancelled():
+                    return False
+                progress(number, job)
+                if self.framing == FRAMING_CHUNKED:
+                    out.write(frame_header(number, job.ranges, self.output_name(job)))
+                cmd, stdin_text = build_stream_cmd(video_path, job.ranges, 'pipe:1', self.format, streams)
+                try:
+                    finished = self.relay(cmd, stdin_text, out, on_process, cancelled)
+                except SinkError as e:
+                    self.end_frame_early(out, number, str(e))
+                    raise
+                if not finished:
+                    self.end_frame_early(out, number, "cancelled")
+                    return False
+                if self.framing == FRAMING_CHUNKED:
+                    out.write(FRAME_END)
+                out.flush()
+            return True
+        except BrokenPipeError:
+            raise SinkError("The reader closed the stream")
+        finally:
+            if self.kind == SINK_PIPE:
+                try:
+                    out.close()
+                except BrokenPipeError:
+                    pass
+                self.remove_fifo(self.target, created)
+
+    def relay(self, cmd, stdin_text, out, on_process, cancelled):
+        chunked = self.framing == FRAMING_CHUNKED
+        with tempfile.TemporaryFile() as errors:
+            process = subprocess.Popen(
+                cmd, stdin=subprocess.PIPE if stdin_text is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE, stderr=errors, **process_kwargs(export=True)
+            )
+            lower_priority(process.pid, export=True)
+            on_process(process)
+            try:
+                if stdin_text is not None:
+                    process.stdin.write(stdin_text.encode())
+                    process.stdin.close()
+                while True:
+                    data = process.stdout.read1(STREAM_CHUNK_BYTES)
+                    if not data:
+                        break
+                    out.write(frame_chunk(data) if chunked else data)
+            except BaseException:
+                # e.g. the reader went away; don't leave ffmpeg blocked on a full pipe
+                process.kill()
+                raise
+            finally:
+                process.stdout.close()
+                process.wait()
+            if cancelled():
+                return False
+            if process.returncode != 0:
+                raise SinkError(f"ffmpeg failed: {self.error_tail(errors)}")
+        return True
+
+    def end_frame_early(self, out, number, reason):
+        # Tell a framed reader the output is incomplete; best effort, the reader may be gone
+        if self.framing != FRAMING_CHUNKED:
+            return
+        try:
+            out.write(frame_error(number, reason))
+            out.flush()
+        except OSError:
+            pass
+
+    def export_pipes(self, video_path, jobs, streams, on_process, cancelled, progress):
+        for number, job in enumerate(jobs, 1):
+            if cancelled():
+                return False
+            path = self.pipe_path(job)
+            created = ensure_fifo(path)
+            progress(number, job)
+            cmd, stdin_text = build_stream_cmd(video_path, job.ranges, path, self.format, streams)
+            try:
+                with tempfile.TemporaryFile() as errors:
+                    # ffmpeg blocks opening the pipe until its reader connects; killing it cancels the wait
+                    process = subprocess.Popen(
+                        cmd, stdin=subprocess.PIPE if stdin_text is not None else subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL, stderr=errors, **process_kwargs(export=True)
+                    )
+                    lower_priority(process.pid, export=True)
+                    on_process(process)
+                    process.communicate(stdin_text.encode() if stdin_text is not None else None)
+                    if cancelled():
+                        return False
+                    if process.returncode != 0:
+                        raise SinkError(f"ffmpeg failed for {os.path.basename(path)}: {self.error_tail(errors)}")
+            finally:
+                self.remove_fifo(path, created)
+        return True
+
+    @staticmethod
+    def error_tail(errors):
+        errors.seek(0)
+        return errors.read()[-ERROR_TAIL_BYTES:].decode(errors='replace').strip()
+
+    @staticmethod
+    def remove_fifo(path, created):
+        # Only pipes made here; one the reader set up is theirs to keep
+        if created:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
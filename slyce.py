@@ -26,23 +26,67 @@ print('VLC_PLUGIN_PATH:', os.environ.get('VLC_PLUGIN_PATH'))
 import subprocess
 import logging
 import logging.handlers
+import queue
+import html
+import threading
+import sqlite3
+import tempfile
+from collections import OrderedDict, deque
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QPushButton, QLabel, QFileDialog, QVBoxLayout, QHBoxLayout, QMessageBox, QListWidget, QListWidgetItem, QSlider, QStatusBar, QSplitter, QMenuBar, QAction, QMenu, QDialog, QFormLayout, QLineEdit, QCheckBox, QComboBox, QProgressBar, QStyleFactory, QTextEdit, QShortcut, QSizePolicy
+    QApplication, QMainWindow, QWidget, QPushButton, QLabel, QFileDialog, QVBoxLayout, QHBoxLayout, QMessageBox, QListWidget, QListWidgetItem, QSlider, QStatusBar, QSplitter, QMenuBar, QAction, QMenu, QDialog, QFormLayout, QLineEdit, QCheckBox, QDialogButtonBox, QSpinBox, QComboBox, QProgressBar, QStyleFactory, QPlainTextEdit, QShortcut, QSizePolicy, QStyle,
+    QTableWidget, QTableWidgetItem, QHeaderView, QDoubleSpinBox
 )
-from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QTime, QDateTime, QObject
-from PyQt5.QtGui import QPainter, QColor, QPixmap, QIcon, QKeySequence
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QTime, QObject, QElapsedTimer, QMutex, QWaitCondition, QPoint, QRunnable, QThreadPool, QLineF
+from PyQt5.QtGui import QPainter, QColor, QPixmap, QIcon, QKeySequence, QImage, QPen
 from styles import MAIN_STYLE, SEGMENT_LIST_STYLE, LOG_TEXTEDIT_STYLE, SECTION_TITLE_STYLE, MAIN_BUTTON_STYLE, DISABLED_BUTTON_STYLE, LOAD_BTN_STYLE
 
-FFMPEG = os.path.join(base_path, 'bin', 'ffmpeg.exe')
+from diagnostics import Diagnostics, diagnostics_requested
+from waveform import WaveformPeaks, waveform_cache_path
+from projects import ProjectStore
+from sinks import (
+    StreamSink, SinkError, SINK_FILE, SINK_PIPE, SINK_PIPES, STREAM_FORMAT_MPEGTS, STREAM_FORMAT_FMP4,
+    FRAMING_NONE, FRAMING_CHUNKED
+)
+from engine import (
+    FFMPEG, subprocess_flags, DEFAULT_FILENAME_PATTERN, EXPORT_MODE_SEPARATE, EXPORT_MODE_MERGE,
+    get_keyframe_index, peek_keyframe_index, plan_export, check_filename_pattern, build_concat_list,
+    build_segment_cmd, build_merge_cmd, partial_path, check_free_space, format_bytes, get_media_info, peek_media_info,
+    kill_background_processes, ExportJournal, MediaInfo, ExportCache, get_fingerprint, DEFAULT_EXPORT_CACHE_GB,
+    StreamProfiles, describe_stream, ProxyCache, needs_proxy, build_proxy_cmd, process_kwargs, lower_priority,
+    ResourceGovernor, PACKAGING_PLAIN, PACKAGING_FASTSTART, PACKAGING_FRAGMENTED, PACKAGING_HLS, hls_segment_files
+)
+
+# Scrubbing: a seek counts as settled once VLC reports a time within the
+# tolerance of the target, or after the timeout (paused/slow decoders).
+SEEK_SETTLE_TOLERANCE_MS = 250
+SEEK_SETTLE_TIMEOUT_MS = 400
+# Scrub previews are decoded on a fixed time grid so nearby positions share
+# one keyframe decode; the cache is bounded by decoded image bytes.
+PREVIEW_BUCKET_MS = 2000
+PREVIEW_WIDTH = 192
+PREVIEW_CACHE_BYTES = 64 * 1024 * 1024
+# Background playlist probing: at most this many ffprobe workers at once
+PROBE_CONCURRENCY = 2
+# Log panel: oldest lines are dropped beyond this many blocks
+LOG_PANEL_MAX_BLOCKS = 5000
+# Height of the audio waveform lane under the seek bar, in pixels
+WAVEFORM_LANE_HEIGHT = 48
+# Export: how often the export thread checks its running ffmpeg passes
+EXPORT_POLL_MS = 100
+# Project store: edits made within this many ms are committed together
+PROJECT_FLUSH_MS = 500
+# Keyframe stepping: a position this close to a keyframe counts as on it,
+# so ms rounding of the seek target never lands on the same keyframe again
+KEYFRAME_STEP_SLACK_MS = 1
 
-# Helper for subprocess creationflags to suppress console on Windows
-subprocess_flags = 0
-if sys.platform == "win32":
-    subprocess_flags = subprocess.CREATE_NO_WINDOW
+log_listener = None
 
 def setup_logger():
+    global log_listener
     logger = logging.getLogger("Slyce")
-    logger.setLevel(logging.DEBUG)
+    logger.setLevel(logging.DEBUG if os.environ.get('SLYCE_DEBUG') else logging.INFO)
+    if log_listener is not None:
+        return logger
     # Create logs directory if it doesn't exist
     log_dir = os.path.join(base_path, 'logs')
     os.makedirs(log_dir, exist_ok=True)
@@ -50,39 +94,89 @@ def setup_logger():
     handler = logging.handlers.TimedRotatingFileHandler(log_file, when='midnight', backupCount=7, encoding='utf-8')
     formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s')
     handler.setFormatter(formatter)
-    if not logger.hasHandlers():
-        logger.addHandler(handler)
+    # The calling thread only enqueues records; file I/O happens on the listener thread
+    log_queue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    log_listener = logging.handlers.QueueListener(log_queue, handler)
+    log_listener.start()
     return logger
 
+def stop_logger():
+    # Flush queued records to disk; safe to call more than once
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
 class Segment:
     def __init__(self, start, end):
         self.start = start
         self.end = end
+        self.snapped = None  # (start, end) ms where a stream-copy cut lands, once the keyframe index is known
     def __str__(self):
-        return f"{self.format_time(self.start)} - {self.format_time(self.end)}"
+        text = f"{self.format_time(self.start)} - {self.format_time(self.end)}"
+        if self.snapped is None:
+            return text
+        lead, tail = self.start - self.snapped[0], self.snapped[1] - self.end
+        if not lead and not tail:
+            return f"{text}  (on keyframes)"
+        return f"{text}  (+{lead / 1000:.2f}s before, +{tail / 1000:.2f}s after)"
     @staticmethod
     def format_time(ms):
         s = int(ms / 1000)
         return f"{s//3600:02}:{(s%3600)//60:02}:{s%60:02}"
+    @staticmethod
+    def format_time_ms(ms):
+        return f"{Segment.format_time(ms)}.{int(ms) % 1000:03}"
 
 class SegmentSlider(QSlider):
+    hover_moved = pyqtSignal(int, int)  # position in ms, x in widget coordinates
+    hover_left = pyqtSignal()
+    markers_changed = pyqtSignal()  # segments or temp markers changed
+
     def __init__(self, orientation, parent=None):
         super().__init__(orientation, parent)
         self.segments = []  # List of (start, end) tuples in ms
         self.colors = [QColor(255, 200, 0, 120), QColor(0, 200, 255, 120), QColor(200, 255, 0, 120), QColor(255, 0, 200, 120), QColor(200, 0, 255, 120), QColor(0, 255, 200, 120)]
         self.temp_marker = None  # (start, end) or (start, None) or (None, end)
+        self.snapped = []  # per segment, (start, end) where the stream-copy cut lands, or None
+        self.temp_snapped = (None, None)  # snapped temp marker, drawn dashed
+        self.setMouseTracking(True)
+
+    def value_at(self, x):
+        return QStyle.sliderValueFromPosition(self.minimum(), self.maximum(), x, self.width())
+
+    def x_for_value(self, value):
+        return QStyle.sliderPositionFromValue(self.minimum(), self.maximum(), value, self.width())
+
+    def mouseMoveEvent(self, event):
+        super().mouseMoveEvent(event)
+        if not self.isSliderDown() and self.maximum() > 0:
+            x = min(max(event.pos().x(), 0), self.width())
+            self.hover_moved.emit(self.value_at(x), x)
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        if not self.isSliderDown():
+            self.hover_left.emit()
 
     def set_segments(self, segments):
         self.segments = [(s.start, s.end) for s in segments]
+        self.snapped = [s.snapped for s in segments]
         self.update()
+        self.markers_changed.emit()
 
-    def set_temp_marker(self, start=None, end=None):
+    def set_temp_marker(self, start=None, end=None, snapped_start=None, snapped_end=None):
         self.temp_marker = (start, end)
+        self.temp_snapped = (snapped_start, snapped_end)
         self.update()
+        self.markers_changed.emit()
 
     def clear_temp_marker(self):
         self.temp_marker = None
+        self.temp_snapped = (None, None)
         self.update()
+        self.markers_changed.emit()
 
     def paintEvent(self, event):
         super().paintEvent(event)
@@ -90,77 +184,616 @@ class SegmentSlider(QSlider):
             return
         painter = QPainter(self)
         bar_rect = self.rect()
-        # Draw segments
-        for idx, (start, end) in enumerate(self.segments):
+        # Draw segments; where keyframe snapping widens one, the padding is a fainter band around it
+        for idx, ((start, end), snapped) in enumerate(zip(self.segments, self.snapped)):
             x1 = int(bar_rect.width() * start / self.maximum())
             x2 = int(bar_rect.width() * end / self.maximum())
-            highlight_rect = bar_rect.adjusted(x1, 0, -(bar_rect.width()-x2), 0)
             color = self.colors[idx % len(self.colors)]
+            if snapped is not None:
+                sx1 = int(bar_rect.width() * snapped[0] / self.maximum())
+                sx2 = int(bar_rect.width() * snapped[1] / self.maximum())
+                if (sx1, sx2) != (x1, x2):
+                    painter.fillRect(bar_rect.adjusted(sx1, 0, -(bar_rect.width()-sx2), 0), QColor(color.red(), color.green(), color.blue(), 50))
+            highlight_rect = bar_rect.adjusted(x1, 0, -(bar_rect.width()-x2), 0)
             painter.fillRect(highlight_rect, color)
-        # Draw temp marker
+        # Draw temp marker, and dashed where the cut will really start and end
         if self.temp_marker:
-            start, end = self.temp_marker
-            marker_color = QColor(255, 0, 0, 180)
-            if start is not None:
-                x = int(bar_rect.width() * start / self.maximum())
-                painter.setPen(marker_color)
-                painter.drawLine(x, 0, x, bar_rect.height())
-            if end is not None:
-                x = int(bar_rect.width() * end / self.maximum())
-                painter.setPen(QColor(0, 255, 0, 180))
-                painter.drawLine(x, 0, x, bar_rect.height())
+            for value, snapped, color in zip(self.temp_marker, self.temp_snapped, (QColor(255, 0, 0, 180), QColor(0, 255, 0, 180))):
+                if snapped is not None and snapped != value:
+                    x = int(bar_rect.width() * snapped / self.maximum())
+                    painter.setPen(QPen(color, 1, Qt.DashLine))
+                    painter.drawLine(x, 0, x, bar_rect.height())
+                if value is not None:
+                    x = int(bar_rect.width() * value / self.maximum())
+                    painter.setPen(color)
+                    painter.drawLine(x, 0, x, bar_rect.height())
+        painter.end()
+
+class WaveformLane(QWidget):
+    """Audio waveform under the seek bar, following its range, segments and position.
+
+    The waveform is rendered once per size and view into a pixmap; position
+    updates only repaint the playhead over it. The mouse wheel zooms around
+    the cursor, a double-click shows the whole video again, and a click
+    seeks.
+    """
+    seek_requested = pyqtSignal(int)  # position in ms
+    MIN_VIEW_MS = 1000
+
+    def __init__(self, slider, parent=None):
+        super().__init__(parent)
+        self.slider = slider
+        self.peaks = None  # WaveformPeaks of the loaded video, or None
+        self.view = None  # (start_ms, end_ms) when zoomed, else the whole range
+        self.rendered = None  # (key, QPixmap)
+        self.setFixedHeight(WAVEFORM_LANE_HEIGHT)
+        slider.valueChanged.connect(self.update)
+        slider.rangeChanged.connect(self.reset_view)
+        slider.markers_changed.connect(self.update)
+
+    def set_peaks(self, peaks):
+        self.peaks = peaks
+        self.rendered = None
+        self.update()
+
+    def reset_view(self, *args):
+        self.view = None
+        self.update()
+
+    def view_range(self):
+        return self.view or (0, self.slider.maximum())
+
+    def value_at(self, x):
+        start, end = self.view_range()
+        return int(start + (end - start) * min(max(x, 0), self.width()) / max(self.width(), 1))
+
+    def x_for_value(self, value):
+        start, end = self.view_range()
+        return int((value - start) * self.width() / max(end - start, 1))
+
+    def wheelEvent(self, event):
+        if self.slider.maximum() <= 0:
+            return
+        start, end = self.view_range()
+        anchor = self.value_at(event.pos().x())
+        factor = 0.8 if event.angleDelta().y() > 0 else 1.25
+        span = min(max((end - start) * factor, self.MIN_VIEW_MS), self.slider.maximum())
+        ratio = (anchor - start) / max(end - start, 1)
+        new_start = min(max(anchor - span * ratio, 0), self.slider.maximum() - span)
+        self.view = None if span >= self.slider.maximum() else (int(new_start), int(new_start + span))
+        self.update()
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_view()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton and self.slider.maximum() > 0:
+            self.seek_requested.emit(self.value_at(event.pos().x()))
+
+    def render_waveform(self):
+        start, end = self.view_range()
+        key = (self.width(), self.height(), start, end)
+        if self.rendered is not None and self.rendered[0] == key:
+            return self.rendered[1]
+        pixmap = QPixmap(self.width(), self.height())
+        pixmap.fill(QColor(30, 30, 30))
+        painter = QPainter(pixmap)
+        painter.setPen(QColor(90, 170, 255))
+        mid = self.height() / 2
+        peaks = self.peaks.peaks(start / 1000, end / 1000, self.width())
+        tops = mid - peaks[:, 1] * mid
+        bottoms = mid - peaks[:, 0] * mid
+        painter.drawLines([QLineF(x, top, x, bottom) for x, (top, bottom) in enumerate(zip(tops.tolist(), bottoms.tolist()))])
         painter.end()
+        self.rendered = (key, pixmap)
+        return pixmap
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self.peaks is None or self.slider.maximum() <= 0 or self.width() <= 0:
+            painter.fillRect(self.rect(), QColor(30, 30, 30))
+            painter.end()
+            return
+        painter.drawPixmap(0, 0, self.render_waveform())
+        for idx, ((start, end), snapped) in enumerate(zip(self.slider.segments, self.slider.snapped)):
+            x1, x2 = self.x_for_value(start), self.x_for_value(end)
+            color = self.slider.colors[idx % len(self.slider.colors)]
+            if snapped is not None:
+                # Zoomed in, the keyframe padding is visible as a fainter band
+                sx1, sx2 = self.x_for_value(snapped[0]), self.x_for_value(snapped[1])
+                if (sx1, sx2) != (x1, x2):
+                    painter.fillRect(sx1, 0, max(sx2 - sx1, 1), self.height(), QColor(color.red(), color.green(), color.blue(), 30))
+            painter.fillRect(x1, 0, max(x2 - x1, 1), self.height(), QColor(color.red(), color.green(), color.blue(), 70))
+        if self.slider.temp_marker:
+            for value, snapped, color in zip(self.slider.temp_marker, self.slider.temp_snapped, (QColor(255, 0, 0, 180), QColor(0, 255, 0, 180))):
+                if snapped is not None and snapped != value:
+                    painter.setPen(QPen(color, 1, Qt.DashLine))
+                    x = self.x_for_value(snapped)
+                    painter.drawLine(x, 0, x, self.height())
+                if value is not None:
+                    painter.setPen(color)
+                    x = self.x_for_value(value)
+                    painter.drawLine(x, 0, x, self.height())
+        painter.setPen(QColor(255, 255, 255, 200))
+        x = self.x_for_value(self.slider.value())
+        painter.drawLine(x, 0, x, self.height())
+        painter.end()
+
+class WaveformThread(QThread):
+    """Loads the waveform peaks of one source from the disk cache, or computes and caches them."""
+    waveform_ready = pyqtSignal(str, object)  # source path, WaveformPeaks or None
+
+    def __init__(self, source, logger):
+        super().__init__()
+        self.source = source
+        self.logger = logger
+        self.cancelled = False
+
+    def run(self):
+        try:
+            cache_path = waveform_cache_path(get_fingerprint(self.source))
+            if os.path.exists(cache_path):
+                try:
+                    self.waveform_ready.emit(self.source, WaveformPeaks.load(cache_path))
+                    return
+                except (OSError, ValueError) as e:
+                    self.logger.warning(f"Discarding unreadable waveform cache {cache_path}: {e}")
+            peaks = WaveformPeaks.compute(self.source, lambda: self.cancelled)
+            if self.cancelled:
+                return
+            if peaks is not None:
+                peaks.save(cache_path)
+            self.waveform_ready.emit(self.source, peaks)
+        except Exception as e:
+            self.logger.warning(f"Waveform failed for {self.source}: {e}")
+            self.waveform_ready.emit(self.source, None)
+
+    def cancel(self):
+        self.cancelled = True
+
+class PreviewFrameCache:
+    """LRU cache of decoded preview frames, bounded by total image bytes."""
+    def __init__(self, max_bytes=PREVIEW_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()  # key -> QImage, least recently used first
+        self.total_bytes = 0
+
+    def get(self, key):
+        image = self.frames.get(key)
+        if image is not None:
+            self.frames.move_to_end(key)
+        return image
+
+    def put(self, key, image):
+        if key in self.frames:
+            self.total_bytes -= self.frames.pop(key).sizeInBytes()
+        self.frames[key] = image
+        self.total_bytes += image.sizeInBytes()
+        while self.total_bytes > self.max_bytes and len(self.frames) > 1:
+            _, evicted = self.frames.popitem(last=False)
+            self.total_bytes -= evicted.sizeInBytes()
+
+    def clear(self):
+        self.frames.clear()
+        self.total_bytes = 0
+
+class FramePreviewThread(QThread):
+    """Decodes scrub preview frames with ffmpeg, one request at a time.
+
+    Only the most recent request is kept: while a decode is running, newer
+    requests replace any older pending one, so a fast drag never queues up
+    a backlog of stale frames.
+    """
+    frame_ready = pyqtSignal(str, int, QImage)  # video path, bucket time in ms, frame
+
+    def __init__(self, logger, parent=None):
+        super().__init__(parent)
+        self.logger = logger
+        self.mutex = QMutex()
+        self.wakeup = QWaitCondition()
+        self.pending = None  # (video path, bucket time in ms)
+        self.stopping = False
+
+    def request(self, path, bucket_ms):
+        self.mutex.lock()
+        self.pending = (path, bucket_ms)
+        self.wakeup.wakeOne()
+        self.mutex.unlock()
+
+    def stop(self):
+        self.mutex.lock()
+        self.stopping = True
+        self.wakeup.wakeOne()
+        self.mutex.unlock()
+        self.wait()
+
+    def run(self):
+        while True:
+            self.mutex.lock()
+            while self.pending is None and not self.stopping:
+                self.wakeup.wait(self.mutex)
+            if self.stopping:
+                self.mutex.unlock()
+                return
+            path, bucket_ms = self.pending
+            self.pending = None
+            self.mutex.unlock()
+            image = self.decode_frame(path, bucket_ms)
+            if image is not None:
+                self.frame_ready.emit(path, bucket_ms, image)
+
+    def decode_frame(self, path, bucket_ms):
+        # -noaccurate_seek returns the keyframe at or before the bucket time
+        # instead of decoding forward through the GOP to the exact position.
+        cmd = [
+            FFMPEG, '-v', 'error', '-noaccurate_seek', '-ss', str(bucket_ms / 1000), '-i', path,
+            '-frames:v', '1', '-an', '-sn', '-vf', f'scale={PREVIEW_WIDTH}:-2',
+            '-f', 'image2pipe', '-vcodec', 'bmp', '-'
+        ]
+        try:
+            output = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=10, creationflags=subprocess_flags).stdout
+        except Exception as e:
+            self.logger.warning(f"Preview decode failed at {bucket_ms} ms: {e}")
+            return None
+        image = QImage.fromData(output, 'BMP')
+        return None if image.isNull() else image
+
+class ScrubPreview(QLabel):
+    """Floating preview shown above the seek bar while hovering or dragging."""
+    def __init__(self, parent=None):
+        super().__init__(parent, Qt.ToolTip | Qt.FramelessWindowHint)
+        self.setAlignment(Qt.AlignCenter)
+        self.setStyleSheet('background: black; color: white; border: 1px solid #888; padding: 2px;')
+        self.image = None
+
+    def show_frame(self, image, position, anchor):
+        # anchor: global point at the top of the seek bar where the preview is centred
+        if image is not None:
+            self.image = image
+        if self.image is not None:
+            self.setPixmap(QPixmap.fromImage(self.image))
+        else:
+            self.setText(Segment.format_time(position))
+        self.adjustSize()
+        self.move(anchor.x() - self.width() // 2, anchor.y() - self.height() - 4)
+        self.show()
+
+    def reset(self):
+        self.image = None
+        self.clear()
+        self.hide()
+
+class ProbeSignals(QObject):
+    probed = pyqtSignal(str, object)  # video path, MediaInfo
+    indexed = pyqtSignal(str)  # video path whose keyframe index is now cached
+
+class ProbeTask(QRunnable):
+    """Low-priority pre-probe of one playlist entry.
+
+    Collects media info first (cheap, shown in the playlist row) and then
+    builds the keyframe index used at export time. Before each step it
+    waits on the gate, which the app clears while foreground work runs,
+    and gives up if the playlist has been replaced since it was queued.
+    """
+    def __init__(self, path, generation, app):
+        super().__init__()
+        self.path = path
+        self.generation = generation
+        self.app = app
+        self.signals = app.probe_signals
+
+    def current(self):
+        self.app.probe_gate.wait()
+        return self.generation == self.app.probe_generation
+
+    def run(self):
+        QThread.currentThread().setPriority(QThread.LowestPriority)
+        try:
+            if not self.current():
+                return
+            self.signals.probed.emit(self.path, get_media_info(self.path, background=True))
+            if not self.current():
+                return
+            get_keyframe_index(self.path, background=True)
+            self.signals.indexed.emit(self.path)
+        except Exception as e:
+            self.app.logger.warning(f"Background probe failed for {self.path}: {e}")
 
 class ExportThread(QThread):
     status_update = pyqtSignal(str)
+    outputs_done = pyqtSignal(int)  # outputs finished so far, including skipped and reused ones
     export_done = pyqtSignal(bool, str)
 
-    def __init__(self, segments, videoPath, outfiles, find_nearest_keyframe, find_next_keyframe, logger):
+    def __init__(self, plan, videoPath, logger, resume=False, cache=None, streams=None, sink=None, governor=None):
         super().__init__()
-        self.segments = segments
+        self.plan = plan  # ExportPlan from plan_export, jobs already in execution order
         self.videoPath = videoPath
-        self.outfiles = outfiles
-        self.find_nearest_keyframe = find_nearest_keyframe
-        self.find_next_keyframe = find_next_keyframe
         self.logger = logger
+        self.mode = plan.mode
+        self.resume = resume  # skip outputs the journal records as done and that still verify
+        self.packaging = plan.packaging
+        # An HLS output is a playlist plus segment files, which the cache cannot hold
+        self.cache = cache if self.packaging != PACKAGING_HLS else None  # ExportCache to reuse identical earlier outputs, or None
+        self.streams = streams  # input stream indices to copy, or None for ffmpeg's default
+        self.sink = sink  # StreamSink to stream into instead of writing files, or None
+        self.governor = governor if governor is not None else ResourceGovernor(1)  # how many ffmpegs may run at once
+        self.processes = {}  # running ffmpeg -> output it writes (None for a sink), so stop_export can kill them
+        self.finished_outputs = 0
+        self.cancelled = False
+
+    def preflight(self):
+        """
+        Check the output volume has room for the plan's estimated output
+        before anything is written. Returns False on failure.
+        """
+        if not self.plan.snapped:
+            self.logger.warning("No keyframe index; cutting at marked times and skipping the free space check.")
+            return True
+        estimated = self.plan.estimated_bytes
+        out_dir = os.path.dirname(self.plan.outfiles[0])
+        ok, free = check_free_space(out_dir, estimated)
+        self.logger.info(f"Preflight: estimated output {estimated} bytes, {free} bytes free in {out_dir}")
+        self.status_update.emit(f"Preflight: estimated output {format_bytes(estimated)}, {format_bytes(free)} free")
+        if not ok:
+            self.export_done.emit(False, f"Not enough free space in {out_dir}.\nEstimated output: {format_bytes(estimated)}, free: {format_bytes(free)}")
+            return False
+        return True
 
     def run(self):
         try:
-            for i, seg in enumerate(self.segments):
-                user_start_sec = seg.start / 1000
-                user_end_sec = seg.end / 1000
-                actual_start_sec = self.find_nearest_keyframe(user_start_sec)
-                actual_end_sec = self.find_next_keyframe(user_end_sec)
-                duration = actual_end_sec - actual_start_sec
-                outfile = self.outfiles[i]
-                cmd = [
-                    FFMPEG, '-y', '-ss', str(actual_start_sec), '-i', self.videoPath,
-                    '-t', str(duration), '-c', 'copy', outfile
-                ]
-                self.status_update.emit(f"Exporting segment {i+1}/{len(self.segments)}...")
-                self.logger.info(f"Exporting segment {i+1}: {cmd}")
+            if self.sink is not None:
+                self.run_stream()
+                return
+            if not self.preflight():
+                return
+            jobs = self.plan.jobs
+            journal = ExportJournal.load(self.videoPath, os.path.dirname(jobs[0].outfile))
+            skipped = 0
+            reused = 0
+            ext = os.path.splitext(jobs[0].outfile)[1]
+            pending = deque()  # (number, job, cache key) still needing an ffmpeg pass, in plan order
+            for i, job in enumerate(jobs):
+                outfile, ranges = job.outfile, job.ranges
+                if self.resume and journal.is_verified(outfile, ranges):
+                    skipped += 1
+                    self.logger.info(f"Skipping verified output {outfile}")
+                    self.status_update.emit(f"Exporting segment {i+1}/{len(jobs)}... already done, skipped")
+                    self.output_finished()
+                    continue
+                journal.plan(outfile, ranges)
+                cache_key = None
+                if self.cache is not None:
+                    cache_key = ExportCache.key(get_fingerprint(self.videoPath), ranges, self.mode, ext, self.streams, self.packaging)
+                    tmpfile = partial_path(outfile)
+                    self.remove_partial(tmpfile)
+                    if self.cache.fetch(cache_key, ext, tmpfile):
+                        os.replace(tmpfile, outfile)
+                        reused += 1
+                        self.logger.info(f"Reused cached output for {outfile}")
+                        self.status_update.emit(f"Exporting segment {i+1}/{len(jobs)}... reused cached output")
+                        journal.complete(outfile, os.path.getsize(outfile), self.probe_duration(outfile))
+                        self.output_finished()
+                        continue
+                pending.append((i + 1, job, cache_key))
+            if not self.run_jobs(pending, journal):
+                return
+            if self.cache is not None:
                 try:
-                    subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags)
-                except subprocess.CalledProcessError as e:
-                    self.logger.error(f"Failed to export {outfile}: {e.output.decode()}")
-                    self.export_done.emit(False, f"Failed to export {os.path.basename(outfile)}\n{e.output.decode()}")
-                    return
-            self.export_done.emit(True, f"Exported {len(self.segments)} segments.")
+                    self.cache.evict()
+                except OSError as e:
+                    self.logger.warning(f"Export cache eviction failed: {e}")
+            count = self.plan.segment_count
+            if self.mode == EXPORT_MODE_MERGE:
+                msg = f"Merged {count} segments into {os.path.basename(jobs[0].outfile)}."
+            elif len(jobs) != count:
+                msg = f"Exported {count} segments into {len(jobs)} files."
+            else:
+                msg = f"Exported {count} segments."
+            if skipped:
+                msg += f" {skipped} already done, skipped."
+            if reused:
+                msg += f" {reused} reused from cache."
+            self.export_done.emit(True, msg)
         except Exception as e:
             self.logger.error(f"Export error: {e}")
             self.export_done.emit(False, str(e))
 
+    def run_stream(self):
+        # Nothing is written to disk, so there is no free space check,
+        # journal, cache or partial file; outputs go straight into the sink
+        jobs = self.plan.jobs
+        self.logger.info(f"Streaming {len(jobs)} outputs to {self.sink.describe()}")
+        if self.sink.kind != SINK_PIPES:
+            self.status_update.emit(f"Waiting for a reader on {self.sink.target}...")
+
+        def on_process(process):
+            self.processes = {process: None}
+
+        def progress(number, job):
+            # Outputs stream one after another, so starting one means the one before it is done
+            self.outputs_done.emit(number - 1)
+            if self.sink.kind == SINK_PIPES:
+                self.status_update.emit(f"Exporting segment {number}/{len(jobs)}... waiting for a reader on {self.sink.pipe_path(job)}")
+            else:
+                self.status_update.emit(f"Exporting segment {number}/{len(jobs)}...")
+
+        if not self.sink.export(self.videoPath, jobs, self.streams, on_process, lambda: self.cancelled, progress):
+            return
+        self.outputs_done.emit(len(jobs))
+        self.export_done.emit(True, f"Streamed {self.plan.segment_count} segments to {self.sink.describe()}.")
+
+    def run_jobs(self, pending, journal):
+        """
+        Run the ffmpeg passes left in pending, as many at once as the governor
+        allows; it is asked again before each start, so starting playback or
+        a busy machine throttles the export. Outputs start in plan order, but
+        passes running together read different parts of the source at once,
+        so the source is read front to back only while the limit is one.
+        Each writes to partial_path(outfile) and is renamed on success, so a crash or full
+        disk never leaves a truncated output behind. Emits export_done and
+        returns False on failure.
+        """
+        running = []  # (process, error output file, job, cache key)
+        try:
+            while pending or running:
+                while pending and len(running) < self.governor.limit() and not self.cancelled:
+                    number, job, cache_key = pending.popleft()
+                    running.append(self.start_job(number, job) + (job, cache_key))
+                if self.cancelled:
+                    return False
+                finished = [entry for entry in running if entry[0].poll() is not None]
+                if not finished:
+                    self.msleep(EXPORT_POLL_MS)
+                    continue
+                for entry in finished:
+                    running.remove(entry)
+                    if not self.finish_job(*entry, journal):
+                        return False
+            return True
+        finally:
+            # After a failure the other passes are pointless; their partial files go too
+            for process, errors, job, _ in running:
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                errors.close()
+                self.processes.pop(process, None)
+                self.remove_partial(partial_path(job.outfile))
+                self.remove_segments(job.outfile)
+
+    def start_job(self, number, job):
+        tmpfile = partial_path(job.outfile)
+        if self.mode == EXPORT_MODE_MERGE:
+            self.status_update.emit(f"Merging {len(job.ranges)} segments into {os.path.basename(job.outfile)}...")
+            cmd = build_merge_cmd(tmpfile, self.streams, self.packaging)
+            stdin_text = build_concat_list(self.videoPath, job.ranges)
+        else:
+            (actual_start_sec, actual_end_sec), = job.ranges
+            self.status_update.emit(f"Exporting segment {number}/{len(self.plan.jobs)}...")
+            cmd = build_segment_cmd(self.videoPath, actual_start_sec, actual_end_sec, tmpfile, self.streams, self.packaging)
+            stdin_text = None
+        self.logger.info(f"Running: {cmd}")
+        if stdin_text is not None:
+            self.logger.info(f"Concat list:\n{stdin_text}")
+        # ffmpeg reports on stderr; a file cannot fill up and stall it while other passes are polled
+        errors = tempfile.TemporaryFile()
+        process = subprocess.Popen(
+            cmd, stdin=subprocess.PIPE if stdin_text is not None else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL, stderr=errors, **process_kwargs(export=True)
+        )
+        lower_priority(process.pid, export=True)
+        self.processes[process] = job.outfile
+        if stdin_text is not None:
+            process.stdin.write(stdin_text.encode())
+            process.stdin.close()
+        return process, errors
+
+    def finish_job(self, process, errors, job, cache_key, journal):
+        outfile = job.outfile
+        self.processes.pop(process, None)
+        with errors:
+            errors.seek(0)
+            output = errors.read().decode(errors='replace')
+        if self.cancelled:
+            return False
+        if process.returncode != 0:
+            self.logger.error(f"Failed to export {outfile}: {output}")
+            self.remove_partial(partial_path(outfile))
+            self.remove_segments(outfile)
+            self.export_done.emit(False, f"Failed to export {os.path.basename(outfile)}\n{output}")
+            return False
+        os.replace(partial_path(outfile), outfile)
+        journal.complete(outfile, os.path.getsize(outfile), self.probe_duration(outfile))
+        if cache_key is not None:
+            try:
+                if not self.cache.store(cache_key, os.path.splitext(outfile)[1], outfile):
+                    self.logger.info(f"Not cached, the output folder is on another volume than the cache: {outfile}")
+            except OSError as e:
+                self.logger.warning(f"Could not cache {outfile}: {e}")
+        self.output_finished()
+        return True
+
+    def output_finished(self):
+        self.finished_outputs += 1
+        self.outputs_done.emit(self.finished_outputs)
+
+    def probe_duration(self, outfile):
+        # Recorded in the journal so a resume can verify the file later
+        try:
+            return MediaInfo.probe(outfile).duration
+        except Exception as e:
+            self.logger.warning(f"Could not probe {outfile}: {e}")
+            return 0.0
+
+    def remove_partial(self, tmpfile):
+        try:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+        except OSError as e:
+            self.logger.warning(f"Could not remove partial file {tmpfile}: {e}")
+
+    def remove_segments(self, outfile):
+        # HLS segments are written under their final names, so an unfinished
+        # playlist's segments have to be removed along with it
+        if self.packaging != PACKAGING_HLS:
+            return
+        for path in hls_segment_files(outfile):
+            self.remove_partial(path)
+
+    def cancel(self):
+        # Called from the GUI thread: kill the running ffmpegs and drop their partial output
+        self.cancelled = True
+        running = list(self.processes.items())
+        for process, _ in running:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        for outfile in self.plan.outfiles:
+            self.remove_partial(partial_path(outfile))
+        for _, outfile in running:
+            if outfile is not None:
+                self.remove_segments(outfile)
+
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setWindowTitle('Settings')
         layout = QFormLayout(self)
         self.output_folder = QLineEdit()
-        self.filename_pattern = QLineEdit('{basename}_{index}')
+        self.output_folder.setPlaceholderText('Same folder as the source video')
+        self.browseBtn = QPushButton('Browse...')
+        self.browseBtn.clicked.connect(self.browse_output_folder)
+        folderRow = QHBoxLayout()
+        folderRow.addWidget(self.output_folder, 1)
+        folderRow.addWidget(self.browseBtn)
+        self.filename_pattern = QLineEdit(DEFAULT_FILENAME_PATTERN)
+        self.filename_pattern.setToolTip('Placeholders: {basename}, {index}, {start}, {end} (ms). The extension of the source, or of the chosen packaging, is appended.')
         self.reencode = QCheckBox('Re-encode (frame-accurate)')
-        layout.addRow('Output Folder:', self.output_folder)
+        self.proxies = QCheckBox('Play low-resolution proxies of large videos')
+        self.proxies.setToolTip('Playback and scrubbing use a small proxy transcoded in the background; exports still cut the original.')
+        self.keyframe_shortcuts = QCheckBox('Step between keyframes with Shift+Left / Shift+Right')
+        self.keyframe_shortcuts.setToolTip('Marks placed on a keyframe need no padding when cut without re-encoding.')
+        self.export_mode = QComboBox()
+        self.export_mode.addItem('Separate file per segment', EXPORT_MODE_SEPARATE)
+        self.export_mode.addItem('Merge segments into one file', EXPORT_MODE_MERGE)
+        self.export_cache = QCheckBox('Reuse identical earlier exports')
+        self.export_cache_gb = QSpinBox()
+        self.export_cache_gb.setRange(1, 1000)
+        self.export_cache_gb.setSuffix(' GB')
+        cacheRow = QHBoxLayout()
+        cacheRow.addWidget(self.export_cache, 1)
+        cacheRow.addWidget(self.export_cache_gb)
+        layout.addRow('Output Folder:', folderRow)
         layout.addRow('Filename Pattern:', self.filename_pattern)
+        layout.addRow('Export Mode:', self.export_mode)
+        layout.addRow('Export Cache:', cacheRow)
         layout.addRow('', self.reencode)
+        layout.addRow('Playback:', self.proxies)
+        layout.addRow('', self.keyframe_shortcuts)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addRow(buttons)
         self.setLayout(layout)
         # Set cursor to pointing hand on all dialog buttons
         for attr in dir(self):
@@ -169,6 +802,263 @@ class SettingsDialog(QDialog):
                 if isinstance(btn, QPushButton):
                     btn.setCursor(Qt.PointingHandCursor)
 
+    def browse_output_folder(self):
+        folder = QFileDialog.getExistingDirectory(self, "Select Output Folder", self.output_folder.text())
+        if folder:
+            self.output_folder.setText(folder)
+
+    def accept(self):
+        # An empty pattern falls back to the default
+        try:
+            check_filename_pattern(self.filename_pattern.text() or DEFAULT_FILENAME_PATTERN)
+        except ValueError as e:
+            QMessageBox(QMessageBox.Warning, "Settings", str(e), parent=self).exec_()
+            return
+        super().accept()
+
+class StreamSelectionDialog(QDialog):
+    """Choose which tracks of the current video are copied into exports."""
+    def __init__(self, info, selected, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Streams')
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel('Tracks to copy into exported files:'))
+        self.stream_boxes = []  # (stream index, codec type, QCheckBox)
+        for st in info.streams:
+            box = QCheckBox(describe_stream(st))
+            box.setChecked(st['index'] in selected)
+            layout.addWidget(box)
+            self.stream_boxes.append((st['index'], st.get('codec_type'), box))
+        self.drop_audio = QCheckBox('No audio')
+        self.drop_audio.setChecked(not any(t == 'audio' and i in selected for i, t, _ in self.stream_boxes))
+        self.drop_audio.toggled.connect(self.on_drop_audio_toggled)
+        layout.addWidget(self.drop_audio)
+        layout.addWidget(QLabel('The choice is remembered for videos with the same track layout.'))
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+        self.on_drop_audio_toggled(self.drop_audio.isChecked())
+
+    def on_drop_audio_toggled(self, checked):
+        for _, codec_type, box in self.stream_boxes:
+            if codec_type == 'audio':
+                box.setEnabled(not checked)
+
+    def selected_streams(self):
+        return [
+            index for index, codec_type, box in self.stream_boxes
+            if box.isChecked() and not (codec_type == 'audio' and self.drop_audio.isChecked())
+        ]
+
+class IndexThread(QThread):
+    """Builds the keyframe index of one file off the GUI thread."""
+    def __init__(self, path, background=False):
+        super().__init__()
+        self.path = path
+        self.background = background
+        self.index = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.index = get_keyframe_index(self.path, background=self.background)
+        except Exception as e:
+            self.error = e
+
+class ProxyThread(QThread):
+    """Transcodes the playback proxy of one source at idle priority."""
+    proxy_ready = pyqtSignal(str, str)  # source path, proxy path
+    proxy_failed = pyqtSignal(str, str)  # source path, error
+
+    def __init__(self, source, cache, logger):
+        super().__init__()
+        self.source = source
+        self.cache = cache
+        self.logger = logger
+        self.process = None
+        self.cancelled = False
+
+    def run(self):
+        tmpfile = None
+        try:
+            proxy = self.cache.proxy_path(get_fingerprint(self.source))
+            os.makedirs(os.path.dirname(proxy), exist_ok=True)
+            tmpfile = partial_path(proxy)
+            cmd = build_proxy_cmd(self.source, tmpfile)
+            self.logger.info(f"Running: {cmd}")
+            if self.cancelled:
+                return
+            self.process = subprocess.Popen(
+                cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **process_kwargs(background=True)
+            )
+            lower_priority(self.process.pid, background=True)
+            output = self.process.communicate()[0].decode(errors='replace')
+            if self.cancelled:
+                return
+            if self.process.returncode != 0:
+                self.logger.error(f"Proxy transcode failed for {self.source}: {output}")
+                self.proxy_failed.emit(self.source, output[-500:])
+                return
+            os.replace(tmpfile, proxy)
+            tmpfile = None
+            self.cache.evict()
+            self.proxy_ready.emit(self.source, proxy)
+        except Exception as e:
+            self.logger.error(f"Proxy transcode failed for {self.source}: {e}")
+            self.proxy_failed.emit(self.source, str(e))
+        finally:
+            if tmpfile is not None and os.path.exists(tmpfile):
+                try:
+                    os.remove(tmpfile)
+                except OSError as e:
+                    self.logger.warning(f"Could not remove partial file {tmpfile}: {e}")
+
+    def cancel(self):
+        # Called from the GUI thread; run() drops the partial proxy
+        self.cancelled = True
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+
+class ExportPlanDialog(QDialog):
+    """Shows what an export will write, with estimated sizes, before it runs."""
+    def __init__(self, make_plan, coalesce_gap, packaging, merge, sink_kind=SINK_FILE, sink_path='',
+                 stream_format=STREAM_FORMAT_MPEGTS, framing=FRAMING_CHUNKED, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Export Plan')
+        self.setMinimumWidth(640)
+        self.make_plan = make_plan  # (coalesce_gap, packaging) -> ExportPlan; raises ValueError for bad names
+        self.plan = None
+        self.sink = None  # StreamSink when streaming instead of writing files
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, 4)
+        self.table.setHorizontalHeaderLabels(['Output', 'Segments', 'Range', 'Est. Size'])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionMode(QTableWidget.NoSelection)
+        layout.addWidget(self.table)
+        self.coalesce_gap = QDoubleSpinBox()
+        self.coalesce_gap.setRange(0, 60)
+        self.coalesce_gap.setSingleStep(0.5)
+        self.coalesce_gap.setDecimals(1)
+        self.coalesce_gap.setSuffix(' s')
+        self.coalesce_gap.setSpecialValueText('Off')
+        self.coalesce_gap.setValue(coalesce_gap)
+        # A merge is already one output
+        self.coalesce_gap.setEnabled(not merge)
+        self.coalesce_gap.valueChanged.connect(self.refresh)
+        gapRow = QHBoxLayout()
+        gapRow.addWidget(QLabel('Join segments less than this apart into one file:'), 1)
+        gapRow.addWidget(self.coalesce_gap)
+        layout.addLayout(gapRow)
+        self.packaging = QComboBox()
+        self.packaging.addItem('Same container as the source', PACKAGING_PLAIN)
+        self.packaging.addItem('MP4, faststart (moov first)', PACKAGING_FASTSTART)
+        self.packaging.addItem('Fragmented MP4 (one pass)', PACKAGING_FRAGMENTED)
+        self.packaging.addItem('HLS (playlist + segments)', PACKAGING_HLS)
+        self.packaging.setCurrentIndex(max(0, self.packaging.findData(packaging)))
+        self.packaging.currentIndexChanged.connect(self.refresh)
+        packagingRow = QHBoxLayout()
+        packagingRow.addWidget(QLabel('Packaging:'), 1)
+        packagingRow.addWidget(self.packaging)
+        layout.addLayout(packagingRow)
+        self.sink_kind = QComboBox()
+        self.sink_kind.addItem('Files', SINK_FILE)
+        self.sink_kind.addItem('Named pipe (one stream)', SINK_PIPE)
+        if sys.platform != 'win32':
+            self.sink_kind.addItem('Named pipe per output', SINK_PIPES)
+        self.sink_kind.setCurrentIndex(max(0, self.sink_kind.findData(sink_kind)))
+        self.sink_kind.currentIndexChanged.connect(self.refresh)
+        sinkRow = QHBoxLayout()
+        sinkRow.addWidget(QLabel('Write to:'), 1)
+        sinkRow.addWidget(self.sink_kind)
+        layout.addLayout(sinkRow)
+        self.sink_path = QLineEdit(sink_path)
+        self.sink_path.textChanged.connect(self.refresh)
+        self.stream_format = QComboBox()
+        self.stream_format.addItem('MPEG-TS', STREAM_FORMAT_MPEGTS)
+        self.stream_format.addItem('Fragmented MP4', STREAM_FORMAT_FMP4)
+        self.stream_format.setCurrentIndex(max(0, self.stream_format.findData(stream_format)))
+        self.stream_format.currentIndexChanged.connect(self.refresh)
+        self.framing = QCheckBox('Frame outputs')
+        self.framing.setToolTip('Put a SLYCE-SEGMENT header before each output and send it in length-prefixed chunks, so the reader can tell outputs apart.')
+        self.framing.setChecked(framing == FRAMING_CHUNKED)
+        self.framing.toggled.connect(self.refresh)
+        pipeRow = QHBoxLayout()
+        pipeRow.addWidget(self.sink_path, 1)
+        pipeRow.addWidget(self.stream_format)
+        pipeRow.addWidget(self.framing)
+        layout.addLayout(pipeRow)
+        self.summary = QLabel()
+        self.summary.setWordWrap(True)
+        layout.addWidget(self.summary)
+        self.warnings = QLabel()
+        self.warnings.setWordWrap(True)
+        self.warnings.setStyleSheet('color: #c0392b;')
+        layout.addWidget(self.warnings)
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.buttons.button(QDialogButtonBox.Ok).setText('Export')
+        self.buttons.accepted.connect(self.accept)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+        self.setLayout(layout)
+        self.refresh()
+
+    def refresh(self):
+        kind = self.sink_kind.currentData()
+        streaming = kind != SINK_FILE
+        # Streams are muxed as MPEG-TS or fragmented MP4, so packaging only applies to files
+        self.packaging.setEnabled(not streaming)
+        self.sink_path.setEnabled(streaming)
+        self.stream_format.setEnabled(streaming)
+        self.framing.setEnabled(kind == SINK_PIPE)
+        if kind == SINK_PIPES:
+            self.sink_path.setPlaceholderText('Folder for the pipes')
+        elif sys.platform == 'win32':
+            self.sink_path.setPlaceholderText('\\\\.\\pipe\\<name>, created by the reader')
+        else:
+            self.sink_path.setPlaceholderText('Pipe path, created if missing')
+        try:
+            self.plan = self.make_plan(self.coalesce_gap.value(), PACKAGING_PLAIN if streaming else self.packaging.currentData())
+            self.sink = None
+            if streaming:
+                self.sink = StreamSink(kind, self.sink_path.text().strip(), self.stream_format.currentData(),
+                                       FRAMING_CHUNKED if self.framing.isChecked() else FRAMING_NONE)
+        except (ValueError, SinkError) as e:
+            self.plan = None
+            self.table.setRowCount(0)
+            self.summary.setText('')
+            self.warnings.setText(str(e))
+            self.buttons.button(QDialogButtonBox.Ok).setEnabled(False)
+            return
+        self.table.setRowCount(len(self.plan.jobs))
+        for row, job in enumerate(self.plan.jobs):
+            span = f"{Segment.format_time(job.ranges[0][0] * 1000)} - {Segment.format_time(job.ranges[-1][1] * 1000)}"
+            if len(job.ranges) > 1:
+                span = f"{len(job.ranges)} ranges"
+            size = format_bytes(job.estimated_bytes) if self.plan.snapped else 'unknown'
+            name = self.sink.output_name(job) if self.sink is not None else os.path.basename(job.outfile)
+            cells = [name, ', '.join(str(n) for n in job.segments), span, size]
+            for col, text in enumerate(cells):
+                self.table.setItem(row, col, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+        out_dir = os.path.dirname(self.plan.outfiles[0])
+        files = f"{len(self.plan.jobs)} file{'s' if len(self.plan.jobs) != 1 else ''}"
+        if self.sink is not None:
+            text = f"{len(self.plan.jobs)} output{'s' if len(self.plan.jobs) != 1 else ''} streamed to {self.sink.describe()}; nothing is written to disk."
+        elif self.plan.snapped:
+            ok, free = check_free_space(out_dir, self.plan.estimated_bytes)
+            text = f"{files}, estimated {format_bytes(self.plan.estimated_bytes)}; {format_bytes(free)} free in {out_dir}."
+            if not ok:
+                text += " Not enough free space."
+        else:
+            text = f"{files} in {out_dir}. No keyframe index: cuts stay at the marked times and sizes are unknown."
+        self.summary.setText(text)
+        self.warnings.setText('\n'.join(self.plan.warnings))
+        self.buttons.button(QDialogButtonBox.Ok).setEnabled(True)
+
 class AboutDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -201,8 +1091,9 @@ class ThumbnailBar(QWidget):
         painter.end()
 
 class SlyceApp(QMainWindow):
-    def __init__(self):
+    def __init__(self, diagnostics=None):
         super().__init__()
+        self.diagnostics = diagnostics  # Diagnostics session to finish on close, or None
         self.setWindowTitle("Slyce")
         self.setGeometry(100, 100, 1280, 720)
         self.setWindowIcon(QIcon(os.path.join('assets', 'slyce.ico')))
@@ -229,6 +1120,8 @@ class SlyceApp(QMainWindow):
         self.stopExportBtn.setVisible(False)
         self.slider = SegmentSlider(Qt.Horizontal)
         self.slider.setRange(0, 0)
+        self.waveformLane = WaveformLane(self.slider)
+        self.waveform_thread = None
         self.infoLabel = QLabel('No video loaded.')
         self.segmentList = QListWidget()
         self.segments = []
@@ -236,6 +1129,10 @@ class SlyceApp(QMainWindow):
         self.redo_stack = []
         self.currentStart = None
         self.videoPath = None
+        self.keyframe_index = None  # KeyframeIndex of videoPath once built; marks are snapped against it
+        self.index_threads = set()  # IndexThreads still running, possibly for videos no longer loaded
+        self.keyframe_cursor = None  # keyframe last stepped to, in ms
+        self.playback_path = None  # what VLC plays: videoPath or its proxy
         self.duration = 0
         self.duration_timer = QTimer(self)
         self.duration_timer.setInterval(500)
@@ -244,7 +1141,52 @@ class SlyceApp(QMainWindow):
         self.progressBar = QProgressBar()
         self.progressBar.setVisible(False)
         self.thumbnailBar = ThumbnailBar()
-        self.settings = {'output_folder': '', 'filename_pattern': '{basename}_{index}', 'reencode': False}
+        self.log_buffer = []  # panel lines waiting for the next flush
+        self.stream_profiles = StreamProfiles()
+        try:
+            self.projects = ProjectStore()
+        except (sqlite3.Error, OSError) as e:
+            # Keep working without persistence rather than refusing to start
+            self.logger.error(f"Could not open the project store, segments will not be saved: {e}")
+            self.projects = ProjectStore(':memory:')
+        self.projects_flush_timer = QTimer(self)
+        self.projects_flush_timer.setSingleShot(True)
+        self.projects_flush_timer.setInterval(PROJECT_FLUSH_MS)
+        self.projects_flush_timer.timeout.connect(self.flush_projects)
+        self.export_record = None  # what the running export will add to the project's history
+        self.export_index_thread = None  # IndexThread an export is waiting on, also in index_threads
+        self.export_index_segments = None  # segments that export will plan
+        self.export_governor = ResourceGovernor()  # export concurrency; throttled while playing
+        self.proxy_cache = ProxyCache()
+        self.proxy_thread = None
+        # Background pre-probing of playlist entries
+        self.probe_pool = QThreadPool(self)
+        self.probe_pool.setMaxThreadCount(PROBE_CONCURRENCY)
+        self.probe_gate = threading.Event()  # cleared while foreground work runs
+        self.probe_gate.set()
+        self.probe_holds = set()  # reasons the gate is currently closed
+        self.probe_generation = 0  # bumped whenever the playlist is replaced
+        self.probe_signals = ProbeSignals(self)
+        self.probe_signals.probed.connect(self.on_media_probed)
+        self.probe_signals.indexed.connect(self.on_keyframes_indexed)
+        self.log_flush_scheduled = False
+        # Scrubbing: coalesced seeks plus cached keyframe previews
+        self.seek_target = None  # latest requested position not yet sent to VLC
+        self.seek_in_flight = None  # position of the seek VLC is still settling on
+        self.seek_clock = QElapsedTimer()
+        self.seek_settle_timer = QTimer(self)
+        self.seek_settle_timer.setInterval(30)
+        self.seek_settle_timer.timeout.connect(self.check_seek_settled)
+        self.preview_cache = PreviewFrameCache()
+        self.preview_key = None  # (video path, bucket ms) currently wanted by the preview
+        self.scrubPreview = ScrubPreview(self)
+        self.preview_thread = FramePreviewThread(self.logger, self)
+        self.preview_thread.frame_ready.connect(self.on_preview_frame_ready)
+        self.preview_thread.start()
+        self.settings = {'output_folder': '', 'filename_pattern': DEFAULT_FILENAME_PATTERN, 'reencode': False, 'export_mode': EXPORT_MODE_SEPARATE,
+                         'export_cache': False, 'export_cache_gb': DEFAULT_EXPORT_CACHE_GB, 'coalesce_gap': 0.0,
+                         'proxies': False, 'packaging': PACKAGING_PLAIN, 'sink': SINK_FILE, 'sink_path': '',
+                         'stream_format': STREAM_FORMAT_MPEGTS, 'framing': FRAMING_CHUNKED, 'keyframe_shortcuts': True}
         self.init_menu()
         self.init_ui()
         self.connect_signals()
@@ -252,6 +1194,7 @@ class SlyceApp(QMainWindow):
         self.timer.setInterval(500)
         self.timer.timeout.connect(self.update_slider_highlight)
         self.timer.timeout.connect(self.update_slider_position)
+        self.timer.timeout.connect(self.update_export_governor)
         self.timer.start()
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
@@ -264,6 +1207,12 @@ class SlyceApp(QMainWindow):
     def init_menu(self):
         menubar = self.menuBar() if hasattr(self, 'menuBar') else QMenuBar(self)
         fileMenu = menubar.addMenu('File')
+        settingsAct = QAction('Settings', self)
+        settingsAct.triggered.connect(self.open_settings)
+        fileMenu.addAction(settingsAct)
+        streamsAct = QAction('Streams...', self)
+        streamsAct.triggered.connect(self.open_stream_selection)
+        fileMenu.addAction(streamsAct)
         exitAct = QAction('Exit', self)
         exitAct.triggered.connect(self.close)
         fileMenu.addAction(exitAct)
@@ -328,6 +1277,11 @@ class SlyceApp(QMainWindow):
         self.startShortcut.activated.connect(self.mark_start)
         self.endShortcut = QShortcut(QKeySequence('E'), self)
         self.endShortcut.activated.connect(self.mark_end)
+        # Step the playhead between keyframes, where stream-copy cuts need no padding
+        self.prevKeyframeShortcut = QShortcut(QKeySequence('Shift+Left'), self)
+        self.prevKeyframeShortcut.activated.connect(lambda: self.step_keyframe(-1))
+        self.nextKeyframeShortcut = QShortcut(QKeySequence('Shift+Right'), self)
+        self.nextKeyframeShortcut.activated.connect(lambda: self.step_keyframe(1))
         # Remove setShortcut from all buttons to avoid focus issues
         self.playPauseBtn.setShortcut(QKeySequence())
         self.muteBtn.setShortcut(QKeySequence())
@@ -341,6 +1295,7 @@ class SlyceApp(QMainWindow):
         videoLayout = QVBoxLayout()
         videoLayout.addWidget(self.video_frame)
         videoLayout.addWidget(self.slider)
+        videoLayout.addWidget(self.waveformLane)
         # Segments and logs (side by side, no splitter)
         segLogLayout = QHBoxLayout()
         segLogLayout.setContentsMargins(0, 0, 0, 0)
@@ -360,7 +1315,9 @@ class SlyceApp(QMainWindow):
         logLayout.setSpacing(4)
         logsLabel = QLabel('Logs:')
         logsLabel.setStyleSheet(SECTION_TITLE_STYLE)
-        self.logTextEdit = QTextEdit()
+        self.logTextEdit = QPlainTextEdit()
+        self.logTextEdit.setReadOnly(True)
+        self.logTextEdit.setMaximumBlockCount(LOG_PANEL_MAX_BLOCKS)
         logLayout.addWidget(logsLabel)
         logLayout.addWidget(self.logTextEdit)
         logWidget.setLayout(logLayout)
@@ -445,6 +1402,10 @@ class SlyceApp(QMainWindow):
         self.undoBtn.clicked.connect(self.undo_segment)
         self.redoBtn.clicked.connect(self.redo_segment)
         self.slider.sliderMoved.connect(self.set_position)
+        self.slider.sliderReleased.connect(self.on_slider_released)
+        self.slider.hover_moved.connect(self.on_slider_hover)
+        self.slider.hover_left.connect(self.hide_scrub_preview)
+        self.waveformLane.seek_requested.connect(self.set_position)
         self.playlistWidget.itemDoubleClicked.connect(self.on_playlist_double_click)
 
     def playlist_drag_enter_event(self, event):
@@ -462,11 +1423,14 @@ class SlyceApp(QMainWindow):
                         files.append(os.path.join(path, f))
             elif os.path.isfile(path) and path.lower().endswith(video_exts):
                 files.append(path)
+        added = []
         for f in files:
             if not any(self.playlistWidget.item(i).data(Qt.UserRole) == f for i in range(self.playlistWidget.count())):
                 item = QListWidgetItem(os.path.basename(f))
                 item.setData(Qt.UserRole, f)
                 self.playlistWidget.addItem(item)
+                added.append(f)
+        self.start_preprobe(added)
         if files:
             self.playlistWidget.setCurrentRow(self.playlistWidget.count() - len(files))
 
@@ -504,6 +1468,8 @@ class SlyceApp(QMainWindow):
             video_exts = ('.mp4', '.avi', '.mov', '.mkv')
             files = [os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(video_exts)]
             self.playlistWidget.clear()
+            self.probe_generation += 1
+            self.probe_pool.clear()
             for f in files:
                 item = QListWidgetItem(os.path.basename(f))
                 item.setData(Qt.UserRole, f)
@@ -511,10 +1477,42 @@ class SlyceApp(QMainWindow):
             if files:
                 self.playlistWidget.setCurrentRow(0)
                 self.load_video_from_playlist(0)
+            self.start_preprobe(files)
             for btn in [self.playPauseBtn, self.muteBtn, self.markStartBtn, self.markEndBtn, self.undoBtn, self.redoBtn, self.exportBtn]:
                 btn.setEnabled(True)
                 btn.setStyleSheet(MAIN_BUTTON_STYLE)
 
+    def start_preprobe(self, files):
+        # Queue every entry; the pool runs PROBE_CONCURRENCY of them at a time
+        for f in files:
+            info = peek_media_info(f)
+            if info is not None:
+                self.on_media_probed(f, info)
+            self.probe_pool.start(ProbeTask(f, self.probe_generation, self))
+
+    def pause_background_probes(self, reason):
+        self.probe_holds.add(reason)
+        self.probe_gate.clear()
+
+    def resume_background_probes(self, reason):
+        self.probe_holds.discard(reason)
+        if not self.probe_holds:
+            self.probe_gate.set()
+
+    def on_media_probed(self, path, info):
+        try:
+            self.projects.set_media_info(path, info)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Could not save media info of {path}: {e}")
+        if not self.projects_flush_timer.isActive():
+            self.projects_flush_timer.start()
+        for i in range(self.playlistWidget.count()):
+            item = self.playlistWidget.item(i)
+            if item.data(Qt.UserRole) == path:
+                item.setText(f"{os.path.basename(path)}  ({info.summary()})")
+                item.setToolTip(path)
+                return
+
     def on_playlist_double_click(self, item):
         row = self.playlistWidget.row(item)
         self.playlistWidget.setCurrentRow(row)
@@ -537,17 +1535,6 @@ class SlyceApp(QMainWindow):
 
     def open_video_path(self, filePath):
         # This is a refactored version of open_file that takes a filePath directly (no dialog)
-        def short_time():
-            return QTime.currentTime().toString('HH:mm:ss')
-        def log_user(msg, bold_parts=None, indent=0):
-            # Helper to log with consistent timestamp, bold, and optional indent
-            t = QTime.currentTime().toString('HH:mm:ss')
-            if bold_parts:
-                for part in bold_parts:
-                    msg = msg.replace(part, f'<b>{part}</b>')
-            prefix = '    ' * indent
-            self.logTextEdit.append(f"[{t}] {prefix}{msg}")
-            self.logTextEdit.moveCursor(self.logTextEdit.textCursor().End)
         if filePath:
             try:
                 self.vlc_player.stop()
@@ -555,57 +1542,61 @@ class SlyceApp(QMainWindow):
                 pass
             self.duration_timer.stop()
             self.timer.stop()
+            self.seek_settle_timer.stop()
+            self.seek_target = None
+            self.seek_in_flight = None
+            self.scrubPreview.reset()
             self.videoPath = filePath
-            media = self.vlc_instance.media_new(filePath)
-            self.vlc_player.set_media(media)
-            if sys.platform.startswith('win'):
-                self.vlc_player.set_hwnd(int(self.video_frame.winId()))
+            self.load_waveform(filePath)
             self.infoLabel.setText(f"Loaded: {os.path.basename(filePath)}")
-            self.segments.clear()
-            self.segmentList.clear()
+            # The previous video's last edits go to disk before its segments are replaced
+            self.flush_projects()
+            self.segments = self.restore_segments(filePath)
             self.currentStart = None
+            self.load_keyframe_index(filePath)
             self.slider.setValue(0)
-            self.slider.set_segments([])
+            self.refresh_segments()
             self.undo_stack.clear()
             self.redo_stack.clear()
-            self.get_video_info()
+            # Let the foreground load have the disk; background probes resume shortly after
+            self.pause_background_probes('load')
+            QTimer.singleShot(2000, lambda: self.resume_background_probes('load'))
             # --- Video metadata logging ---
+            # Pre-probed playlist entries are served from the cache without running ffprobe
             try:
-                cmd = [
-                    FFMPEG.replace('ffmpeg.exe', 'ffprobe.exe'), '-v', 'error', '-select_streams', 'v:0',
-                    '-show_entries', 'stream=width,height,bit_rate,codec_name',
-                    '-of', 'default=noprint_wrappers=1', filePath
-                ]
-                vinfo = subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags).decode().strip().split('\n')
-                vmeta = {}
-                for line in vinfo:
-                    if '=' in line:
-                        k, v = line.split('=', 1)
-                        vmeta[k.strip()] = v.strip()
-                cmd = [
-                    FFMPEG.replace('ffmpeg.exe', 'ffprobe.exe'), '-v', 'error', '-select_streams', 'a:0',
-                    '-show_entries', 'stream=codec_name,channels,sample_rate,bit_rate',
-                    '-of', 'default=noprint_wrappers=1', filePath
-                ]
-                ainfo = subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags).decode().strip().split('\n')
-                ameta = {}
-                for line in ainfo:
-                    if '=' in line:
-                        k, v = line.split('=', 1)
-                        ameta[k.strip()] = v.strip()
-                cmd = [
-                    FFMPEG.replace('ffmpeg.exe', 'ffprobe.exe'), '-v', 'error', '-show_entries', 'format=duration',
-                    '-of', 'default=noprint_wrappers=1:nokey=1', filePath
-                ]
-                duration = float(subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags).decode().strip())
-                video_info = f"{os.path.basename(filePath)} ({vmeta.get('width','?')}x{vmeta.get('height','?')}, {duration:.2f} sec)"
-                video_details = f"Video: {vmeta.get('codec_name','?')} | Bitrate: {int(vmeta.get('bit_rate',0))//1000 if vmeta.get('bit_rate','').isdigit() else '?'} kbps; Audio: {ameta.get('codec_name','?')} | Channels: {ameta.get('channels','?')} | Sample Rate: {ameta.get('sample_rate','?')} Hz"
-                log_user(f"Video loaded: {video_info}", bold_parts=[os.path.basename(filePath)])
-                log_user(video_details, indent=1)
+                info = get_media_info(filePath)
             except Exception as e:
-                log_user(f"Video loaded: {os.path.basename(filePath)} (metadata unavailable)", bold_parts=[os.path.basename(filePath)])
-            self.duration = 0
-            self.update_duration()
+                self.logger.warning(f"Failed to probe {filePath}: {e}")
+                info = None
+            if info is not None:
+                vmeta = info.first_stream('video')
+                ameta = info.first_stream('audio')
+                bit_rate = str(vmeta.get('bit_rate', ''))
+                video_info = f"{os.path.basename(filePath)} ({info.resolution()}, {info.duration:.2f} sec)"
+                video_details = f"Video: {vmeta.get('codec_name','?')} | Bitrate: {int(bit_rate)//1000 if bit_rate.isdigit() else '?'} kbps; Audio: {ameta.get('codec_name','?')} | Channels: {ameta.get('channels','?')} | Sample Rate: {ameta.get('sample_rate','?')} Hz"
+                self.log_user(f"Video loaded: {video_info}", bold_parts=[os.path.basename(filePath)])
+                self.log_user(video_details, indent=1)
+                self.on_media_probed(filePath, info)
+            else:
+                self.log_user(f"Video loaded: {os.path.basename(filePath)} (metadata unavailable)", bold_parts=[os.path.basename(filePath)])
+            # The previous video's proxy transcode would only compete with playback now
+            if self.proxy_thread is not None and self.proxy_thread.source != filePath:
+                self.cancel_proxy()
+            # Play the proxy if one is ready; cut points are the same on either file
+            self.playback_path = self.playback_source(filePath, info)
+            media = self.vlc_instance.media_new(self.playback_path)
+            self.vlc_player.set_media(media)
+            if sys.platform.startswith('win'):
+                self.vlc_player.set_hwnd(int(self.video_frame.winId()))
+            if info is not None and info.duration > 0:
+                # Known duration: no need to wait for VLC to report it
+                self.infoLabel.setText(self.infoLabel.text() + f" | Duration: {info.duration:.2f} sec")
+                self.duration = int(info.duration * 1000)
+                self.slider.setRange(0, self.duration)
+            else:
+                self.infoLabel.setText(self.infoLabel.text() + " | Duration: Unknown")
+                self.duration = 0
+                self.update_duration()
             self.show_status(f"Loaded: {os.path.basename(filePath)}")
             self.toggle_play_pause()
             self.timer.start()
@@ -613,6 +1604,92 @@ class SlyceApp(QMainWindow):
                 btn.setEnabled(True)
                 btn.setStyleSheet(MAIN_BUTTON_STYLE)
 
+    def load_waveform(self, filePath):
+        # Peaks come from the disk cache or one background ffmpeg pass
+        self.cancel_waveform()
+        self.waveformLane.set_peaks(None)
+        self.waveform_thread = WaveformThread(filePath, self.logger)
+        self.waveform_thread.waveform_ready.connect(self.on_waveform_ready)
+        self.waveform_thread.start()
+
+    def cancel_waveform(self):
+        if self.waveform_thread is not None:
+            self.waveform_thread.cancel()
+            self.waveform_thread.wait()
+            self.waveform_thread = None
+
+    def on_waveform_ready(self, source, peaks):
+        if source == self.videoPath:
+            self.waveformLane.set_peaks(peaks)
+
+    def playback_source(self, filePath, info):
+        """
+        Path for VLC to play: the cached proxy of filePath when proxies are on
+        and the source is larger than a proxy, else filePath itself. On a
+        cache miss a proxy transcode starts in the background and playback
+        switches over when it is ready.
+        """
+        if not self.settings['proxies'] or info is None or not needs_proxy(info):
+            return filePath
+        try:
+            proxy = self.proxy_cache.lookup(get_fingerprint(filePath))
+        except OSError as e:
+            self.logger.warning(f"Proxy lookup failed for {filePath}: {e}")
+            return filePath
+        if proxy is not None:
+            self.log_user("Playing low-resolution proxy", indent=1)
+            return proxy
+        self.start_proxy(filePath)
+        return filePath
+
+    def start_proxy(self, source):
+        if self.proxy_thread is not None:
+            if self.proxy_thread.source == source and self.proxy_thread.isRunning():
+                return
+            self.cancel_proxy()
+        self.log_user("Building playback proxy in the background...", indent=1)
+        self.proxy_thread = ProxyThread(source, self.proxy_cache, self.logger)
+        self.proxy_thread.proxy_ready.connect(self.on_proxy_ready)
+        self.proxy_thread.proxy_failed.connect(self.on_proxy_failed)
+        self.proxy_thread.start()
+
+    def cancel_proxy(self):
+        if self.proxy_thread is not None:
+            self.proxy_thread.cancel()
+            self.proxy_thread.wait()
+            self.proxy_thread = None
+
+    def on_proxy_ready(self, source, proxy):
+        if source != self.videoPath or not self.settings['proxies']:
+            return
+        self.log_user("Proxy ready, switched playback to it", indent=1)
+        self.switch_playback(proxy)
+
+    def on_proxy_failed(self, source, error):
+        if source == self.videoPath:
+            self.log_user("Proxy transcode failed; playing the original", indent=1)
+
+    def switch_playback(self, path):
+        """Swap the file VLC plays, keeping position and play/pause state."""
+        if not self.videoPath or path == self.playback_path:
+            return
+        position = self.seek_target if self.seek_target is not None else self.vlc_player.get_time()
+        playing = self.vlc_player.is_playing()
+        media = self.vlc_instance.media_new(path)
+        if position and position > 0:
+            media.add_option(f':start-time={position / 1000:.3f}')
+        if not playing:
+            media.add_option(':start-paused')
+        self.seek_settle_timer.stop()
+        self.seek_target = None
+        self.seek_in_flight = None
+        self.playback_path = path
+        self.logger.info(f"Playback switched to {path} at {position} ms")
+        self.vlc_player.set_media(media)
+        if sys.platform.startswith('win'):
+            self.vlc_player.set_hwnd(int(self.video_frame.winId()))
+        self.vlc_player.play()
+
     def play_video(self):
         self.logger.info("Play pressed.")
         self.vlc_player.play()
@@ -626,7 +1703,7 @@ class SlyceApp(QMainWindow):
 
     def poll_duration(self):
         dur = self.vlc_player.get_length()
-        self.logger.info(f"[poll_duration] VLC reported duration: {dur} ms")
+        self.logger.debug(f"[poll_duration] VLC reported duration: {dur} ms")
         if dur and dur > 0:
             self.slider.setRange(0, dur)
             self.duration = dur
@@ -647,6 +1724,9 @@ class SlyceApp(QMainWindow):
 
     def update_slider_position(self):
         pos = self.vlc_player.get_time()
+        # Don't yank the handle back while the user is dragging or a seek is settling
+        if self.slider.isSliderDown() or self.seek_in_flight is not None:
+            return
         if self.duration > 0:
             self.slider.blockSignals(True)
             self.slider.setValue(pos)
@@ -654,27 +1734,76 @@ class SlyceApp(QMainWindow):
         self.slider.set_segments(self.segments)
 
     def set_position(self, position):
-        self.vlc_player.set_time(position)
+        # Coalesce seeks: remember only the latest target and send it once the
+        # previous seek has settled, instead of one set_time per mouse move.
+        self.seek_target = position
+        if self.seek_in_flight is None:
+            self.issue_pending_seek()
+        if self.slider.isSliderDown():
+            self.show_scrub_preview(position, self.slider.x_for_value(position))
 
-    def get_video_info(self):
-        if not self.videoPath:
+    def issue_pending_seek(self):
+        target = self.seek_target
+        self.seek_target = None
+        self.vlc_player.set_time(target)
+        self.seek_in_flight = target
+        self.seek_clock.start()
+        self.seek_settle_timer.start()
+
+    def check_seek_settled(self):
+        if self.seek_in_flight is None:
+            self.seek_settle_timer.stop()
             return
-        try:
-            cmd = [
-                FFMPEG.replace('ffmpeg.exe', 'ffprobe.exe'), '-v', 'error', '-show_entries',
-                'format=duration', '-of', 'default=noprint_wrappers=1:nokey=1', self.videoPath
-            ]
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags).decode().strip()
-            self.infoLabel.setText(self.infoLabel.text() + f" | Duration: {float(output):.2f} sec")
-        except Exception as e:
-            self.infoLabel.setText(self.infoLabel.text() + f" | Duration: Unknown")
+        near_target = abs(self.vlc_player.get_time() - self.seek_in_flight) <= SEEK_SETTLE_TOLERANCE_MS
+        if not near_target and not self.seek_clock.hasExpired(SEEK_SETTLE_TIMEOUT_MS):
+            return
+        self.seek_in_flight = None
+        self.seek_settle_timer.stop()
+        if self.seek_target is not None:
+            self.issue_pending_seek()
+
+    def on_slider_released(self):
+        self.hide_scrub_preview()
+        self.set_position(self.slider.value())
+
+    def on_slider_hover(self, position, x):
+        self.show_scrub_preview(position, x)
+
+    def show_scrub_preview(self, position, x):
+        if not self.playback_path:
+            return
+        bucket_ms = position - position % PREVIEW_BUCKET_MS
+        # Decoding from the proxy, when one is playing, is much cheaper
+        self.preview_key = (self.playback_path, bucket_ms)
+        image = self.preview_cache.get(self.preview_key)
+        if image is None:
+            self.preview_thread.request(self.playback_path, bucket_ms)
+        self.scrubPreview.show_frame(image, position, self.slider.mapToGlobal(QPoint(x, 0)))
+
+    def hide_scrub_preview(self):
+        self.preview_key = None
+        self.scrubPreview.hide()
+
+    def on_preview_frame_ready(self, path, bucket_ms, image):
+        key = (path, bucket_ms)
+        self.preview_cache.put(key, image)
+        if key == self.preview_key and self.scrubPreview.isVisible():
+            self.scrubPreview.setPixmap(QPixmap.fromImage(image))
+            self.scrubPreview.image = image
 
     def mark_start(self):
         pos = self.vlc_player.get_time()
         self.logger.info(f"Mark start at {pos}")
         self.currentStart = pos
-        self.slider.set_temp_marker(start=pos, end=None)
-        self.show_status(f"Start marked at {Segment.format_time(pos)}. Select end.")
+        snapped = self.snapped_time(pos)
+        self.slider.set_temp_marker(start=pos, end=None, snapped_start=snapped)
+        if snapped is None:
+            cut = " (keyframes not indexed yet)"
+        elif snapped < pos:
+            cut = f"; the cut starts at the keyframe {(pos - snapped) / 1000:.2f}s earlier"
+        else:
+            cut = " on a keyframe"
+        self.show_status(f"Start marked at {Segment.format_time(pos)}{cut}. Select end.")
 
     def mark_end(self):
         if self.currentStart is None:
@@ -684,7 +1813,8 @@ class SlyceApp(QMainWindow):
             self.show_message_box(box)
             return
         end = self.vlc_player.get_time()
-        self.slider.set_temp_marker(start=self.currentStart, end=end)
+        snapped_start, snapped_end = self.snapped_time(self.currentStart), self.snapped_time(end, end=True)
+        self.slider.set_temp_marker(start=self.currentStart, end=end, snapped_start=snapped_start, snapped_end=snapped_end)
         self.logger.info(f"Mark end at {end}")
         # Edge case: end <= start
         if end <= self.currentStart:
@@ -704,6 +1834,8 @@ class SlyceApp(QMainWindow):
                 self.slider.clear_temp_marker()
                 return
         segment = Segment(self.currentStart, end)
+        if snapped_start is not None:
+            segment.snapped = (snapped_start, snapped_end)
         self.undo_stack.append(list(self.segments))
         self.redo_stack.clear()
         self.segments.append(segment)
@@ -711,103 +1843,167 @@ class SlyceApp(QMainWindow):
         self.slider.set_segments(self.segments)
         self.slider.clear_temp_marker()
         self.currentStart = None
+        self.save_segments()
         self.show_status(f"Segment added: {segment}")
 
     def undo_segment(self):
         if self.undo_stack:
             self.redo_stack.append(list(self.segments))
             self.segments = self.undo_stack.pop()
-            self.segmentList.clear()
-            for seg in self.segments:
-                self.segmentList.addItem(str(seg))
-            self.slider.set_segments(self.segments)
+            self.refresh_segments()
+            self.save_segments()
             self.show_status("Undo performed.")
 
     def redo_segment(self):
         if self.redo_stack:
             self.undo_stack.append(list(self.segments))
             self.segments = self.redo_stack.pop()
-            self.segmentList.clear()
-            for seg in self.segments:
-                self.segmentList.addItem(str(seg))
-            self.slider.set_segments(self.segments)
+            self.refresh_segments()
+            self.save_segments()
             self.show_status("Redo performed.")
 
-    def find_nearest_keyframe(self, start_time):
+    def restore_segments(self, path):
+        try:
+            segments = [Segment(start, end) for start, end in self.projects.load_segments(path)]
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Could not load saved segments of {path}: {e}")
+            return []
+        if segments:
+            self.logger.info(f"Restored {len(segments)} segments of {path}")
+            self.log_user(f"Restored {len(segments)} saved segments", indent=1)
+        return segments
+
+    def save_segments(self):
+        # Queued in the project store; the flush timer commits bursts of edits together
+        try:
+            self.projects.set_segments(self.videoPath, [(seg.start, seg.end) for seg in self.segments])
+        except (sqlite3.Error, OSError) as e:
+            self.logger.error(f"Could not save segments of {self.videoPath}: {e}")
+            return
+        if not self.projects_flush_timer.isActive():
+            self.projects_flush_timer.start()
+
+    def flush_projects(self):
+        self.projects_flush_timer.stop()
+        try:
+            self.projects.flush()
+        except sqlite3.Error as e:
+            self.logger.error(f"Could not write the project store: {e}")
+
+    def refresh_segments(self):
+        # Segment list and seek bar after the segments or the keyframe index changed
+        self.snap_segments(self.segments)
+        self.segmentList.clear()
+        self.segmentList.addItems([str(seg) for seg in self.segments])
+        self.slider.set_segments(self.segments)
+
+    def load_keyframe_index(self, path):
         """
-        Use ffprobe to find the nearest keyframe before the given start_time (in seconds).
-        Returns the timestamp (in seconds) of the nearest keyframe before start_time.
+        Use the cached keyframe index of path, or build it at background
+        priority; marks made meanwhile are snapped once it arrives.
         """
-        try:
-            cmd = [
-                FFMPEG.replace('ffmpeg.exe', 'ffprobe.exe'), '-v', 'error', '-select_streams', 'v:0',
-                '-show_frames', '-show_entries', 'frame=pkt_pts_time,key_frame',
-                '-of', 'csv', self.videoPath
-            ]
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags).decode()
-            keyframes = []
-            for line in output.splitlines():
-                if ',1' in line:  # key_frame=1
-                    parts = line.split(',')
-                    if len(parts) >= 3:
-                        try:
-                            t = float(parts[1])
-                            keyframes.append(t)
-                        except Exception:
-                            continue
-            # Find the last keyframe before or at start_time
-            keyframes = [t for t in keyframes if t <= start_time]
-            if keyframes:
-                return max(keyframes)
-            else:
-                return 0.0
-        except Exception as e:
-            self.logger.error(f"Failed to find keyframe: {e}")
-            return start_time
+        self.keyframe_cursor = None
+        self.keyframe_index = peek_keyframe_index(path)
+        if self.keyframe_index is not None or any(thread.path == path for thread in self.index_threads):
+            return
+        self.start_index_thread(path, background=True)
 
-    def find_next_keyframe(self, end_time):
+    def start_index_thread(self, path, background=False):
+        thread = IndexThread(path, background)
+        thread.finished.connect(lambda: self.on_index_thread_finished(thread))
+        self.index_threads.add(thread)
+        thread.start()
+        return thread
+
+    def on_index_thread_finished(self, thread):
+        thread.wait()
+        self.index_threads.discard(thread)
+        if thread is self.export_index_thread:
+            # It checks the path and installs the index itself
+            self.on_export_index_ready(thread)
+            return
+        if thread.path != self.videoPath:
+            return
+        if thread.error is not None:
+            self.logger.warning(f"Failed to index keyframes of {thread.path}: {thread.error}")
+            return
+        self.set_keyframe_index(thread.index)
+
+    def on_keyframes_indexed(self, path):
+        # The background pre-probe got there first
+        if path == self.videoPath and self.keyframe_index is None:
+            self.set_keyframe_index(peek_keyframe_index(path))
+
+    def set_keyframe_index(self, index):
+        if index is None or index is self.keyframe_index:
+            return
+        self.keyframe_index = index
+        # Cut points worked out against another index may not hold for this one
+        for segments in (self.segments, *self.undo_stack, *self.redo_stack):
+            for seg in segments:
+                seg.snapped = None
+        self.refresh_segments()
+        if self.slider.temp_marker:
+            start, end = self.slider.temp_marker
+            self.slider.set_temp_marker(start, end, self.snapped_time(start) if start is not None else None,
+                                        self.snapped_time(end, end=True) if end is not None else None)
+        self.logger.info(f"Keyframe index ready: {len(index.times)} keyframes")
+
+    def snap_segments(self, segments):
+        # Segments made before the index was ready, all in one sweep over it
+        if self.keyframe_index is None:
+            return
+        pending = [seg for seg in segments if seg.snapped is None]
+        if not pending:
+            return
+        ranges = self.keyframe_index.snap_ranges([(seg.start / 1000, seg.end / 1000) for seg in pending])
+        for seg, (start, end) in zip(pending, ranges):
+            seg.snapped = (round(start * 1000), round(end * 1000))
+
+    def snapped_time(self, ms, end=False):
         """
-        Use ffprobe to find the next keyframe after the given end_time (in seconds).
-        Returns the timestamp (in seconds) of the next keyframe after end_time.
-        If not found, returns end_time.
+        Where a stream-copy cut marked at ms really lands, in ms: the keyframe
+        at or before a start, the keyframe after an end. None until the
+        keyframe index of the video is loaded. A bisect, so it stays instant
+        on multi-hour files.
         """
-        try:
-            cmd = [
-                FFMPEG.replace('ffmpeg.exe', 'ffprobe.exe'), '-v', 'error', '-select_streams', 'v:0',
-                '-show_frames', '-show_entries', 'frame=pkt_pts_time,key_frame',
-                '-of', 'csv', self.videoPath
-            ]
-            output = subprocess.check_output(cmd, stderr=subprocess.STDOUT, creationflags=subprocess_flags).decode()
-            keyframes = []
-            for line in output.splitlines():
-                if ',1' in line:  # key_frame=1
-                    parts = line.split(',')
-                    if len(parts) >= 3:
-                        try:
-                            t = float(parts[1])
-                            keyframes.append(t)
-                        except Exception:
-                            continue
-            # Find the first keyframe after end_time
-            after = [t for t in keyframes if t > end_time]
-            if after:
-                return min(after)
-            else:
-                return end_time
-        except Exception as e:
-            self.logger.error(f"Failed to find next keyframe: {e}")
-            return end_time
+        if self.keyframe_index is None:
+            return None
+        t = self.keyframe_index.snap_end(ms / 1000) if end else self.keyframe_index.snap_start(ms / 1000)
+        return round(t * 1000)
+
+    def step_keyframe(self, direction):
+        """Seek to the previous (direction < 0) or next keyframe."""
+        if not self.videoPath:
+            return
+        if self.keyframe_index is None:
+            self.show_status("Keyframes are still being indexed.")
+            return
+        pos = self.vlc_player.get_time()
+        # Step from where the playhead is headed, so repeated presses walk
+        # keyframe by keyframe even before VLC has caught up
+        if self.seek_target is not None:
+            base = self.seek_target
+        elif self.seek_in_flight is not None:
+            base = self.seek_in_flight
+        elif self.keyframe_cursor is not None and abs(pos - self.keyframe_cursor) <= SEEK_SETTLE_TOLERANCE_MS:
+            base = self.keyframe_cursor
+        else:
+            base = pos
+        if direction < 0:
+            t = self.keyframe_index.keyframe_before((base - KEYFRAME_STEP_SLACK_MS) / 1000)
+        else:
+            t = self.keyframe_index.keyframe_after((base + KEYFRAME_STEP_SLACK_MS) / 1000)
+        if t is None:
+            self.show_status("No earlier keyframe." if direction < 0 else "No later keyframe.")
+            return
+        target = round(t * 1000)
+        self.keyframe_cursor = target
+        self.slider.setValue(target)
+        self.set_position(target)
+        self.show_status(f"Keyframe at {Segment.format_time_ms(target)}")
 
     def export_segments(self):
-        def log_user(msg, bold_parts=None, indent=0):
-            # Helper to log with consistent timestamp, bold, and optional indent
-            t = QTime.currentTime().toString('HH:mm:ss')
-            if bold_parts:
-                for part in bold_parts:
-                    msg = msg.replace(part, f'<b>{part}</b>')
-            prefix = '    ' * indent
-            self.logTextEdit.append(f"[{t}] {prefix}{msg}")
-            self.logTextEdit.moveCursor(self.logTextEdit.textCursor().End)
         self.logger.info("Export segments pressed.")
         if not self.segments or not self.videoPath:
             self.logger.warning("No segments or video loaded.")
@@ -815,150 +2011,225 @@ class SlyceApp(QMainWindow):
             box = QMessageBox(QMessageBox.Warning, "Error", "No segments or video loaded.", parent=self)
             self.show_message_box(box)
             return
-        # Confirmation before export
-        confirm_box = QMessageBox(QMessageBox.Question, "Confirm Export", f"Export {len(self.segments)} segments?", parent=self)
-        confirm_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
-        confirm_box.setMinimumWidth(400)
-        confirm = confirm_box.exec_()
-        if confirm != QMessageBox.Yes:
+        out_dir = self.settings['output_folder'] or os.path.dirname(self.videoPath)
+        if not os.path.isdir(out_dir):
+            self.logger.error(f"Output folder does not exist: {out_dir}")
+            self.show_status("Output folder does not exist.")
+            box = QMessageBox(QMessageBox.Critical, "Export Error", f"Output folder does not exist:\n{out_dir}", parent=self)
+            self.show_message_box(box)
+            return
+        # Plan the whole export against one keyframe index and show it before running.
+        # The video and segments are taken now: another video may be loaded while indexing
+        video_path, segments = self.videoPath, list(self.segments)
+        index = peek_keyframe_index(video_path)
+        if index is not None:
+            self.review_export(video_path, segments, index)
+            return
+        # Not cached yet: wait for the scan loading the video started, or build
+        # it on a worker thread, and carry on when it is done
+        self.show_status("Indexing keyframes...")
+        self.exportBtn.setEnabled(False)
+        self.exportShortcut.setEnabled(False)
+        thread = next((thread for thread in self.index_threads if thread.path == video_path), None)
+        self.export_index_thread = thread or self.start_index_thread(video_path)
+        self.export_index_segments = segments
+
+    def on_export_index_ready(self, thread):
+        segments = self.export_index_segments
+        self.export_index_thread = self.export_index_segments = None
+        self.exportBtn.setEnabled(True)
+        self.exportShortcut.setEnabled(True)
+        if thread.error is not None:
+            self.logger.error(f"Failed to index keyframes: {thread.error}")
+        if thread.path != self.videoPath:
+            self.show_status("Export cancelled: another video was loaded while indexing keyframes.")
+            return
+        self.set_keyframe_index(thread.index)
+        self.review_export(thread.path, segments, thread.index)
+
+    def review_export(self, video_path, segments, index):
+        """Show the export plan of segments of video_path and start the export the user accepts."""
+        out_dir = self.settings['output_folder'] or os.path.dirname(video_path)
+        merge = self.settings['export_mode'] == EXPORT_MODE_MERGE
+        # Copy only the selected tracks; without stream info fall back to ffmpeg's defaults.
+        # The plan leaves out tracks the chosen packaging cannot hold
+        info = self.current_media_info()
+        streams = self.stream_profiles.selection_for(info) if info is not None and info.streams else None
+
+        def make_plan(coalesce_gap, packaging):
+            return plan_export(video_path, segments, index, self.settings['export_mode'], self.settings['output_folder'],
+                               self.settings['filename_pattern'], coalesce_gap, packaging, info, streams)
+
+        dlg = ExportPlanDialog(make_plan, self.settings['coalesce_gap'], self.settings['packaging'], merge,
+                               self.settings['sink'], self.settings['sink_path'], self.settings['stream_format'],
+                               self.settings['framing'], self)
+        if not dlg.exec_() or dlg.plan is None:
             self.show_status("Export cancelled.")
             return
-        # Pause playback if playing
-        self._was_playing = self.vlc_player.is_playing()
-        if self._was_playing:
-            self.vlc_player.pause()
-            self.logger.info("Playback paused for export.")
-        # Disable all controls and shortcuts
-        self.set_controls_enabled(False)
-        self.set_shortcuts_enabled(False)
-        # During export, enable Stop Export button and set its style to normal
-        self.stopExportBtn.setEnabled(True)
-        self.stopExportBtn.setStyleSheet(MAIN_BUTTON_STYLE)
-        self.progressBar.setVisible(True)
-        self.progressBar.setMaximum(len(self.segments))
-        self.progressBar.setValue(0)
-        base, ext = os.path.splitext(self.videoPath)
-        base_name = os.path.basename(base)
-        dir_name = os.path.dirname(self.videoPath)
-        outfiles = []
-        for seg in self.segments:
-            start_epoch = int(seg.start)
-            end_epoch = int(seg.end)
-            outfile = os.path.join(dir_name, f"{base_name}_{start_epoch}-{end_epoch}{ext}")
-            outfiles.append(outfile)
+        self.settings['coalesce_gap'] = dlg.coalesce_gap.value()
+        self.settings['packaging'] = dlg.packaging.currentData()
+        self.settings['sink'] = dlg.sink_kind.currentData()
+        self.settings['sink_path'] = dlg.sink_path.text().strip()
+        self.settings['stream_format'] = dlg.stream_format.currentData()
+        self.settings['framing'] = FRAMING_CHUNKED if dlg.framing.isChecked() else FRAMING_NONE
+        plan = dlg.plan
+        sink = dlg.sink
+        # A streamed export writes no files, so there is nothing to resume or collide with
+        outfiles = plan.outfiles if sink is None else []
+        for warning in plan.warnings:
+            self.logger.warning(warning)
+            self.log_user(f"WARNING: {warning}")
+        # Outputs recorded in this folder's export journal belong to an earlier
+        # (possibly interrupted) export: offer to resume instead of aborting
+        try:
+            journal = ExportJournal.load(video_path, out_dir)
+        except OSError as e:
+            self.logger.warning(f"Could not read export journal: {e}")
+            journal = None
+        owned = [f for f in outfiles if journal is not None and journal.owns(f)]
+        resume = False
+        if owned:
+            done = sum(1 for f in owned if journal.entry(f).get('state') == 'done')
+            box = QMessageBox(QMessageBox.Question, "Resume Export",
+                              f"{len(owned)} of the planned outputs were recorded by a previous export ({done} completed).\n"
+                              "Resume and skip outputs that verify as complete? Choose No to export them again.", parent=self)
+            box.setStandardButtons(QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
+            answer = self.show_message_box(box)
+            if answer == QMessageBox.Cancel:
+                self.show_status("Export cancelled.")
+                return
+            resume = answer == QMessageBox.Yes
         for f in outfiles:
-            if os.path.exists(f):
+            if os.path.exists(f) and f not in owned:
                 self.logger.error(f"File exists: {f}")
                 self.show_status(f"File exists: {os.path.basename(f)}")
-                from PyQt5.QtCore import QDateTime
-                now = QDateTime.currentDateTime().toString('yyyy-MM-dd HH:mm:ss')
-                self.logTextEdit.append(f"[{now}] ERROR: File exists: {os.path.basename(f)}")
+                self.log_user(f"ERROR: File exists: {os.path.basename(f)}")
                 box = QMessageBox(QMessageBox.Critical, "File Exists", f"Cannot export. File exists: {os.path.basename(f)}", parent=self)
                 self.show_message_box(box)
-                # Reset export state if file exists
-                self.set_controls_enabled(True)
-                self.set_shortcuts_enabled(True)
-                self.stopExportBtn.setEnabled(False)
-                self.stopExportBtn.setVisible(False)
-                self.progressBar.setVisible(False)
                 return
-        # During export, disable menu bar, load videos button, and playlist double click
-        self.menuBar().setEnabled(False)
-        self.loadBtn.setEnabled(False)
-        self.playlistWidget.itemDoubleClicked.disconnect()
+        # Background probes would compete with the export for the disk
+        self.pause_background_probes('export')
+        # Playback and marking carry on: the export runs at lowered priority
+        # under the governor, so only a second export is blocked
+        self.set_exporting(True)
+        self.progressBar.setVisible(True)
+        # A merge is one ffmpeg pass, so show a busy indicator instead of per-segment steps
+        self.progressBar.setMaximum(0 if merge else len(plan.jobs))
+        self.progressBar.setValue(0)
         # Add log entry for export start
-        log_user(f"Export started: {len(self.segments)} segments to {dir_name}", bold_parts=[str(len(self.segments)), dir_name])
+        destination = sink.describe() if sink is not None else out_dir
+        self.export_record = (video_path, destination, plan.mode,
+                              self.settings['packaging'] if sink is None else PACKAGING_PLAIN,
+                              None if sink is None else sink.format, [(seg.start, seg.end) for seg in segments])
+        self.log_user(f"Export started: {len(segments)} segments to {destination}", bold_parts=[str(len(segments)), destination])
         self.show_status("Exporting segments...")
         self.export_thread = ExportThread(
-            list(self.segments), self.videoPath, outfiles,
-            self.find_nearest_keyframe, self.find_next_keyframe, self.logger
+            plan, video_path, self.logger, resume,
+            ExportCache(max_bytes=self.settings['export_cache_gb'] * 1024 ** 3) if self.settings['export_cache'] else None,
+            plan.streams, sink, self.export_governor
         )
+        self.update_export_governor()
         self.export_thread.status_update.connect(self.on_export_status_update)
+        self.export_thread.outputs_done.connect(self.progressBar.setValue)
         self.export_thread.export_done.connect(self.on_export_done)
         self.export_thread.start()
 
-    def set_controls_enabled(self, enabled):
-        for btn in [self.playPauseBtn, self.muteBtn, self.markStartBtn, self.markEndBtn, self.undoBtn, self.redoBtn, self.exportBtn]:
-            btn.setEnabled(enabled)
-            if enabled:
-                btn.setStyleSheet(MAIN_BUTTON_STYLE)
-            else:
-                btn.setStyleSheet(DISABLED_BUTTON_STYLE)
-        self.slider.setEnabled(enabled)
-        self.segmentList.setEnabled(enabled)
-        self.stopExportBtn.setEnabled(not enabled)
-        if enabled:
-            self.stopExportBtn.setStyleSheet(MAIN_BUTTON_STYLE)
-        else:
-            self.stopExportBtn.setStyleSheet(DISABLED_BUTTON_STYLE)
-        self.stopExportBtn.setVisible(not enabled)
+    def set_exporting(self, exporting):
+        self.exportBtn.setEnabled(not exporting)
+        self.exportBtn.setStyleSheet(DISABLED_BUTTON_STYLE if exporting else MAIN_BUTTON_STYLE)
+        self.exportShortcut.setEnabled(not exporting)
+        self.stopExportBtn.setEnabled(exporting)
+        self.stopExportBtn.setStyleSheet(MAIN_BUTTON_STYLE if exporting else DISABLED_BUTTON_STYLE)
+        self.stopExportBtn.setVisible(exporting)
 
-    def set_shortcuts_enabled(self, enabled):
-        for shortcut in [self.playPauseShortcut, self.muteShortcut, self.undoShortcut, self.redoShortcut, self.exportShortcut, self.startShortcut, self.endShortcut]:
-            shortcut.setEnabled(enabled)
+    def update_export_governor(self):
+        # One ffmpeg at a time while the user is watching, more when paused
+        self.export_governor.playing = self.vlc_player.is_playing()
 
     def on_export_status_update(self, msg):
         if msg.startswith("Exporting segment"):
-            try:
-                idx = int(msg.split()[2].split('/')[0])
-                self.progressBar.setValue(idx)
-            except Exception:
-                pass
             # Indent segment export progress
-            self.logTextEdit.append(f"    {msg}")
+            self.append_log(msg, indent=1)
         else:
-            self.logTextEdit.append(msg)
-        self.logTextEdit.moveCursor(self.logTextEdit.textCursor().End)
+            self.append_log(msg)
 
     def on_export_done(self, success, msg):
-        def log_user(msg, bold_parts=None, indent=0):
-            # Helper to log with consistent timestamp, bold, and optional indent
-            t = QTime.currentTime().toString('HH:mm:ss')
-            if bold_parts:
-                for part in bold_parts:
-                    msg = msg.replace(part, f'<b>{part}</b>')
-            prefix = '    ' * indent
-            self.logTextEdit.append(f"[{t}] {prefix}{msg}")
-            self.logTextEdit.moveCursor(self.logTextEdit.textCursor().End)
-        self.set_controls_enabled(True)
-        self.set_shortcuts_enabled(True)
-        self.stopExportBtn.setEnabled(False)
-        self.stopExportBtn.setVisible(False)
+        self.record_export(success, msg)
+        self.resume_background_probes('export')
+        self.set_exporting(False)
         self.progressBar.setVisible(False)
-        # Re-enable menu bar, load videos button, and playlist double click after export
-        self.menuBar().setEnabled(True)
-        self.loadBtn.setEnabled(True)
-        self.playlistWidget.itemDoubleClicked.connect(self.on_playlist_double_click)
-        # Resume playback if it was playing before export
-        if hasattr(self, '_was_playing') and self._was_playing:
-            self.vlc_player.play()
-            self.logger.info("Playback resumed after export.")
         if success:
-            log_user(f"Export complete: {msg}", bold_parts=[msg])
+            self.log_user(f"Export complete: {msg}", bold_parts=[msg])
             self.show_status(msg)
             box = QMessageBox(QMessageBox.Information, "Export Complete", msg, parent=self)
             self.show_message_box(box)
         else:
-            log_user(f"Error: {msg}", bold_parts=[msg])
+            self.log_user(f"Error: {msg}", bold_parts=[msg])
             self.show_status("Export failed.")
             box = QMessageBox(QMessageBox.Critical, "Export Error", msg, parent=self)
             self.show_message_box(box)
 
+    def record_export(self, success, msg):
+        if self.export_record is None:
+            return
+        path, destination, mode, packaging, stream_format, segments = self.export_record
+        self.export_record = None
+        try:
+            self.projects.record_export(path, success, destination, mode, packaging, stream_format, segments, msg)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Could not record the export of {path}: {e}")
+        self.flush_projects()
+
     def stop_export(self):
         if hasattr(self, 'export_thread') and self.export_thread.isRunning():
-            self.export_thread.terminate()
-            self.export_thread.wait()
+            self.export_thread.cancel()
+            if not self.export_thread.wait(2000):
+                self.export_thread.terminate()
+                self.export_thread.wait()
+            self.record_export(False, "Stopped by user.")
+            self.resume_background_probes('export')
             self.show_status("Export stopped by user.")
-            self.logTextEdit.append("Export stopped by user.")
-            self.set_controls_enabled(True)
-            self.set_shortcuts_enabled(True)
-            self.stopExportBtn.setEnabled(False)
-            self.stopExportBtn.setVisible(False)
+            self.append_log("Export stopped by user.")
+            self.set_exporting(False)
             self.progressBar.setVisible(False)
 
     def show_status(self, msg):
         self.statusBar.showMessage(msg)
 
+    def log_user(self, msg, bold_parts=None, indent=0):
+        # Log with consistent timestamp, bold, and optional indent
+        t = QTime.currentTime().toString('HH:mm:ss')
+        self.append_log(f"[{t}] {msg}", bold_parts, indent)
+
+    def append_log(self, msg, bold_parts=None, indent=0):
+        # Lines are buffered and written to the panel once per event-loop tick
+        line = html.escape(msg)
+        for part in bold_parts or []:
+            part = html.escape(part)
+            line = line.replace(part, f'<b>{part}</b>')
+        self.log_buffer.append('&nbsp;' * 4 * indent + line)
+        if not self.log_flush_scheduled:
+            self.log_flush_scheduled = True
+            QTimer.singleShot(0, self.flush_log)
+
+    def flush_log(self):
+        self.log_flush_scheduled = False
+        # Anything beyond the block cap would be trimmed straight away
+        lines = self.log_buffer[-LOG_PANEL_MAX_BLOCKS:]
+        self.log_buffer = []
+        if not lines:
+            return
+        cursor = self.logTextEdit.textCursor()
+        cursor.movePosition(cursor.End)
+        cursor.beginEditBlock()
+        for line in lines:
+            if not self.logTextEdit.document().isEmpty():
+                cursor.insertBlock()
+            cursor.insertHtml(line)
+        cursor.endEditBlock()
+        scrollbar = self.logTextEdit.verticalScrollBar()
+        scrollbar.setValue(scrollbar.maximum())
+
     def update_slider_highlight(self):
         pos = self.vlc_player.get_time()
         for seg in self.segments:
@@ -972,10 +2243,63 @@ class SlyceApp(QMainWindow):
         dlg.output_folder.setText(self.settings['output_folder'])
         dlg.filename_pattern.setText(self.settings['filename_pattern'])
         dlg.reencode.setChecked(self.settings['reencode'])
+        dlg.export_mode.setCurrentIndex(max(0, dlg.export_mode.findData(self.settings['export_mode'])))
+        dlg.export_cache.setChecked(self.settings['export_cache'])
+        dlg.export_cache_gb.setValue(self.settings['export_cache_gb'])
+        dlg.proxies.setChecked(self.settings['proxies'])
+        dlg.keyframe_shortcuts.setChecked(self.settings['keyframe_shortcuts'])
         if dlg.exec_():
             self.settings['output_folder'] = dlg.output_folder.text()
             self.settings['filename_pattern'] = dlg.filename_pattern.text()
             self.settings['reencode'] = dlg.reencode.isChecked()
+            self.settings['export_mode'] = dlg.export_mode.currentData()
+            self.settings['export_cache'] = dlg.export_cache.isChecked()
+            self.settings['export_cache_gb'] = dlg.export_cache_gb.value()
+            self.settings['keyframe_shortcuts'] = dlg.keyframe_shortcuts.isChecked()
+            self.prevKeyframeShortcut.setEnabled(self.settings['keyframe_shortcuts'])
+            self.nextKeyframeShortcut.setEnabled(self.settings['keyframe_shortcuts'])
+            if dlg.proxies.isChecked() != self.settings['proxies']:
+                self.settings['proxies'] = dlg.proxies.isChecked()
+                self.apply_proxy_setting()
+
+    def apply_proxy_setting(self):
+        # Switch the loaded video to or from its proxy without reloading it
+        if not self.videoPath:
+            return
+        if self.settings['proxies']:
+            self.switch_playback(self.playback_source(self.videoPath, self.current_media_info()))
+        else:
+            self.cancel_proxy()
+            self.switch_playback(self.videoPath)
+
+    def current_media_info(self):
+        try:
+            return get_media_info(self.videoPath)
+        except Exception as e:
+            self.logger.warning(f"Failed to probe {self.videoPath}: {e}")
+            return None
+
+    def open_stream_selection(self):
+        if not self.videoPath:
+            self.show_status("No video loaded.")
+            return
+        info = self.current_media_info()
+        if info is None or not info.streams:
+            box = QMessageBox(QMessageBox.Warning, "Streams", "Stream information is not available for this video.", parent=self)
+            self.show_message_box(box)
+            return
+        dlg = StreamSelectionDialog(info, self.stream_profiles.selection_for(info), self)
+        if dlg.exec_():
+            streams = dlg.selected_streams()
+            if not streams:
+                box = QMessageBox(QMessageBox.Warning, "Streams", "Select at least one track.", parent=self)
+                self.show_message_box(box)
+                return
+            try:
+                self.stream_profiles.remember(info, streams)
+            except OSError as e:
+                self.logger.warning(f"Could not save stream selection: {e}")
+            self.log_user(f"Export streams: {', '.join(describe_stream(st) for st in info.streams if st['index'] in streams)}")
 
     def open_about(self):
         dlg = AboutDialog(self)
@@ -985,11 +2309,49 @@ class SlyceApp(QMainWindow):
         box.setMinimumWidth(400)
         return box.exec_()
 
+    def closeEvent(self, event):
+        # Exports no longer lock the window, so one may still be running
+        if hasattr(self, 'export_thread') and self.export_thread.isRunning():
+            self.export_thread.cancel()
+            self.export_thread.wait()
+            self.record_export(False, "Stopped when the app closed.")
+        self.preview_thread.stop()
+        self.cancel_proxy()
+        self.cancel_waveform()
+        # Drop queued probes, let blocked ones see they are stale, kill running ffprobes
+        self.probe_generation += 1
+        self.probe_pool.clear()
+        self.probe_holds.clear()
+        self.probe_gate.set()
+        kill_background_processes()
+        self.probe_pool.waitForDone()
+        for thread in list(self.index_threads):
+            thread.wait()
+        self.projects_flush_timer.stop()
+        try:
+            self.projects.close()
+        except sqlite3.Error as e:
+            self.logger.error(f"Could not write the project store: {e}")
+        self.logger.info("App closed.")
+        # The summary and profile go to the log, so finish them before it closes
+        if self.diagnostics is not None:
+            self.diagnostics.stop()
+            self.diagnostics = None
+        stop_logger()
+        super().closeEvent(event)
+
 def main():
+    diagnostics = None
+    profile = diagnostics_requested(sys.argv)
     app = QApplication(sys.argv)
-    window = SlyceApp()
+    if profile:
+        diagnostics = Diagnostics(setup_logger(), os.path.join(base_path, 'logs'))
+        diagnostics.start()
+    window = SlyceApp(diagnostics)
     window.show()
-    sys.exit(app.exec_())
+    exit_code = app.exec_()
+    stop_logger()
+    sys.exit(exit_code)
 
 if __name__ == '__main__':
     main()
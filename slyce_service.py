@@ -0,0 +1,559 @@
+# slyce_service.py
+# Optional service mode: a local JSON API around the export engine, so other
+# tools can submit cut jobs to one long-running process that keeps probe
+# results and keyframe indexes warm between jobs. No Qt or VLC needed.
+#
+#   python slyce_service.py --port 8765            (HTTP on 127.0.0.1)
+#   python slyce_service.py --socket /tmp/slyce.sock   (Unix socket)
+#   python slyce_service.py --pipe-dir /tmp/slyce-pipes  (allow "sink" inside that folder)
+#
+#   POST   /jobs        {"source": "...", "segments": [[start_ms, end_ms], ...],
+#                        "output_folder": "", "filename_pattern": "...",
+#                        "mode": "separate"|"merge", "streams": [0, 1],
+#                        "coalesce_gap": 0, "packaging": "plain"|"faststart"|"fragmented"|"hls",
+#                        "sink": {"type": "file"|"pipe"|"pipes", "path": "...",
+#                                 "format": "mpegts"|"fmp4", "framing": "chunked"|"none"}}
+#   GET    /jobs        list of jobs
+#   GET    /jobs/<id>   one job with per-output state
+#   DELETE /jobs/<id>   cancel a queued or running job
+#   GET    /health      scheduler and cache counters
+import os
+import asyncio
+import argparse
+import json
+import logging
+import itertools
+import contextlib
+import threading
+import time
+from collections import deque
+
+from engine import (
+    EXPORT_MODE_SEPARATE, EXPORT_MODE_MERGE, DEFAULT_FILENAME_PATTERN, get_keyframe_index, get_media_info,
+    plan_export, check_filename_pattern, build_concat_list, build_segment_cmd, build_merge_cmd, partial_path,
+    check_free_space, format_bytes, ExportJournal, StreamProfiles, MediaInfo, process_kwargs, lower_priority,
+    media_cache_stats, Span, PACKAGING_PLAIN, PACKAGINGS, hls_segment_files, ResourceGovernor
+)
+from sinks import StreamSink, SinkError, SINK_FILE, SINK_STDOUT, STREAM_FORMAT_MPEGTS, FRAMING_CHUNKED
+
+DEFAULT_PORT = 8765
+DEFAULT_CONCURRENCY = 2
+# How often a job waiting on the resource governor checks again, in seconds
+GOVERNOR_POLL_SECONDS = 0.5
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 4 * 1024 * 1024
+# Finished jobs kept for GET /jobs; older ones are forgotten
+MAX_FINISHED_JOBS = 500
+
+logger = logging.getLogger("Slyce.service")
+
+class JobError(Exception):
+    pass
+
+
+class Job:
+    """One submitted cut job: a source, its segments and the outputs they produce."""
+    _ids = itertools.count(1)
+
+    def __init__(self, source, segments, output_folder, filename_pattern, mode, streams, coalesce_gap=0.0,
+                 packaging=PACKAGING_PLAIN, sink=None):
+        self.id = str(next(self._ids))
+        self.source = source
+        self.segments = segments
+        self.output_folder = output_folder
+        self.filename_pattern = filename_pattern
+        self.mode = mode
+        self.streams = streams
+        self.coalesce_gap = coalesce_gap
+        self.packaging = packaging
+        self.sink = sink  # StreamSink to stream into instead of writing files, or None
+        self.status = 'queued'  # queued, running, done, failed, cancelled
+        self.error = None
+        self.warnings = []  # planner notes, e.g. overlapping segments
+        self.outputs = []  # [{'file', 'segments', 'ranges', 'estimated_bytes', 'state'}], filled in when planned
+        self.planned = []  # the plan's ExportJobs, which a sink streams
+        self.created = time.time()
+        self.finished = None
+        self.task = None
+        self.processes = set()
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'source': self.source, 'mode': self.mode, 'status': self.status,
+            'error': self.error, 'segments': [list(seg) for seg in self.segments],
+            'sink': self.sink.describe() if self.sink is not None else SINK_FILE,
+            'warnings': self.warnings, 'outputs': self.outputs, 'created': self.created, 'finished': self.finished,
+        }
+
+
+class RequestRejected(Exception):
+    """A request refused before routing; carries the HTTP status."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Scheduler:
+    """Runs jobs on the event loop, with at most `concurrency` ffmpeg processes at once.
+
+    Within that, the resource governor lowers the number of processes
+    started while the machine is busy; running ones are never stopped.
+
+    Probing and indexing are blocking engine calls, so they run in the
+    default executor; their results stay in the engine's in-memory LRU for
+    later jobs on the same files.
+    """
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, pipe_dir=None):
+        self.concurrency = concurrency
+        self.pipe_dir = os.path.realpath(pipe_dir) if pipe_dir else None  # sinks are refused without it
+        self.slots = asyncio.Semaphore(concurrency)
+        self.governor = ResourceGovernor(concurrency)
+        self.running = 0  # ffmpeg processes started and not yet finished
+        self.jobs = {}
+        self.finished_ids = deque()  # finished jobs, oldest first, for pruning self.jobs
+        # Journals shared by the unfinished jobs of one (source, folder), so
+        # their saves never overwrite each other: key -> [journal, job count]
+        self.journals = {}
+        self.claimed = {}  # normalised output path -> id of the unfinished job writing it
+        self.stream_profiles = StreamProfiles()
+
+    def submit(self, request):
+        source = request.get('source')
+        if not isinstance(source, str) or not os.path.isfile(source):
+            raise JobError(f"Source not found: {source}")
+        try:
+            segments = [Span(int(a), int(b)) for a, b in request.get('segments', [])]
+        except (TypeError, ValueError):
+            raise JobError("segments must be a list of [start_ms, end_ms] pairs")
+        if not segments:
+            raise JobError("No segments given")
+        for seg in segments:
+            if seg.end <= seg.start or seg.start < 0:
+                raise JobError(f"Invalid segment {list(seg)}: end must be after start")
+        mode = request.get('mode', EXPORT_MODE_SEPARATE)
+        if mode not in (EXPORT_MODE_SEPARATE, EXPORT_MODE_MERGE):
+            raise JobError(f"Unknown mode: {mode}")
+        output_folder = request.get('output_folder') or ''
+        if output_folder and not os.path.isdir(output_folder):
+            raise JobError(f"Output folder does not exist: {output_folder}")
+        streams = request.get('streams')
+        if streams is not None and not (isinstance(streams, list) and all(isinstance(i, int) for i in streams)):
+            raise JobError("streams must be a list of stream indices")
+        try:
+            coalesce_gap = float(request.get('coalesce_gap') or 0)
+        except (TypeError, ValueError):
+            raise JobError("coalesce_gap must be a number of seconds")
+        packaging = request.get('packaging') or PACKAGING_PLAIN
+        if packaging not in PACKAGINGS:
+            raise JobError(f"Unknown packaging: {packaging}")
+        filename_pattern = request.get('filename_pattern') or DEFAULT_FILENAME_PATTERN
+        if not isinstance(filename_pattern, str):
+            raise JobError("filename_pattern must be a string")
+        if '/' in filename_pattern or '\\' in filename_pattern or '..' in filename_pattern:
+            # Outputs go into output_folder and nowhere else
+            raise JobError("filename_pattern must not contain path separators or '..'")
+        try:
+            check_filename_pattern(filename_pattern)
+        except ValueError as e:
+            raise JobError(str(e))
+        sink = self.parse_sink(request.get('sink'))
+        job = Job(source, segments, output_folder, filename_pattern, mode, streams, coalesce_gap, packaging, sink)
+        self.jobs[job.id] = job
+        job.task = asyncio.ensure_future(self.run_job(job))
+        job.task.add_done_callback(lambda task: self.on_job_done(job, task))
+        logger.info(f"Job {job.id} queued: {source}, {len(segments)} segments")
+        return job
+
+    def parse_sink(self, spec):
+        if spec is None:
+            return None
+        if not isinstance(spec, dict):
+            raise JobError("sink must be an object")
+        kind = spec.get('type') or SINK_FILE
+        if kind == SINK_FILE:
+            return None
+        if kind == SINK_STDOUT:
+            raise JobError("The service cannot stream to its own stdout; use a named pipe")
+        if self.pipe_dir is None:
+            raise JobError("Streaming sinks are off; start the service with --pipe-dir to allow them")
+        path = spec.get('path')
+        if not isinstance(path, str) or not self.in_pipe_dir(path):
+            raise JobError(f"Sink path must be inside the pipe folder {self.pipe_dir}")
+        try:
+            return StreamSink(kind, path, spec.get('format') or STREAM_FORMAT_MPEGTS, spec.get('framing') or FRAMING_CHUNKED)
+        except SinkError as e:
+            raise JobError(str(e))
+
+    def in_pipe_dir(self, path):
+        # Resolved, so neither '..' nor a symlink leads out of the folder
+        real = os.path.realpath(path)
+        try:
+            return os.path.commonpath([real, self.pipe_dir]) == self.pipe_dir
+        except ValueError:  # another drive
+            return False
+
+    def cancel(self, job):
+        if job.status in ('queued', 'running'):
+            job.task.cancel()
+            return True
+        return False
+
+    def on_job_done(self, job, task):
+        if task.cancelled():
+            # Cancelled before run_job started, so it never saw the cancel
+            job.status = 'cancelled'
+            job.finished = time.time()
+        self.finished_ids.append(job.id)
+        while len(self.finished_ids) > MAX_FINISHED_JOBS:
+            self.jobs.pop(self.finished_ids.popleft(), None)
+
+    async def run_job(self, job):
+        loop = asyncio.get_running_loop()
+        journal_key = None
+        try:
+            journal, journal_key = await self.plan(job, loop)
+            if job.sink is not None:
+                await self.stream(job, loop)
+                job.status = 'done'
+                return
+            for output in job.outputs:
+                # Outputs verified by an earlier run are skipped, like a GUI resume
+                if await loop.run_in_executor(None, journal.is_verified, output['file'], output['ranges']):
+                    output['state'] = 'skipped'
+                    continue
+                journal.plan(output['file'], output['ranges'])
+                await self.run_output(job, output)
+                info = await loop.run_in_executor(None, MediaInfo.probe, output['file'])
+                journal.complete(output['file'], os.path.getsize(output['file']), info.duration)
+            job.status = 'done'
+        except asyncio.CancelledError:
+            job.status = 'cancelled'
+            for output in job.outputs:
+                if output['state'] == 'running':
+                    output['state'] = 'cancelled'
+                    self.remove_segments(output['file'])
+                if job.sink is None:
+                    self.remove_partial(output['file'])
+        except Exception as e:
+            job.status = 'failed'
+            job.error = str(e)
+            logger.error(f"Job {job.id} failed: {e}")
+        finally:
+            self.release(job, journal_key)
+            job.finished = time.time()
+            logger.info(f"Job {job.id} {job.status}")
+
+    async def plan(self, job, loop):
+        """Fill in job.outputs and return (journal, key) for the output folder's export journal.
+
+        Uses the same planner as the GUI export, so naming, snapping,
+        coalescing and read order match, then checks collisions, including
+        with outputs other jobs are still writing, and space. The journal is
+        shared with the other unfinished jobs on the same source and folder;
+        release() gives it back.
+        """
+        index = await loop.run_in_executor(None, get_keyframe_index, job.source)
+        info = await loop.run_in_executor(None, get_media_info, job.source)
+        if job.streams is None:
+            job.streams = self.stream_profiles.selection_for(info) if info.streams else None
+        try:
+            plan = plan_export(job.source, job.segments, index, job.mode, job.output_folder, job.filename_pattern,
+                               job.coalesce_gap, job.packaging, info, job.streams)
+        except ValueError as e:
+            raise JobError(str(e))
+        # Less than asked for when the packaging cannot hold some tracks
+        job.streams = plan.streams
+        job.warnings = plan.warnings
+        job.planned = plan.jobs
+        if job.sink is not None:
+            # Streamed outputs never touch the disk: no journal, collisions or space to check
+            job.outputs = [
+                {'file': job.sink.output_name(j), 'segments': j.segments, 'ranges': j.ranges, 'estimated_bytes': j.estimated_bytes, 'state': 'pending'}
+                for j in plan.jobs
+            ]
+            return None, None
+        out_dir = os.path.dirname(plan.outfiles[0])
+        for f in plan.outfiles:
+            if os.path.dirname(f) != out_dir:
+                raise JobError(f"Output outside the output folder: {f}")
+            other = self.claimed.get(self.normalize(f))
+            if other is not None:
+                raise JobError(f"File is being written by job {other}: {f}")
+        key = (self.normalize(job.source), self.normalize(out_dir))
+        shared = self.journals.get(key)
+        journal = shared[0] if shared is not None else ExportJournal.load(job.source, out_dir)
+        for f in plan.outfiles:
+            if os.path.exists(f) and not journal.owns(f):
+                raise JobError(f"File exists: {f}")
+        ok, free = check_free_space(out_dir, plan.estimated_bytes)
+        if not ok:
+            raise JobError(f"Not enough free space in {out_dir}: need {format_bytes(plan.estimated_bytes)}, free {format_bytes(free)}")
+        # No await since the collision checks, so no other job can claim these in between
+        self.journals.setdefault(key, [journal, 0])[1] += 1
+        for f in plan.outfiles:
+            self.claimed[self.normalize(f)] = job.id
+        job.outputs = [
+            {'file': j.outfile, 'segments': j.segments, 'ranges': j.ranges, 'estimated_bytes': j.estimated_bytes, 'state': 'pending'}
+            for j in plan.jobs
+        ]
+        return journal, key
+
+    def release(self, job, journal_key):
+        if journal_key is None:
+            return
+        for output in job.outputs:
+            self.claimed.pop(self.normalize(output['file']), None)
+        self.journals[journal_key][1] -= 1
+        if not self.journals[journal_key][1]:
+            del self.journals[journal_key]
+
+    @staticmethod
+    def normalize(path):
+        return os.path.normcase(os.path.abspath(path))
+
+    async def run_output(self, job, output):
+        outfile = output['file']
+        tmpfile = partial_path(outfile)
+        if job.mode == EXPORT_MODE_MERGE:
+            cmd = build_merge_cmd(tmpfile, job.streams, job.packaging)
+            stdin_data = build_concat_list(job.source, output['ranges']).encode()
+        else:
+            (start_sec, end_sec), = output['ranges']
+            cmd = build_segment_cmd(job.source, start_sec, end_sec, tmpfile, job.streams, job.packaging)
+            stdin_data = None
+        async with self.slots, self.governed():
+            job.status = 'running'
+            output['state'] = 'running'
+            process = await asyncio.create_subprocess_exec(
+                *cmd, stdin=asyncio.subprocess.PIPE if stdin_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, **process_kwargs(export=True)
+            )
+            lower_priority(process.pid, export=True)
+            job.processes.add(process)
+            try:
+                stdout, _ = await process.communicate(stdin_data)
+            except asyncio.CancelledError:
+                if process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            finally:
+                job.processes.discard(process)
+        if process.returncode != 0:
+            output['state'] = 'failed'
+            self.remove_partial(outfile)
+            self.remove_segments(outfile)
+            raise JobError(f"ffmpeg failed for {os.path.basename(outfile)}: {stdout.decode(errors='replace')[-2000:]}")
+        os.replace(tmpfile, outfile)
+        output['state'] = 'done'
+
+    async def stream(self, job, loop):
+        """Stream every output into the job's sink, one after another, holding one ffmpeg slot.
+
+        The sink blocks on pipe readers, so it runs in the executor; a
+        cancel kills the current ffmpeg and waits for the sink to return.
+        """
+        cancelled = threading.Event()
+
+        def on_process(process):
+            job.processes.clear()
+            job.processes.add(process)
+
+        def progress(number, planned):
+            for output in job.outputs[:number - 1]:
+                output['state'] = 'done'
+            job.outputs[number - 1]['state'] = 'running'
+
+        async with self.slots, self.governed():
+            job.status = 'running'
+            future = loop.run_in_executor(None, job.sink.export, job.source, job.planned, job.streams,
+                                          on_process, cancelled.is_set, progress)
+            try:
+                await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancelled.set()
+                for process in list(job.processes):
+                    if process.poll() is None:
+                        process.kill()
+                await asyncio.wait([future])
+                raise
+            except SinkError as e:
+                for output in job.outputs:
+                    if output['state'] == 'running':
+                        output['state'] = 'failed'
+                raise JobError(str(e))
+            finally:
+                job.processes.clear()
+        for output in job.outputs:
+            output['state'] = 'done'
+
+    @contextlib.asynccontextmanager
+    async def governed(self):
+        # Wait until the governor allows one more process; checked and
+        # counted without an await in between, so two jobs cannot both pass
+        while self.running >= self.governor.limit():
+            await asyncio.sleep(GOVERNOR_POLL_SECONDS)
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+
+    @staticmethod
+    def remove_partial(outfile):
+        try:
+            os.remove(partial_path(outfile))
+        except OSError:
+            pass
+
+    @staticmethod
+    def remove_segments(outfile):
+        # Segments of an unfinished HLS playlist; empty for single-file outputs
+        if not outfile.endswith('.m3u8'):
+            return
+        for path in hls_segment_files(outfile):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def health(self):
+        counts = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'concurrency': self.concurrency, 'allowed': self.governor.limit(), 'running': self.running,
+                'jobs': counts, 'cache': media_cache_stats()}
+
+
+class ApiServer:
+    """Minimal HTTP/1.1 JSON front end for the scheduler (one request per connection).
+
+    Any local process may connect, and so may web pages the user visits. A
+    browser always sends Origin with cross-site requests and the page's own
+    Host after DNS rebinding, and it cannot send a cross-site application/json
+    POST without a preflight. So requests carrying an Origin, naming another
+    Host than allowed_hosts (None: no check, for the Unix socket) or posting
+    anything but JSON are refused.
+    """
+    def __init__(self, scheduler, allowed_hosts=None):
+        self.scheduler = scheduler
+        self.allowed_hosts = allowed_hosts
+
+    async def handle(self, reader, writer):
+        try:
+            status, body = await self.dispatch(reader)
+        except RequestRejected as e:
+            status, body = e.status, {'error': str(e)}
+        except JobError as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            logger.error(f"Request failed: {e}")
+            status, body = 500, {'error': str(e)}
+        payload = json.dumps(body).encode()
+        reason = {200: 'OK', 201: 'Created', 400: 'Bad Request', 403: 'Forbidden', 404: 'Not Found', 405: 'Method Not Allowed',
+                  409: 'Conflict', 415: 'Unsupported Media Type', 500: 'Internal Server Error'}[status]
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def dispatch(self, reader):
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        try:
+            method, target, _ = request_line.split(' ', 2)
+        except ValueError:
+            raise JobError("Malformed request line")
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        self.check_headers(method, headers)
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            raise JobError("Content-Length must be a number")
+        if length < 0:
+            raise JobError("Content-Length must not be negative")
+        if length > MAX_BODY_BYTES:
+            raise JobError("Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        parts = [p for p in target.split('?', 1)[0].split('/') if p]
+
+        if parts == ['health'] and method == 'GET':
+            return 200, self.scheduler.health()
+        if parts == ['jobs']:
+            if method == 'GET':
+                return 200, [job.to_dict() for job in self.scheduler.jobs.values()]
+            if method == 'POST':
+                try:
+                    request = json.loads(body or b'{}')
+                except ValueError:
+                    raise JobError("Body must be JSON")
+                if not isinstance(request, dict):
+                    raise JobError("Body must be a JSON object")
+                return 201, self.scheduler.submit(request).to_dict()
+            return 405, {'error': f"{method} not allowed"}
+        if len(parts) == 2 and parts[0] == 'jobs':
+            job = self.scheduler.jobs.get(parts[1])
+            if job is None:
+                return 404, {'error': f"No job {parts[1]}"}
+            if method == 'GET':
+                return 200, job.to_dict()
+            if method == 'DELETE':
+                if not self.scheduler.cancel(job):
+                    return 409, {'error': f"Job {job.id} is already {job.status}"}
+                return 200, {'id': job.id, 'status': 'cancelling'}
+            return 405, {'error': f"{method} not allowed"}
+        return 404, {'error': f"No route for {method} {target}"}
+
+    def check_headers(self, method, headers):
+        if 'origin' in headers:
+            raise RequestRejected(403, "Requests from web pages are not accepted")
+        if self.allowed_hosts is not None and headers.get('host', '').lower() not in self.allowed_hosts:
+            raise RequestRejected(403, f"Unexpected Host: {headers.get('host', '')}")
+        if method == 'POST' and headers.get('content-type', '').split(';', 1)[0].strip().lower() != 'application/json':
+            raise RequestRejected(415, "Content-Type must be application/json")
+
+
+async def serve(args):
+    scheduler = Scheduler(args.jobs, args.pipe_dir)
+    if args.socket:
+        api = ApiServer(scheduler)
+        server = await asyncio.start_unix_server(api.handle, path=args.socket)
+        where = args.socket
+    else:
+        api = ApiServer(scheduler, {f"127.0.0.1:{args.port}", f"localhost:{args.port}"})
+        server = await asyncio.start_server(api.handle, host='127.0.0.1', port=args.port)
+        where = f"http://127.0.0.1:{args.port}"
+    logger.info(f"Slyce service listening on {where} ({args.jobs} concurrent ffmpeg jobs)")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Slyce slicing service (local JSON API).')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port on 127.0.0.1')
+    parser.add_argument('--socket', help='listen on this Unix socket path instead of TCP')
+    parser.add_argument('--jobs', type=int, default=DEFAULT_CONCURRENCY, help='maximum concurrent ffmpeg processes')
+    parser.add_argument('--pipe-dir', help='allow streaming sinks, with their named pipes confined to this folder')
+    args = parser.parse_args(argv)
+    if args.pipe_dir and not os.path.isdir(args.pipe_dir):
+        parser.error(f"pipe folder does not exist: {args.pipe_dir}")
+    if args.socket and not hasattr(asyncio, 'start_unix_server'):
+        parser.error('Unix sockets are not available on this platform')
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# slyce_stream.py
+# Command-line export that streams instead of writing files: the cut
+# segments go to stdout or to named pipes, ready for the next program in a
+# pipeline. Same planning and keyframe snapping as the GUI. No Qt or VLC.
+#
+#   python slyce_stream.py in.mp4 1000-5000 --framing none | ffplay -
+#   python slyce_stream.py in.mp4 1000-5000 9000-12000 --pipe /tmp/slyce.fifo --format fmp4
+#   python slyce_stream.py in.mp4 1000-5000 9000-12000 --pipes /tmp/cuts
+import os
+import sys
+import argparse
+import logging
+
+from engine import (
+    EXPORT_MODE_SEPARATE, EXPORT_MODE_MERGE, get_keyframe_index, get_media_info, plan_export, StreamProfiles, Span
+)
+from sinks import (
+    StreamSink, SinkError, SINK_STDOUT, SINK_PIPE, SINK_PIPES, STREAM_FORMATS, STREAM_FORMAT_MPEGTS, FRAMINGS,
+    FRAMING_CHUNKED
+)
+
+logger = logging.getLogger("Slyce.stream")
+
+
+def parse_segment(text):
+    try:
+        start, end = (int(part) for part in text.split('-', 1))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START_MS-END_MS, got {text!r}")
+    if end <= start or start < 0:
+        raise argparse.ArgumentTypeError(f"invalid segment {text}: end must be after start")
+    return Span(start, end)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stream cut segments of a video to stdout or named pipes.')
+    parser.add_argument('source', help='video to cut')
+    parser.add_argument('segments', nargs='+', type=parse_segment, metavar='START_MS-END_MS')
+    where = parser.add_mutually_exclusive_group()
+    where.add_argument('--pipe', help='stream into this named pipe instead of stdout (created if missing)')
+    where.add_argument('--pipes', metavar='FOLDER', help='one named pipe per output in this folder')
+    parser.add_argument('--format', choices=STREAM_FORMATS, default=STREAM_FORMAT_MPEGTS)
+    parser.add_argument('--framing', choices=FRAMINGS, default=FRAMING_CHUNKED,
+                        help='chunked puts a SLYCE-SEGMENT header before each output; none concatenates them')
+    parser.add_argument('--merge', action='store_true', help='join all segments into one output')
+    parser.add_argument('--coalesce-gap', type=float, default=0.0, help='join segments less than this many seconds apart')
+    parser.add_argument('--streams', help='comma-separated input stream indices to copy')
+    args = parser.parse_args(argv)
+    # stdout may be the stream itself, so everything else goes to stderr
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s', stream=sys.stderr)
+    if not os.path.isfile(args.source):
+        parser.error(f"source not found: {args.source}")
+    try:
+        kind, target = (SINK_PIPE, args.pipe) if args.pipe else (SINK_PIPES, args.pipes) if args.pipes else (SINK_STDOUT, None)
+        sink = StreamSink(kind, target, args.format, args.framing)
+    except SinkError as e:
+        parser.error(str(e))
+    if args.streams:
+        streams = [int(i) for i in args.streams.split(',')]
+    else:
+        info = get_media_info(args.source)
+        streams = StreamProfiles().selection_for(info) if info.streams else None
+    try:
+        index = get_keyframe_index(args.source)
+    except Exception as e:
+        logger.warning(f"No keyframe index, cutting at the given times: {e}")
+        index = None
+    mode = EXPORT_MODE_MERGE if args.merge else EXPORT_MODE_SEPARATE
+    plan = plan_export(args.source, args.segments, index, mode, coalesce_gap=args.coalesce_gap)
+    for warning in plan.warnings:
+        logger.warning(warning)
+    logger.info(f"Streaming {len(plan.jobs)} outputs to {sink.describe()}")
+    try:
+        sink.export(args.source, plan.jobs, streams,
+                    progress=lambda number, job: logger.info(f"Output {number}/{len(plan.jobs)}: {sink.output_name(job)}"))
+    except SinkError as e:
+        logger.error(str(e))
+        if kind == SINK_STDOUT:
+            # The reader is gone; keep the interpreter's final flush from failing too
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -100,7 +100,7 @@ QListWidget {
 '''
 
 LOG_TEXTEDIT_STYLE = '''
-QTextEdit {
+QPlainTextEdit {
     font-size: 8pt;
     background: rgba(245, 245, 250, 0.95);
     color: #222;
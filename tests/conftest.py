@@ -0,0 +1,9 @@
+# conftest.py
+# The engine modules are top-level files, and they pick their data folder
+# at import time, so both are set up here before any test imports them.
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['SLYCE_DATA_DIR'] = tempfile.mkdtemp(prefix='slyce-tests-')
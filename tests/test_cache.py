@@ -0,0 +1,70 @@
+# test_cache.py
+# ExportCache: hardlinked entries, edits in place and LRU eviction.
+import os
+
+import pytest
+
+from engine import ExportCache
+
+
+def key(n):
+    return ExportCache.key(f'fingerprint-{n}', [(0.0, 2.0)], 'separate', '.mp4')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ExportCache(str(tmp_path / 'cache'), max_bytes=1000)
+
+
+def output(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+
+def test_keys_depend_on_what_shapes_the_output():
+    base = ExportCache.key('f', [(0.0, 2.0)], 'separate', '.mp4')
+    assert base == ExportCache.key('f', [(0.0, 2.0)], 'separate', '.MP4')
+    assert base != ExportCache.key('f', [(0.0, 2.5)], 'separate', '.mp4')
+    assert base != ExportCache.key('f', [(0.0, 2.0)], 'separate', '.mp4', streams=[0])
+    assert base != ExportCache.key('f', [(0.0, 2.0)], 'separate', '.mp4', packaging='faststart')
+
+
+def test_store_then_fetch(cache, tmp_path):
+    src = output(tmp_path, 'a.mp4', 100)
+    assert not cache.fetch(key(1), '.mp4', str(tmp_path / 'miss.mp4'))
+    assert cache.store(key(1), '.mp4', src)
+    entry = cache.entry_path(key(1), '.mp4')
+    assert os.path.samefile(entry, src)  # a hardlink, no copy
+    dest = str(tmp_path / 'b.mp4')
+    assert cache.fetch(key(1), '.mp4', dest)
+    with open(src, 'rb') as a, open(dest, 'rb') as b:
+        assert a.read() == b.read()
+
+
+def test_an_entry_edited_in_place_is_dropped(cache, tmp_path):
+    src = output(tmp_path, 'a.mp4', 100)
+    cache.store(key(1), '.mp4', src)
+    with open(src, 'r+b') as f:  # the user edits their copy, which is the same inode
+        f.write(b'changed')
+        f.truncate(50)
+    assert not cache.fetch(key(1), '.mp4', str(tmp_path / 'b.mp4'))
+    assert not os.path.exists(cache.entry_path(key(1), '.mp4'))
+
+
+def test_evict_drops_least_recently_used_unshared_entries(cache, tmp_path):
+    paths = []
+    for n in range(3):
+        src = output(tmp_path, f'{n}.mp4', 600)
+        cache.store(key(n), '.mp4', src)
+        paths.append(cache.entry_path(key(n), '.mp4'))
+        os.utime(paths[-1] + ExportCache.SIDECAR_SUFFIX, (1000 + n, 1000 + n))
+    # Still linked to the user's files: they cost nothing extra and are kept
+    assert cache.evict() == 0
+    assert all(os.path.exists(p) for p in paths)
+    for n in range(3):
+        os.remove(str(tmp_path / f'{n}.mp4'))
+    cache.touch(paths[0])  # used just now
+    assert cache.evict() == 600
+    assert [os.path.exists(p) for p in paths] == [True, False, False]
+    assert not os.path.exists(paths[1] + ExportCache.SIDECAR_SUFFIX)
@@ -0,0 +1,76 @@
+# test_journal.py
+# ExportJournal: which outputs it owns and when a finished one still verifies.
+import os
+
+import pytest
+
+import engine
+from engine import ExportJournal
+
+
+class Probed:
+    def __init__(self, duration):
+        self.duration = duration
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'camA' / 'clip.mp4'
+    path.parent.mkdir()
+    path.write_bytes(b'a' * 100)
+    return str(path)
+
+
+@pytest.fixture
+def out_dir(tmp_path):
+    path = tmp_path / 'out'
+    path.mkdir()
+    return str(path)
+
+
+def finished(journal, outfile, ranges, data=b'x' * 10, duration=5.0):
+    journal.plan(outfile, ranges)
+    with open(outfile, 'wb') as f:
+        f.write(data)
+    journal.complete(outfile, len(data), duration)
+
+
+def test_is_verified(source, out_dir, monkeypatch):
+    monkeypatch.setattr(engine.MediaInfo, 'probe', classmethod(lambda cls, path, background=False: Probed(5.05)))
+    outfile = os.path.join(out_dir, 'clip_1.mp4')
+    journal = ExportJournal.load(source, out_dir)
+    journal.plan(outfile, [(0.0, 2.0)])
+    assert not journal.is_verified(outfile, [(0.0, 2.0)])  # still pending
+    finished(journal, outfile, [(0.0, 2.0)])
+    journal = ExportJournal.load(source, out_dir)
+    assert journal.is_verified(outfile, [(0.0, 2.0)])
+    assert not journal.is_verified(outfile, [(0.0, 4.0)])
+    assert not journal.is_verified(outfile, [(0.0, 2.0), (4.0, 6.0)])
+    monkeypatch.setattr(engine.MediaInfo, 'probe', classmethod(lambda cls, path, background=False: Probed(4.0)))
+    assert not journal.is_verified(outfile, [(0.0, 2.0)])  # duration off
+    with open(outfile, 'ab') as f:
+        f.write(b'more')
+    assert not journal.is_verified(outfile, [(0.0, 2.0)])  # size off
+    os.remove(outfile)
+    assert not journal.is_verified(outfile, [(0.0, 2.0)])
+
+
+def test_same_named_sources_do_not_share_a_journal(source, out_dir, tmp_path):
+    other = tmp_path / 'camB' / 'clip.mp4'
+    other.parent.mkdir()
+    other.write_bytes(b'b' * 100)
+    outfile = os.path.join(out_dir, 'clip_1.mp4')
+    finished(ExportJournal.load(source, out_dir), outfile, [(0.0, 2.0)])
+    assert ExportJournal.path_for(source, out_dir) != ExportJournal.path_for(str(other), out_dir)
+    assert ExportJournal.load(source, out_dir).owns(outfile)
+    assert not ExportJournal.load(str(other), out_dir).owns(outfile)
+
+
+def test_a_changed_source_owns_nothing(source, out_dir):
+    outfile = os.path.join(out_dir, 'clip_1.mp4')
+    finished(ExportJournal.load(source, out_dir), outfile, [(0.0, 2.0)])
+    with open(source, 'ab') as f:
+        f.write(b'edited')
+    journal = ExportJournal.load(source, out_dir)
+    assert not journal.owns(outfile)
+    assert journal.entry(outfile) is None
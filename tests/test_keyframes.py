@@ -0,0 +1,53 @@
+# test_keyframes.py
+# KeyframeIndex snapping and size estimates against synthetic indexes.
+import random
+
+import pytest
+
+from engine import KeyframeIndex
+
+
+def make_index(times, file_size=None):
+    offsets = [int(t * 1000) for t in times]
+    return KeyframeIndex(times, offsets, file_size if file_size is not None else (offsets[-1] + 1000 if offsets else 0), 0.0)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_snap_ranges_matches_snap_start_and_end(seed):
+    rng = random.Random(seed)
+    times = sorted({round(rng.uniform(0, 100), 2) for _ in range(rng.randint(0, 40))})
+    index = make_index(times)
+    ranges = []
+    for _ in range(rng.randint(1, 30)):
+        start = rng.choice(times) if times and rng.random() < 0.3 else rng.uniform(-5, 110)
+        ranges.append((start, start + rng.uniform(0, 20)))
+    assert index.snap_ranges(ranges) == [(index.snap_start(a), index.snap_end(b)) for a, b in ranges]
+
+
+def test_snap_start_and_end_at_the_edges():
+    index = make_index([0.0, 2.0, 4.0])
+    assert index.snap_start(2.0) == 2.0  # on a keyframe: that keyframe
+    assert index.snap_start(3.9) == 2.0
+    assert index.snap_end(2.0) == 4.0  # the first keyframe after
+    assert index.snap_end(4.5) == 4.5  # past the last keyframe: unchanged
+    assert make_index([]).snap_start(3.0) == 0.0
+
+
+def test_keyframe_before_and_after_are_strict():
+    index = make_index([0.0, 2.0, 4.0])
+    assert index.keyframe_before(2.0) == 0.0
+    assert index.keyframe_before(0.0) is None
+    assert index.keyframe_after(2.0) == 4.0
+    assert index.keyframe_after(4.0) is None
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (2.0, 4.0, 2000),  # exactly between keyframes
+    (2.5, 4.1, 4000),  # widened to the bounding keyframes
+    (5.0, 7.0, 4000),  # past the last keyframe: up to the end of the file
+    (-1.0, 1.0, 2000),  # before the first keyframe: from the start
+    (3.0, 3.0, 2000),
+])
+def test_estimate_bytes(start, end, expected):
+    index = KeyframeIndex([0.0, 2.0, 4.0, 6.0], [0, 2000, 4000, 6000], 8000, 7.0)
+    assert index.estimate_bytes(start, end) == expected
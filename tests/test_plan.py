@@ -0,0 +1,115 @@
+# test_plan.py
+# Export planning: coalescing, ordering, overlap warnings, names and the
+# track checks of MP4 packagings. Nothing here runs ffmpeg.
+import os
+
+import pytest
+
+from engine import (
+    KeyframeIndex, MediaInfo, Span, plan_export, check_filename_pattern, build_concat_list,
+    EXPORT_MODE_MERGE, PACKAGING_FASTSTART,
+)
+
+SOURCE = os.path.join(os.sep, 'videos', 'clip.mp4')
+OUT = os.path.join(os.sep, 'out')
+
+
+@pytest.fixture
+def index():
+    # A keyframe every 2 s
+    times = [float(t) for t in range(0, 40, 2)]
+    return KeyframeIndex(times, [int(t * 1000) for t in times], 40000, 40.0)
+
+
+def names(plan):
+    return [os.path.basename(f) for f in plan.outfiles]
+
+
+def test_jobs_run_in_source_order_and_keep_marked_numbers(index):
+    segments = [Span(20500, 21000), Span(4500, 5000), Span(10500, 11000)]
+    plan = plan_export(SOURCE, segments, index, output_folder=OUT, filename_pattern='{basename}_{index}')
+    assert names(plan) == ['clip_2.mp4', 'clip_3.mp4', 'clip_1.mp4']
+    assert [job.ranges for job in plan.jobs] == [[(4.0, 6.0)], [(10.0, 12.0)], [(20.0, 22.0)]]
+    assert [job.estimated_bytes for job in plan.jobs] == [2000, 2000, 2000]
+    assert plan.snapped and not plan.warnings
+
+
+def test_close_segments_are_coalesced(index):
+    segments = [Span(1000, 1500), Span(2500, 3000), Span(9000, 9500)]
+    plan = plan_export(SOURCE, segments, index, output_folder=OUT, filename_pattern='{basename}_{index}', coalesce_gap=0.5)
+    assert [job.segments for job in plan.jobs] == [[1, 2], [3]]
+    assert [job.ranges for job in plan.jobs] == [[(0.0, 4.0)], [(8.0, 10.0)]]
+    assert names(plan) == ['clip_1.mp4', 'clip_3.mp4']
+    # Named after the marked span, not the snapped one
+    plan = plan_export(SOURCE, segments[:2], index, output_folder=OUT, coalesce_gap=0.5)
+    assert names(plan) == ['clip_1000-3000.mp4']
+
+
+def test_overlaps_after_snapping_are_reported(index):
+    segments = [Span(1000, 2500), Span(3000, 3500)]
+    plan = plan_export(SOURCE, segments, index, output_folder=OUT, filename_pattern='{basename}_{index}')
+    assert len(plan.jobs) == 2
+    assert plan.warnings == ["Segments 1 and 2 overlap by 2.00s after keyframe snapping; that content is exported twice."]
+    # Coalescing joins them instead
+    plan = plan_export(SOURCE, segments, index, output_folder=OUT, coalesce_gap=0.1)
+    assert len(plan.jobs) == 1 and not plan.warnings
+
+
+def test_merge_keeps_the_marked_order(index):
+    segments = [Span(10500, 11000), Span(4500, 5000)]
+    plan = plan_export(SOURCE, segments, index, EXPORT_MODE_MERGE, OUT)
+    job, = plan.jobs
+    assert job.ranges == [(10.0, 12.0), (4.0, 6.0)]
+    assert job.segments == [1, 2]
+    assert names(plan) == ['clip_merged_4500-11000.mp4']
+
+
+def test_without_an_index_cuts_stay_where_marked():
+    plan = plan_export(SOURCE, [Span(1500, 2500)], None, output_folder=OUT)
+    assert not plan.snapped
+    assert plan.jobs[0].ranges == [(1.5, 2.5)]
+    assert plan.jobs[0].estimated_bytes == 0
+
+
+def test_duplicate_names_are_refused(index):
+    with pytest.raises(ValueError, match='duplicate'):
+        plan_export(SOURCE, [Span(1000, 1500), Span(9000, 9500)], index, output_folder=OUT, filename_pattern='{basename}')
+
+
+@pytest.mark.parametrize('pattern', ['{start[0]}', '{basename.x}', '{basename.upper}', '{index!r}', '{index:{start}}',
+                                     '{basename:d}', '{name}', '{}', '{'])
+def test_bad_filename_patterns_raise_value_error(index, pattern):
+    with pytest.raises(ValueError, match='Invalid filename pattern'):
+        check_filename_pattern(pattern)
+    with pytest.raises(ValueError):
+        plan_export(SOURCE, [Span(1000, 1500)], index, output_folder=OUT, filename_pattern=pattern)
+
+
+@pytest.mark.parametrize('pattern', ['{basename}_{index}', '{basename}_{index:03d}_{start}-{end}', 'cut_{end:>8}', 'fixed'])
+def test_good_filename_patterns(pattern):
+    check_filename_pattern(pattern)
+
+
+def test_mp4_packagings_leave_out_tracks_they_cannot_hold(index):
+    info = MediaInfo(SOURCE, 40.0, [
+        {'index': 0, 'codec_type': 'video', 'codec_name': 'h264'},
+        {'index': 1, 'codec_type': 'audio', 'codec_name': 'pcm_s16le'},
+        {'index': 2, 'codec_type': 'audio', 'codec_name': 'aac'},
+    ], {})
+    plan = plan_export(SOURCE, [Span(1000, 1500)], index, output_folder=OUT, packaging=PACKAGING_FASTSTART,
+                       info=info, streams=[0, 1, 2])
+    assert plan.streams == [0, 2]
+    assert len(plan.warnings) == 1 and 'pcm_s16le' in plan.warnings[0]
+    with pytest.raises(ValueError):
+        plan_export(SOURCE, [Span(1000, 1500)], index, output_folder=OUT, packaging=PACKAGING_FASTSTART,
+                    info=info, streams=[1])
+
+
+@pytest.mark.skipif(os.sep == '\\', reason='a backslash is a separator on Windows')
+def test_concat_list_keeps_posix_backslashes_and_escapes_quotes():
+    script = build_concat_list("/tmp/it's a\\b.mp4", [(1.0, 2.0), (3.0, 4.0)])
+    assert script.splitlines() == [
+        'ffconcat version 1.0',
+        "file 'file:/tmp/it'\\''s a\\b.mp4'", 'inpoint 1.000000', 'outpoint 2.000000',
+        "file 'file:/tmp/it'\\''s a\\b.mp4'", 'inpoint 3.000000', 'outpoint 4.000000',
+    ]
@@ -0,0 +1,101 @@
+# test_projects.py
+# ProjectStore: segment diffs, immediate video rows and the schema migration.
+import sqlite3
+
+import pytest
+
+import projects
+from projects import ProjectStore
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / 'a.mp4'
+    path.write_bytes(b'x' * 1000)
+    return str(path)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ProjectStore(str(tmp_path / 'projects.sqlite'))
+    yield store
+    store.close()
+
+
+def rows(store, path):
+    return store.db.execute('SELECT position, start_ms, end_ms FROM segments WHERE video_id = ? ORDER BY position',
+                            (store.video_id(path),)).fetchall()
+
+
+def changes(store, path, segments):
+    # Rows written by flushing segments, checked against what is stored afterwards
+    before = store.db.total_changes
+    store.set_segments(path, segments)
+    store.flush()
+    assert rows(store, path) == [(i, start, end) for i, (start, end) in enumerate(segments)]
+    return store.db.total_changes - before
+
+
+def test_segment_writes_are_diffs(store, video):
+    store.video_id(video)
+    segments = [(1000, 2000), (3000, 4000), (5000, 6000)]
+    # Three rows plus the fingerprint of a video's first segments
+    assert changes(store, video, segments) == 4
+    assert changes(store, video, segments + [(7000, 8000)]) == 1  # marked one more
+    assert changes(store, video, segments) == 1  # undo
+    assert changes(store, video, segments) == 0
+    assert changes(store, video, [(1000, 2000), (3500, 4000), (5000, 6000)]) == 4  # two rows from the edit on
+    assert changes(store, video, []) == 3
+    assert store.load_segments(video) == []
+
+
+def test_video_rows_are_committed_at_once(store, video):
+    store.video_id(video)
+    assert not store.db.in_transaction
+    with open(video, 'ab') as f:  # replaced in place
+        f.write(b'y')
+    store.ids.clear()
+    store.video_id(video)
+    assert not store.db.in_transaction
+
+
+def test_segments_follow_a_moved_video(store, video, tmp_path):
+    store.set_segments(video, [(1000, 2000)])
+    store.flush()
+    moved = tmp_path / 'b.mp4'
+    (tmp_path / 'a.mp4').rename(moved)
+    assert store.load_segments(str(moved)) == [(1000, 2000)]
+    assert not store.db.in_transaction
+
+
+def test_export_history(store, video):
+    store.record_export(video, True, '/out', 'separate', 'faststart', None, [(1000, 2000)], 'Exported 1 segments.')
+    store.record_export(video, False, 'named pipe /tmp/p', 'separate', 'plain', 'mpegts', [(1000, 2000)], 'failed')
+    history = store.export_history(video)
+    assert [(h['ok'], h['packaging'], h['stream_format']) for h in history] == [(False, 'plain', 'mpegts'), (True, 'faststart', None)]
+    assert history[1]['segments'] == [[1000, 2000]]
+
+
+V1_SCHEMA = """
+CREATE TABLE videos (id INTEGER PRIMARY KEY, path TEXT NOT NULL, size INTEGER NOT NULL, mtime REAL NOT NULL,
+                     fingerprint TEXT, media_info TEXT, opened REAL);
+CREATE TABLE exports (id INTEGER PRIMARY KEY, video_id INTEGER NOT NULL, finished REAL NOT NULL, ok INTEGER NOT NULL,
+                      destination TEXT NOT NULL, mode TEXT NOT NULL, packaging TEXT NOT NULL, segments TEXT NOT NULL,
+                      message TEXT);
+INSERT INTO videos (id, path, size, mtime) VALUES (1, '/videos/a.mp4', 1, 1);
+INSERT INTO exports (video_id, finished, ok, destination, mode, packaging, segments)
+    VALUES (1, 1, 1, '/out', 'separate', 'hls', '[]'), (1, 2, 1, 'stdout', 'separate', 'fmp4', '[]');
+PRAGMA user_version = 1;
+"""
+
+
+def test_version_1_databases_are_migrated(tmp_path):
+    path = str(tmp_path / 'old.sqlite')
+    db = sqlite3.connect(path)
+    db.executescript(V1_SCHEMA)
+    db.close()
+    store = ProjectStore(path)
+    assert store.db.execute('PRAGMA user_version').fetchone()[0] == projects.SCHEMA_VERSION
+    assert store.db.execute('SELECT packaging, stream_format FROM exports ORDER BY finished').fetchall() == [
+        ('hls', None), ('plain', 'fmp4')]
+    store.close()
@@ -0,0 +1,69 @@
+# test_sinks.py
+# Chunk framing of streamed exports, read back with read_frames.
+import io
+import sys
+
+import pytest
+
+from sinks import StreamSink, SinkError, read_frames, frame_header, frame_chunk, frame_error, FRAME_END, SINK_STDOUT
+
+
+class Job:
+    def __init__(self, ranges, outfile):
+        self.ranges = ranges
+        self.outfile = outfile
+
+
+def framed(number, ranges, name, *chunks):
+    return frame_header(number, ranges, name) + b''.join(frame_chunk(c) for c in chunks) + FRAME_END
+
+
+def test_round_trip():
+    stream = framed(1, [(0.0, 2.0)], 'a 1.ts', b'abc', b'\r\n' * 3, b'x' * 5000) + framed(2, [(4.0, 5.0), (8.0, 9.5)], 'b.ts')
+    assert list(read_frames(io.BytesIO(stream))) == [
+        (1, 0.0, 2.0, 'a 1.ts', b'abc' + b'\r\n' * 3 + b'x' * 5000),
+        (2, 4.0, 9.5, 'b.ts', b''),
+    ]
+
+
+def test_error_trailer_raises():
+    stream = framed(1, [(0.0, 2.0)], 'a.ts', b'ok') + frame_header(2, [(2.0, 4.0)], 'b.ts') + frame_chunk(b'part')
+    frames = read_frames(io.BytesIO(stream + frame_error(2, 'ffmpeg failed:\nno such file')))
+    assert next(frames)[3] == 'a.ts'
+    with pytest.raises(SinkError, match='Output 2 failed: ffmpeg failed: no such file'):
+        next(frames)
+
+
+@pytest.mark.parametrize('kept', [0, 3, 8])
+def test_eof_inside_a_frame_raises(kept):
+    # Cut off after the header, inside the chunk data, and before the chunk's CRLF
+    stream = frame_header(1, [(0.0, 2.0)], 'a.ts') + frame_chunk(b'abcdef')[:kept]
+    with pytest.raises(SinkError, match='ended inside output 1'):
+        list(read_frames(io.BytesIO(stream)))
+
+
+def test_not_a_framed_stream():
+    with pytest.raises(SinkError):
+        list(read_frames(io.BytesIO(b'\x47\x40\x00\x10 mpegts bytes\n')))
+
+
+def test_failed_output_ends_with_an_error_line(monkeypatch):
+    out = io.BytesIO()
+    monkeypatch.setattr(sys, 'stdout', type('Stdout', (), {'buffer': out, 'flush': lambda self: None})())
+    calls = []
+
+    def relay(cmd, stdin_text, out, on_process, cancelled):
+        calls.append(cmd)
+        out.write(frame_chunk(b'data'))
+        if len(calls) == 2:
+            raise SinkError('ffmpeg failed: boom')
+        return True
+
+    sink = StreamSink(SINK_STDOUT)
+    monkeypatch.setattr(sink, 'relay', relay)
+    with pytest.raises(SinkError):
+        sink.export('/videos/a.mp4', [Job([(0.0, 2.0)], '/out/a_1.ts'), Job([(2.0, 4.0)], '/out/a_2.ts')])
+    frames = read_frames(io.BytesIO(out.getvalue()))
+    assert next(frames) == (1, 0.0, 2.0, 'a_1.ts', b'data')
+    with pytest.raises(SinkError, match='Output 2 failed: ffmpeg failed: boom'):
+        next(frames)
@@ -0,0 +1,65 @@
+# test_waveform.py
+# WaveformPeaks: mipmap levels and per-pixel peaks at the edges of the audio.
+import numpy as np
+import pytest
+
+from waveform import WaveformPeaks, WAVEFORM_LEVEL_FACTOR, WAVEFORM_MIN_BUCKETS
+
+
+def make_peaks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    lows = rng.integers(-32768, 0, n)
+    highs = rng.integers(0, 32768, n)
+    return WaveformPeaks.build_levels(np.stack((lows, highs), axis=1).astype('<i2'))
+
+
+@pytest.fixture
+def peaks():
+    return WaveformPeaks(make_peaks(5000))
+
+
+def test_levels_keep_the_extremes():
+    levels = make_peaks(5003)
+    assert len(levels[-1]) <= WAVEFORM_MIN_BUCKETS
+    for finer, coarser in zip(levels, levels[1:]):
+        assert len(coarser) == -(-len(finer) // WAVEFORM_LEVEL_FACTOR)
+        assert coarser[:, 0].min() == finer[:, 0].min()
+        assert coarser[:, 1].max() == finer[:, 1].max()
+
+
+def test_a_short_track_has_one_level():
+    assert len(WaveformPeaks.build_levels(np.zeros((10, 2), dtype='<i2'))) == 1
+
+
+@pytest.mark.parametrize('width', [1, 7, 300, 5000, 20000])
+def test_whole_range_covers_every_sample(peaks, width):
+    out = peaks.peaks(0.0, peaks.duration, width)
+    assert out.shape == (width, 2)
+    base = peaks.levels[0]
+    assert out[:, 0].min() == base[:, 0].min() / 32768.0
+    assert out[:, 1].max() == base[:, 1].max() / 32768.0
+
+
+def test_pixels_outside_the_audio_are_flat(peaks):
+    out = peaks.peaks(0.0, peaks.duration * 2, 100)
+    # Pixel 50 still overlaps the last, partly filled coarse bucket
+    assert np.all(out[51:] == 0)
+    assert np.all(out[:50] != 0)
+    out = peaks.peaks(-peaks.duration, peaks.duration, 100)
+    assert np.all(out[:50] == 0)
+    assert np.all(out[50:] != 0)
+    assert np.all(peaks.peaks(peaks.duration + 1, peaks.duration + 2, 10) == 0)
+    assert np.all(peaks.peaks(-2.0, -1.0, 10) == 0)
+
+
+def test_an_empty_range_reads_one_bucket(peaks):
+    t = 10 * peaks.bucket_seconds
+    out = peaks.peaks(t, t, 3)
+    assert np.all(out == peaks.levels[0][10] / 32768.0)
+
+
+def test_pixels_narrower_than_a_bucket_repeat_it(peaks):
+    bucket = peaks.bucket_seconds
+    out = peaks.peaks(0.0, 2 * bucket, 8)
+    expected = np.repeat(peaks.levels[0][:2] / 32768.0, 4, axis=0)
+    assert np.array_equal(out, expected.astype(np.float32))
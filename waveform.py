@@ -0,0 +1,146 @@
+# waveform.py
+# Audio waveform overview for the timeline: peaks are computed in one
+# streaming pass over low-rate PCM from ffmpeg and kept as a min/max
+# mipmap, cached on disk per source version. Nothing in here imports Qt.
+import os
+import subprocess
+import hashlib
+import json
+
+import numpy as np
+
+from engine import FFMPEG, APP_DATA_DIR, process_kwargs, lower_priority
+
+WAVEFORM_CACHE_DIR = os.path.join(APP_DATA_DIR, 'waveforms')
+# Mono 16-bit PCM at this rate is plenty for an overview and cheap to decode
+WAVEFORM_SAMPLE_RATE = 8000
+# Samples per finest-level bucket (10 ms)
+WAVEFORM_BUCKET_SAMPLES = 80
+# Each mipmap level merges this many buckets of the level below
+WAVEFORM_LEVEL_FACTOR = 4
+# Stop adding levels once a level is this small
+WAVEFORM_MIN_BUCKETS = 256
+# PCM read per chunk, in samples; bounds memory regardless of duration
+WAVEFORM_CHUNK_SAMPLES = WAVEFORM_BUCKET_SAMPLES * 2048
+
+
+class WaveformPeaks:
+    """Min/max peaks of a source's first audio track at several resolutions.
+
+    levels[0] holds one (min, max) int16 pair per WAVEFORM_BUCKET_SAMPLES
+    samples; each following level merges WAVEFORM_LEVEL_FACTOR buckets of
+    the one before, so any view can be drawn from a level with about as
+    many buckets as pixels.
+    """
+    def __init__(self, levels):
+        self.levels = levels  # list of (n, 2) int16 arrays, finest first
+        self.bucket_seconds = WAVEFORM_BUCKET_SAMPLES / WAVEFORM_SAMPLE_RATE
+
+    @classmethod
+    def compute(cls, path, cancelled=lambda: False):
+        """Stream the audio of path through ffmpeg and reduce it to peaks.
+
+        Only one chunk of PCM and the finest-level peaks are held at a time.
+        Returns None when the source has no audio or the pass was cancelled.
+        """
+        cmd = [
+            FFMPEG, '-v', 'error', '-i', path, '-map', '0:a:0', '-vn', '-ac', '1',
+            '-ar', str(WAVEFORM_SAMPLE_RATE), '-f', 's16le', '-'
+        ]
+        process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, **process_kwargs(background=True))
+        lower_priority(process.pid, background=True)
+        chunks = []
+        carry = np.empty(0, dtype='<i2')  # samples of a bucket split across reads
+        leftover = b''  # half a sample split across reads
+        try:
+            while True:
+                if cancelled():
+                    process.kill()
+                    return None
+                data = process.stdout.read(WAVEFORM_CHUNK_SAMPLES * 2)
+                if not data:
+                    break
+                data = leftover + data
+                usable = len(data) - len(data) % 2
+                leftover = data[usable:]
+                samples = np.concatenate((carry, np.frombuffer(data[:usable], dtype='<i2')))
+                whole = len(samples) - len(samples) % WAVEFORM_BUCKET_SAMPLES
+                carry = samples[whole:].copy()
+                if whole:
+                    buckets = samples[:whole].reshape(-1, WAVEFORM_BUCKET_SAMPLES)
+                    chunks.append(np.stack((buckets.min(axis=1), buckets.max(axis=1)), axis=1))
+            if len(carry):
+                chunks.append(np.array([[carry.min(), carry.max()]], dtype='<i2'))
+        finally:
+            process.stdout.close()
+            process.wait()
+        if not chunks:
+            return None
+        return cls(cls.build_levels(np.concatenate(chunks)))
+
+    @staticmethod
+    def build_levels(base):
+        levels = [base]
+        while len(levels[-1]) > WAVEFORM_MIN_BUCKETS:
+            level = levels[-1]
+            # Pad with the last bucket so the length divides evenly; a repeat never widens a min/max
+            pad = -len(level) % WAVEFORM_LEVEL_FACTOR
+            if pad:
+                level = np.concatenate((level, np.repeat(level[-1:], pad, axis=0)))
+            grouped = level.reshape(-1, WAVEFORM_LEVEL_FACTOR, 2)
+            levels.append(np.stack((grouped[:, :, 0].min(axis=1), grouped[:, :, 1].max(axis=1)), axis=1))
+        return levels
+
+    @property
+    def duration(self):
+        return len(self.levels[0]) * self.bucket_seconds
+
+    def peaks(self, start_sec, end_sec, width):
+        """Per-pixel (min, max) for [start_sec, end_sec) as a (width, 2) float array in -1..1.
+
+        Reads the coarsest level that still has a bucket per pixel, so the
+        cost depends on the width, not on the length of the source.
+        """
+        span = max(end_sec - start_sec, 1e-6)
+        level_index = 0
+        bucket = self.bucket_seconds
+        while (level_index + 1 < len(self.levels)
+               and span / (bucket * WAVEFORM_LEVEL_FACTOR) >= width):
+            level_index += 1
+            bucket *= WAVEFORM_LEVEL_FACTOR
+        level = self.levels[level_index]
+        positions = np.linspace(start_sec / bucket, end_sec / bucket, width + 1)
+        edges = np.clip(np.floor(positions).astype(np.int64), 0, len(level))
+        out = np.zeros((width, 2), dtype=np.float32)
+        # Pixels before the start or past the end of the audio stay flat
+        valid = (edges[:-1] < len(level)) & (positions[1:] > 0)
+        if not valid.any():
+            return out
+        starts = edges[:-1][valid]
+        stop = max(edges[1:][valid][-1], starts[-1] + 1)
+        # Each pixel reduces up to the next pixel's start; a pixel narrower
+        # than a bucket (equal neighbours) gets the bucket it starts in
+        out[valid, 0] = np.minimum.reduceat(level[:stop, 0], starts) / 32768.0
+        out[valid, 1] = np.maximum.reduceat(level[:stop, 1], starts) / 32768.0
+        return out
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f, *self.levels)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls([data[f'arr_{i}'] for i in range(len(data.files))])
+
+
+def waveform_cache_path(fingerprint):
+    params = {
+        'source': fingerprint, 'rate': WAVEFORM_SAMPLE_RATE,
+        'bucket': WAVEFORM_BUCKET_SAMPLES, 'factor': WAVEFORM_LEVEL_FACTOR,
+    }
+    key = hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+    return os.path.join(WAVEFORM_CACHE_DIR, key[:2], key + '.npz')